@@ -1,6 +1,6 @@
 from rest_framework.permissions import BasePermission
 
-from core.models.course import Course
+from core.models.course import Course, CourseStudent
 from core.models.user import Instructor
 
 from . import exceptions
@@ -15,9 +15,7 @@ class IsCourseStudent(BasePermission):
     def has_object_permission(self, request, view, obj):
         if not (is_active_user := IsActiveUser().has_permission(request, view)):
             return is_active_user
-        user = request.user
-        flag = obj.students.filter(user=user).exists()
-        return flag
+        return bool(CourseStudent.objects.owned_course_ids(request.user, [obj.id]))
 
 
 class CourseStudentPermissionMixin:
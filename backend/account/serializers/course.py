@@ -37,10 +37,11 @@ class CourseModuleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = course.Module
-        fields = ["title", "order", "description"]
+        fields = ["title", "order", "description", "contents"]
 
     def get_contents(self, obj):
-        contents = AccountService.get_module_contents(obj)
+        # prefetched by AccountService.get_course_modules
+        contents = obj.contents.all()
         data = SimpleContentSerializer(contents, many=True).data
         return data
 
@@ -93,15 +94,24 @@ class ResourceItemSerializer(serializers.RelatedField):
 class SimpleContentSerializer(serializers.ModelSerializer):
     class Meta:
         model = course.Content
-        fields = ["id", "order", "type", "title"]
+        fields = ["id", "order", "type", "title", "duration"]
+
+
+class ContentResourceSerializer(serializers.ModelSerializer):
+    item = ResourceItemSerializer(read_only=True)
+
+    class Meta:
+        model = course.Resource
+        fields = ["id", "type", "order", "item"]
 
 
 class ContentSerializer(serializers.ModelSerializer):
-    item = ItemSerializer()
+    item = ItemSerializer(read_only=True)
+    resources = ContentResourceSerializer(many=True, read_only=True)
 
     class Meta:
         model = course.Content
-        fields = ["id", "order", "type", "item"]
+        fields = ["id", "order", "type", "item", "resources"]
 
 
 class ContentNoteSerializer(serializers.ModelSerializer):
@@ -112,14 +122,6 @@ class ContentNoteSerializer(serializers.ModelSerializer):
         fields = ["id", "user", "video_timestamp", "note"]
 
 
-class ContentResourceSerializer(serializers.ModelSerializer):
-    item = ResourceItemSerializer()
-
-    class Meta:
-        model = course.Resource
-        fields = ["id", "type", "order", "item"]
-
-
 class CourseQuestionSerializer(serializers.ModelSerializer):
     user = user_serializer.RelatedUserSerializer(read_only=True)
 
@@ -166,8 +168,8 @@ class MessageContentSerializer(serializers.RelatedField):
 
 
 class CourseMessageSerializer(serializers.ModelSerializer):
-    user = user_serializer.RelatedUserSerializer()
-    content = MessageContentSerializer()
+    user = user_serializer.RelatedUserSerializer(read_only=True)
+    content = MessageContentSerializer(read_only=True)
 
     class Meta:
         model = course.CourseMessage
@@ -1,3 +1,5 @@
+from django.db.models import Prefetch
+
 from core.models import (
     course as course_models,
 )
@@ -29,20 +31,38 @@ class AccountService:
 
     @classmethod
     def get_course_modules(cls, course: course_models.Course):
-        modules = course_models.Module.objects.filter(course=course).order_by("order")
+        # the outline reads the content snapshot columns only, so the
+        # generic items are never loaded
+        contents = course_models.Content.objects.only(
+            "module_id", "order", "type", "title", "duration"
+        ).order_by("order")
+        modules = (
+            course_models.Module.objects.filter(course=course)
+            .prefetch_related(Prefetch("contents", queryset=contents))
+            .order_by("order")
+        )
         return modules
 
     @classmethod
     def get_module_contents(cls, module: course_models.Module):
-        contents = course_models.Content.objects.filter(module=module).order_by("order")
+        contents = (
+            course_models.Content.objects.filter(module=module)
+            .prefetch_related("item")
+            .order_by("order")
+        )
         return contents
 
     @classmethod
     def get_content(cls, kwargs: dict, course: course_models.Course):
         if not (content := kwargs.get("content")):
             raise exceptions.ActionNotAllowed
+        resources = course_models.Resource.objects.prefetch_related("item").order_by(
+            "order"
+        )
         try:
-            return course_models.Content.objects.get(id=content, module__course=course)
+            return course_models.Content.objects.prefetch_related(
+                "item", Prefetch("resources", queryset=resources)
+            ).get(id=content, module__course=course)
         except course_models.Content.DoesNotExist:
             raise exceptions.ActionNotAllowed
 
@@ -97,13 +117,18 @@ class AccountService:
 
     @classmethod
     def get_course_chat_room(cls, course: course_models.Course):
-        chat_room = course_models.CourseChatRoom.objects.get_or_create(course=course)
+        chat_room, _ = course_models.CourseChatRoom.objects.get_or_create(
+            course=course
+        )
         return chat_room
 
     @classmethod
     def get_course_chat_messages(cls, course: course_models.Course):
         chat_room = cls.get_course_chat_room(course)
-        messages = course_models.CourseMessage.objects.filter(room=chat_room).order_by(
-            "-created_at"
+        messages = (
+            course_models.CourseMessage.objects.filter(room=chat_room)
+            .select_related("user")
+            .prefetch_related("content")
+            .order_by("-created_at")
         )
         return messages
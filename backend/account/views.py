@@ -1,7 +1,8 @@
 from rest_framework import generics
 from rest_framework.response import Response
 
-from core.utils import CorePagination, MessagePagination
+from core.models.course import Course
+from core.utils import CorePagination, MessageKeysetPagination
 
 from . import permissions
 from .serializers import course, sales
@@ -28,7 +29,11 @@ class CourseListAPIView(generics.ListAPIView):
 class CourseDetailsAPIView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsCourseStudent]
     serializer_class = course.CourseSerializer
-    lookup_field = "course"
+    lookup_field = "id"
+    lookup_url_kwarg = "course"
+
+    def get_queryset(self):
+        return Course.objects.catalog()
 
 
 class CourseModulesListAPIView(
@@ -46,6 +51,9 @@ class CourseModulesListAPIView(
 class CourseContentDetailsAPIView(
     permissions.CourseStudentPermissionMixin, generics.RetrieveAPIView
 ):
+    # enrollment is checked by the mixin, there is no queryset for the
+    # default model permissions
+    permission_classes = [permissions.IsActiveUser]
     serializer_class = course.ContentSerializer
 
     def get_object(self):
@@ -102,7 +110,7 @@ class CourseQuestionCommentListCreateAPIView(
     permissions.CourseStudentPermissionMixin, generics.ListCreateAPIView
 ):
     serializer_class = course.CourseQuestionCommentSerializer
-    pagination_class = MessagePagination
+    pagination_class = MessageKeysetPagination
 
     def get_object(self):
         return AccountService.get_question_details(self.course, self.kwargs)
@@ -141,7 +149,7 @@ class CourseChatMessagesListAPIView(
     permissions.CourseStudentPermissionMixin, generics.ListAPIView
 ):
     serializer_class = course.CourseMessageSerializer
-    pagination_class = MessagePagination
+    pagination_class = MessageKeysetPagination
 
     def get_queryset(self):
         return AccountService.get_course_chat_messages(self.course)
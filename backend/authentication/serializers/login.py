@@ -1,9 +1,9 @@
-from providers.ethereum import Ethereum
-from providers.google import Google
-from providers.polkadot import Polkadot
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
 
+from authentication.providers.ethereum import Ethereum
+from authentication.providers.google import Google
+from authentication.providers.polkadot import Polkadot
 from authentication.service import AuthService
 from core.models import User
 
@@ -1,11 +1,11 @@
 from django.contrib.auth import password_validation
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction as db_transaction
-from providers.ethereum import Ethereum
-from providers.google import Google
-from providers.polkadot import Polkadot
 from rest_framework import serializers
 
+from authentication.providers.ethereum import Ethereum
+from authentication.providers.google import Google
+from authentication.providers.polkadot import Polkadot
 from authentication.service import AuthService
 from core.models import User
 
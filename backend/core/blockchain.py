@@ -1,58 +1,369 @@
 import json
-from web3 import Web3
+import threading
+from functools import cached_property
+
+import requests
 from django.conf import settings
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+
+class BlockchainClient:
+    """
+    Owns the Web3 connection and the contract objects. Nothing is
+    created until it is first used, so importing this module costs no
+    RPC call. Requests go through a keep-alive session pool, and
+    contract objects are built once per (name, address).
+    """
+
+    def __init__(
+        self,
+        provider_url: str,
+        contract_file,
+        timeout: float = 10,
+        retries: int = 3,
+        pool_size: int = 10,
+    ):
+        self.provider_url = provider_url
+        self.contract_file = contract_file
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self._contracts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "BlockchainClient":
+        return cls(
+            settings.PROVIDER_URL,
+            settings.CONTRACT_DIR / "data.json",
+            timeout=settings.WEB3_TIMEOUT,
+            retries=settings.WEB3_RETRIES,
+            pool_size=settings.WEB3_POOL_SIZE,
+        )
+
+    @cached_property
+    def session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            # only failed connections are retried, the request never reached
+            # the node then. A POST that timed out or got an error status
+            # may have been applied, and eth_sendRawTransaction must not be
+            # sent twice.
+            max_retries=Retry(
+                total=self.retries,
+                connect=self.retries,
+                read=False,
+                status=0,
+                other=0,
+                backoff_factor=0.2,
+                allowed_methods=None,
+                respect_retry_after_header=False,
+            ),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @cached_property
+    def web3(self) -> Web3:
+        provider = Web3.HTTPProvider(
+            self.provider_url,
+            request_kwargs={"timeout": self.timeout},
+            session=self.session,
+        )
+        return Web3(provider)
+
+    @cached_property
+    def contract_data(self) -> dict:
+        with open(self.contract_file, "r") as file:
+            return json.load(file)
+
+    def contract(self, name: str, address: str | None = None):
+        """
+        The `name` contract from data.json, at its deployed address unless
+        `address` is given.
+        """
+        address = address or self.contract_data[name]["address"]
+        key = (name, address)
+        if key not in self._contracts:
+            with self._lock:
+                if key not in self._contracts:
+                    self._contracts[key] = self.web3.eth.contract(
+                        address=address, abi=self.contract_data[name]["abi"]
+                    )
+        return self._contracts[key]
+
+
+_client = None
+
+
+def get_blockchain_client() -> BlockchainClient:
+    global _client
+    if _client is None:
+        _client = BlockchainClient.from_settings()
+    return _client
+
+
+def has_functions(contract, *names: str) -> bool:
+    """
+    Whether the ABI of `contract` has every function in `names`. data.json
+    is written from the compiled contracts on every deploy, so a method
+    only shows up there once a contract that has it is deployed.
+    """
+    functions = {entry["name"] for entry in contract.abi if entry["type"] == "function"}
+    return set(names) <= functions
+
+
+class NonceManager:
+    """
+    Hands out nonces for one account from memory. It reads the pending
+    transaction count once and counts up from there, so transactions sent
+    back to back never reuse a nonce. It only knows about its own process,
+    so everything sending from one account has to run in one process.
+    """
+
+    _managers = {}
+    _managers_lock = threading.Lock()
+
+    def __init__(self, web3: Web3, address: str):
+        self.web3 = web3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next = None
+
+    @classmethod
+    def for_account(cls, web3: Web3, address: str) -> "NonceManager":
+        """
+        The manager shared by everything in this process sending from
+        `address`.
+        """
+        with cls._managers_lock:
+            if address not in cls._managers:
+                cls._managers[address] = cls(web3, address)
+            return cls._managers[address]
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next is None:
+                self._next = self.web3.eth.get_transaction_count(
+                    self.address, "pending"
+                )
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def resync(self):
+        """
+        Forget the local count, e.g. after a send failed and left a gap.
+        """
+        with self._lock:
+            self._next = None
+
 
-web3 = Web3(Web3.HTTPProvider(settings.PROVIDER_URL))
-assert web3.is_connected()
+class TransactionSender:
+    """
+    Signs and sends contract calls from one account, with nonces from its
+    NonceManager, and looks up their receipts without waiting for them.
+    """
 
-# Load contract data file
-with open(settings.CONTRACT_DIR / "data.json", "r") as file:
-    data_file = json.load(file)
+    # estimates can fall short when state changes before the transaction
+    # is mined
+    GAS_MARGIN = 1.2
+    # nodes only accept a replacement that pays at least 10% more
+    GAS_BUMP = 1.2
+
+    def __init__(self, web3: Web3, address: str, private_key: str):
+        self.web3 = web3
+        self.address = address
+        self.private_key = private_key
+        self.nonces = NonceManager.for_account(web3, address)
+
+    def send(
+        self, function, nonce: int | None = None, gas_price: int | None = None
+    ) -> tuple[int, str]:
+        """
+        Send `function` with the next nonce, or with `nonce` to replace a
+        transaction sent with it. Returns the nonce and transaction hash.
+        """
+        gas = function.estimate_gas({"from": self.address})
+        gas_price = gas_price or self.web3.eth.gas_price
+        reserved = nonce is None
+        if reserved:
+            nonce = self.nonces.next()
+        try:
+            tx = function.build_transaction(
+                {
+                    "from": self.address,
+                    "nonce": nonce,
+                    "gas": int(gas * self.GAS_MARGIN),
+                    "gasPrice": gas_price,
+                }
+            )
+            signed = self.web3.eth.account.sign_transaction(tx, self.private_key)
+            tx_hash = self.web3.eth.send_raw_transaction(signed.rawTransaction)
+        except Exception:
+            if reserved:
+                # the nonce was never used, later ones would be stuck behind it
+                self.nonces.resync()
+            raise
+        return nonce, Web3.to_hex(tx_hash)
+
+    def replace(self, function, nonce: int, tx_hash: str) -> tuple[int, str]:
+        """
+        Send `function` in place of the pending transaction `tx_hash`, with
+        its nonce and a higher gas price, so that at most one of the two is
+        mined. Raises when `tx_hash` was mined in the meantime.
+        """
+        try:
+            pending_price = self.web3.eth.get_transaction(tx_hash)["gasPrice"]
+        except TransactionNotFound:
+            # dropped, its nonce is free again
+            pending_price = 0
+        gas_price = max(self.web3.eth.gas_price, int(pending_price * self.GAS_BUMP))
+        return self.send(function, nonce=nonce, gas_price=gas_price)
+
+    def receipts(self, tx_hashes) -> dict:
+        """
+        Receipts of the mined transactions among `tx_hashes`, by hash.
+        """
+        receipts = {}
+        for tx_hash in dict.fromkeys(tx_hashes):
+            try:
+                receipts[tx_hash] = self.web3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return receipts
+
+
+class PaymentBatchClient:
+    """
+    Groups invoice refs into as few createInvoices transactions and
+    checkPaymentStatuses calls as possible, `max_batch` refs at a time to
+    stay well under the block gas limit. A contract deployed without the
+    batch methods is served one createInvoice or checkPaymentStatus per
+    ref instead.
+    """
+
+    BATCH_METHODS = {"createInvoices", "checkPaymentStatuses"}
+
+    def __init__(self, contract, max_batch: int = 100):
+        self.contract = contract
+        self.max_batch = max_batch
+
+    @cached_property
+    def batched(self) -> bool:
+        return has_functions(self.contract, *self.BATCH_METHODS)
+
+    @property
+    def batch_size(self) -> int:
+        return self.max_batch if self.batched else 1
+
+    def chunks(self, items: list) -> list[list]:
+        return [
+            items[start : start + self.batch_size]
+            for start in range(0, len(items), self.batch_size)
+        ]
+
+    def create_invoices(self, invoices: list[tuple[str, int, str]]) -> list:
+        """
+        createInvoices calls, or createInvoice calls on a contract without
+        batches, ready to be built into transactions, for (ref, amount,
+        token) triples.
+        """
+        calls = []
+        for chunk in self.chunks(invoices):
+            refs, amounts, tokens = zip(*chunk)
+            amounts = [int(amount) for amount in amounts]
+            tokens = [Web3.to_checksum_address(token) for token in tokens]
+            if self.batched:
+                function = self.contract.functions.createInvoices(
+                    list(refs), amounts, tokens
+                )
+            else:
+                function = self.contract.functions.createInvoice(
+                    refs[0], amounts[0], tokens[0]
+                )
+            calls.append(function)
+        return calls
+
+    def created(self, refs: list[str]) -> set[str]:
+        """
+        The refs among `refs` that have an invoice on the contract.
+        """
+        # date_created of the Transaction struct, 0 for an unknown ref
+        return {
+            ref
+            for ref in refs
+            if self.contract.functions.transactions(ref).call()[4] != 0
+        }
+
+    def check_payment_statuses(self, refs: list[str]) -> dict[str, bool]:
+        statuses = {}
+        for chunk in self.chunks(list(refs)):
+            if self.batched:
+                paid = self.contract.functions.checkPaymentStatuses(chunk).call()
+            else:
+                paid = [self.contract.functions.checkPaymentStatus(*chunk).call()]
+            statuses.update(zip(chunk, paid))
+        return statuses
 
 
 class BlockchainService:
+    @classmethod
+    def get_web3(cls) -> Web3:
+        return get_blockchain_client().web3
+
     @classmethod
     def get_payment_contract(cls):
         """
         Get the payment contract for payment interaction
         """
-        payment_abi = data_file["payment"]["abi"]
-        payment_contract_address = data_file["payment"]["address"]
+        return get_blockchain_client().contract("payment")
 
-        contract = web3.eth.contract(address=payment_contract_address, abi=payment_abi)
-        return contract
+    @classmethod
+    def get_payment_batch_client(cls, max_batch: int = 100) -> PaymentBatchClient:
+        """
+        Get a client that creates and checks invoices in batches
+        """
+        return PaymentBatchClient(cls.get_payment_contract(), max_batch)
+
+    @classmethod
+    def get_certificate_contract(cls):
+        """
+        Get the deployed certificate nft contract for minting certificates
+        """
+        return get_blockchain_client().contract("certificate")
 
     @classmethod
     def get_certficate_nft_contract(cls, certificate_contract_address: str):
         """
         Get the certificate nft contract for certificate interaction
         """
-        certificate_abi = data_file["certificate"]["abi"]
-        contract = web3.eth.contract(
-            address=certificate_contract_address, abi=certificate_abi
+        return get_blockchain_client().contract(
+            "certificate", certificate_contract_address
         )
-        return contract
 
     @classmethod
     def get_learnbestia_token_contract(cls):
         """
         Get the learnbestia token contract for learnbestia token interaction
         """
-        learnbestia_abi = data_file["learnbestia"]["abi"]
-        learnbestia_contract_address = data_file["learnbestia"]["address"]
-
-        contract = web3.eth.contract(
-            address=learnbestia_contract_address, abi=learnbestia_abi
-        )
-        return contract
+        return get_blockchain_client().contract("learnbestia")
 
     @classmethod
     def deploy_certicate_nft(cls, name: str, symbol: str):
-        admin = settings.ADDRESS
+        admin = settings.ADMIN_ADDRESS
         private_key = settings.PRIVATE_KEY
-        certificate_abi = data_file["certificate"]["abi"]
-        certificate_bytecode = data_file["certificate"]["bytecode"]
+        client = get_blockchain_client()
+        web3 = client.web3
+        certificate_abi = client.contract_data["certificate"]["abi"]
+        certificate_bytecode = client.contract_data["certificate"]["bytecode"]
 
         nonce = web3.eth.get_transaction_count(admin)
 
@@ -0,0 +1,67 @@
+import time
+
+from django.core.cache import cache
+
+SYLLABUS_CACHE_TIMEOUT = 60 * 60 * 24
+
+CATEGORIES_CACHE_KEY = "course_categories"
+CATEGORIES_CACHE_TIMEOUT = 60 * 60 * 24
+
+# bumped on every course write, see core.search.InMemoryCourseSearch
+SEARCH_VERSION_KEY = "course_search_version"
+
+# bumped on every coupon write, a code change leaves no entry behind
+COUPON_VERSION_KEY = "coupon_version"
+
+
+def course_version_key(course_id) -> str:
+    return "course_version_%s" % course_id
+
+
+def get_course_version(course_id) -> int:
+    # a missing version starts from the current time so entries cached
+    # under an evicted version can never be served again
+    return cache.get_or_set(course_version_key(course_id), time.time_ns, None)
+
+
+def bump_course_version(course_id):
+    try:
+        cache.incr(course_version_key(course_id))
+    except ValueError:
+        cache.set(course_version_key(course_id), time.time_ns(), None)
+
+
+def course_syllabus_key(course_id) -> str:
+    return "course_syllabus_%s_%s" % (course_id, get_course_version(course_id))
+
+
+def get_search_version() -> int:
+    return cache.get_or_set(SEARCH_VERSION_KEY, time.time_ns, None)
+
+
+def bump_search_version() -> int:
+    try:
+        return cache.incr(SEARCH_VERSION_KEY)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(SEARCH_VERSION_KEY, version, None)
+        return version
+
+
+def invalidate_categories():
+    cache.delete(CATEGORIES_CACHE_KEY)
+
+
+def get_coupon_version() -> int:
+    return cache.get_or_set(COUPON_VERSION_KEY, time.time_ns, None)
+
+
+def bump_coupon_version():
+    try:
+        cache.incr(COUPON_VERSION_KEY)
+    except ValueError:
+        cache.set(COUPON_VERSION_KEY, time.time_ns(), None)
+
+
+def coupon_key(code: str) -> str:
+    return "coupon_%s_%s" % (code, get_coupon_version())
@@ -0,0 +1,228 @@
+"""
+Course completion certificates.
+
+Completed enrollments are queued as CertificateMint rows, and the
+minter run by the mint_certificates command mints them in batches of
+up to `batch_size` per mintBatch transaction on the certificate
+contract, or with one mint transaction each while the deployed contract
+has no mintBatch. Like the invoice submitter, it does not wait for
+blocks and checks receipts on later passes. The token ID of a
+certificate is its enrollment id as an integer, and mintBatch skips
+tokens that already exist, so a resent batch cannot mint twice.
+
+A certificate whose transaction is not mined within `submit_timeout`
+counts as minted when its token exists. Otherwise its transaction is
+replaced by one with the same nonce and a higher gas price, which also
+fills the nonce of a dropped transaction.
+
+The minter sends from its own CERTIFICATE_MINTER_* account. Nonces are
+counted per process, so sharing the invoice submitter's account would
+have both processes reuse nonces.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from loguru import logger
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from core.blockchain import BlockchainService, TransactionSender, has_functions
+from core.models.blockchain import CertificateMint, MintStatus
+
+
+class CertificateMinter:
+    def __init__(
+        self,
+        web3: Web3,
+        contract,
+        address: str,
+        private_key: str,
+        batch_size: int = 200,
+        max_attempts: int = 5,
+        submit_timeout: timedelta = timedelta(minutes=10),
+    ):
+        self.contract = contract
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.submit_timeout = submit_timeout
+        self.sender = TransactionSender(web3, address, private_key)
+        self.batched = has_functions(contract, "mintBatch")
+
+    @classmethod
+    def from_settings(cls, **kwargs):
+        address = settings.CERTIFICATE_MINTER_ADDRESS
+        private_key = settings.CERTIFICATE_MINTER_PRIVATE_KEY
+        if not address or not private_key:
+            raise ImproperlyConfigured(
+                "Set CERTIFICATE_MINTER_ADDRESS and CERTIFICATE_MINTER_PRIVATE_KEY"
+            )
+        if address.lower() == (settings.ADMIN_ADDRESS or "").lower():
+            raise ImproperlyConfigured(
+                "CERTIFICATE_MINTER_ADDRESS must not be the payment account"
+            )
+        return cls(
+            BlockchainService.get_web3(),
+            BlockchainService.get_certificate_contract(),
+            address,
+            private_key,
+            **kwargs,
+        )
+
+    def chunks(self, mints: list) -> list[list]:
+        size = self.batch_size if self.batched else 1
+        return [mints[start : start + size] for start in range(0, len(mints), size)]
+
+    def mint_call(self, mints: list[CertificateMint]):
+        recipients = [Web3.to_checksum_address(mint.recipient) for mint in mints]
+        token_ids = [int(mint.token_id) for mint in mints]
+        if self.batched:
+            return self.contract.functions.mintBatch(recipients, token_ids)
+        return self.contract.functions.mint(recipients[0], token_ids[0])
+
+    def is_minted(self, mint: CertificateMint) -> bool:
+        try:
+            owner = self.contract.functions.ownerOf(int(mint.token_id)).call()
+        except ContractLogicError:
+            # ownerOf reverts for tokens that do not exist
+            return False
+        return owner.lower() == mint.recipient.lower()
+
+    def mint_batch(self) -> int:
+        """
+        Send up to `batch_size` queued certificates in one mintBatch
+        transaction, or one mint transaction each on a contract without
+        mintBatch. Returns how many were sent.
+        """
+        with db_transaction.atomic():
+            mints = list(
+                CertificateMint.objects.select_for_update(skip_locked=True)
+                .filter(status=MintStatus.QUEUED)
+                .order_by("created_at")[: self.batch_size]
+            )
+            if not mints:
+                return 0
+            outcomes, sent = {}, 0
+            for chunk in self.chunks(mints):
+                try:
+                    nonce, tx_hash = self.sender.send(self.mint_call(chunk))
+                except Exception as err:
+                    logger.warning(f"Could not mint {len(chunk)} certificates: {err}")
+                    outcome = (False, None, "", str(err))
+                else:
+                    outcome = (True, nonce, tx_hash, "")
+                    sent += len(chunk)
+                outcomes.update((mint.pk, outcome) for mint in chunk)
+
+            now = timezone.now()
+            for mint in mints:
+                mint.attempts += 1
+                mint.updated_at = now
+                submitted, nonce, tx_hash, error = outcomes[mint.pk]
+                mint.nonce, mint.tx_hash, mint.error = nonce, tx_hash, error
+                if submitted:
+                    mint.status = MintStatus.SUBMITTED
+                elif mint.attempts >= self.max_attempts:
+                    mint.status = MintStatus.FAILED
+            CertificateMint.objects.bulk_update(
+                mints,
+                ["attempts", "nonce", "tx_hash", "status", "error", "updated_at"],
+            )
+        return sent
+
+    def check_receipts(self) -> int:
+        """
+        Record the outcome of mined batches, without waiting for pending
+        ones. Certificates not mined within `submit_timeout` are settled
+        by settle_expired. Returns how many certificates were settled.
+        """
+        submitted = list(
+            CertificateMint.objects.filter(status=MintStatus.SUBMITTED).order_by(
+                "nonce"
+            )[: self.batch_size * 10]
+        )
+        receipts = self.sender.receipts(mint.tx_hash for mint in submitted)
+        settled, expired, now = [], [], timezone.now()
+        for mint in submitted:
+            if not (receipt := receipts.get(mint.tx_hash)):
+                if mint.updated_at < now - self.submit_timeout:
+                    expired.append(mint)
+                continue
+            mint.updated_at = now
+            if receipt["status"] == 1:
+                mint.status = MintStatus.MINTED
+            elif not self.batched and self.is_minted(mint):
+                # mint reverts for a token that a resent transaction minted
+                mint.status = MintStatus.MINTED
+            else:
+                # a reverted batch minted nothing, queue it again
+                mint.status = (
+                    MintStatus.FAILED
+                    if mint.attempts >= self.max_attempts
+                    else MintStatus.QUEUED
+                )
+                mint.error = "mintBatch reverted"
+            settled.append(mint)
+        timed_out = []
+        if expired:
+            logger.warning(f"{len(expired)} certificates were not mined in time")
+            timed_out = self.settle_expired(expired)
+        CertificateMint.objects.bulk_update(
+            settled + expired,
+            ["status", "tx_hash", "attempts", "error", "updated_at"],
+        )
+        return len(settled) + len(timed_out)
+
+    def settle_expired(self, expired: list[CertificateMint]) -> list:
+        """
+        Settle the certificates in `expired` whose token exists or that are
+        out of attempts, and replace the transactions of the rest. Returns
+        the settled certificates.
+        """
+        settled, stuck, now = [], {}, timezone.now()
+        for mint in expired:
+            mint.updated_at = now
+            if self.is_minted(mint):
+                # minted by a transaction whose receipt we never saw
+                mint.status = MintStatus.MINTED
+                settled.append(mint)
+            elif mint.attempts >= self.max_attempts:
+                mint.status = MintStatus.FAILED
+                mint.error = f"not mined within {self.submit_timeout}"
+                settled.append(mint)
+            else:
+                stuck.setdefault(mint.tx_hash, []).append(mint)
+
+        for tx_hash, mints in stuck.items():
+            try:
+                _, replacement = self.sender.replace(
+                    self.mint_call(mints), mints[0].nonce, tx_hash
+                )
+            except Exception as err:
+                # e.g. the transaction was mined since, its receipt shows up
+                # on the next pass
+                logger.warning(f"Could not replace {tx_hash}: {err}")
+                replacement, error = tx_hash, str(err)
+            else:
+                error = f"replaced {tx_hash}, not mined within {self.submit_timeout}"
+            for mint in mints:
+                mint.attempts += 1
+                mint.tx_hash, mint.error = replacement, error
+        return settled
+
+    def run_once(self) -> tuple[int, int, int]:
+        queued = CertificateMint.objects.enqueue_completed()
+        sent = 0
+        while batch := self.mint_batch():
+            sent += batch
+            if batch < self.batch_size:
+                break
+        return queued, sent, self.check_receipts()
+
+    def run_forever(self, poll_interval: float = 10.0):
+        while True:
+            self.run_once()
+            time.sleep(poll_interval)
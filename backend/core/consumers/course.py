@@ -1,16 +1,34 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal
 
-from pydantic import BaseModel, ValidationError
-
-
-from channels.db import database_sync_to_async
+from channels.db import DatabaseSyncToAsync, database_sync_to_async
 from channels.exceptions import StopConsumer
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from django.db import connections
 from loguru import logger
+from pydantic import BaseModel, ValidationError
 
+from core.consumers.service import EVENT_HANDLERS, SocketTypes
 from core.models import course as course_models
 from core.utils import get_course_channel_name
-from core.consumers.service import EVENT_HANDLERS
+
+# event handlers write to the database and decode files, they run here so
+# neither the event loop nor the shared sync thread waits on them
+HANDLER_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.COURSE_EVENT_WORKERS, thread_name_prefix="course-events"
+)
+
+
+def run_handler(handler, course_id: str, data: dict) -> dict | None:
+    try:
+        return handler.process_data(course_id, data)
+    finally:
+        # the connection belongs to the event's context, which the
+        # close_old_connections() of DatabaseSyncToAsync does not see, so it
+        # would be left open
+        connections.close_all()
 
 
 class Event(BaseModel):
@@ -25,6 +43,13 @@ class Event(BaseModel):
 
 
 class CourseConsumer(AsyncJsonWebsocketConsumer):
+    # events of one connection being handled at once, further frames from
+    # that socket are turned away with an error until one finishes
+    MAX_PENDING_EVENTS = 4
+    # seconds a closing socket waits for its pending events to finish
+    # before they are cancelled
+    DISCONNECT_TIMEOUT = 5
+
     def is_course_participant(self, user):
         try:
             course = course_models.Course.objects.get(id=self.course_id)
@@ -38,10 +63,13 @@ class CourseConsumer(AsyncJsonWebsocketConsumer):
         self.course_id = self.scope["url_route"]["kwargs"]["id"]
         user = self.scope.get("user")
         if not user or user.is_anonymous:
-            self.close()
+            await self.close()
+            return
         self.course = await database_sync_to_async(self.is_course_participant)(user)
         self.user = user
         self.course_name = get_course_channel_name(self.course_id)
+        self.pending = asyncio.Semaphore(self.MAX_PENDING_EVENTS)
+        self.tasks = set()
         await self.channel_layer.group_add(self.course_name, self.channel_name)
         logger.info(f"{user} is connected to course {self.course_name}")
         await self.accept()
@@ -72,22 +100,60 @@ class CourseConsumer(AsyncJsonWebsocketConsumer):
             'data': dict
         }
         """
-        type = content["type"]
-        data: dict = content["data"]
         # validate data received from room
         try:
-            event = Event(type=type, data=data)
-            user = self.user
-            data = {"user": user, **data}
-            if event.type in EVENT_HANDLERS:
-                response = EVENT_HANDLERS[event.type].process_data(
-                    self.course_id, event.data
-                )
-                if response:
-                    await self.send_json(response)
+            event = Event(type=content.get("type"), data=content.get("data"))
         except ValidationError:
             await self.send_json({"type": "error", "data": "Error validating request"})
+            return
+        if event.type not in EVENT_HANDLERS:
+            return
+        # handle the event in the background so group messages keep
+        # flowing to this socket. Waiting for a free slot here would stop
+        # them too, so frames over the limit are rejected instead.
+        if self.pending.locked():
+            await self.send_json({"type": "error", "data": "Too many pending events"})
+            return
+        await self.pending.acquire()
+        task = asyncio.create_task(self.handle_event(event))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def handle_event(self, event: Event):
+        try:
+            handler = EVENT_HANDLERS[event.type]
+            data = {**event.data, "user": self.user}
+            response = await DatabaseSyncToAsync(
+                run_handler,
+                thread_sensitive=False,
+                executor=HANDLER_EXECUTOR,
+            )(handler, self.course_id, data)
+            if not response:
+                return
+            if response.get("type") == "error":
+                await self.send_json(response)
+                return
+            await self.channel_layer.group_send(
+                self.course_name,
+                {
+                    "type": SocketTypes.SEND_MESSAGE,
+                    "data": {"type": event.type, "data": response},
+                },
+            )
+        except Exception as err:
+            logger.exception(f"Could not handle {event.type} event: {err}")
+        finally:
+            self.pending.release()
 
     async def disconnect(self, close_code):
+        if not hasattr(self, "course_name"):
+            return
         await self.channel_layer.group_discard(self.course_name, self.channel_name)
-        self.close(close_code)
+        # pending events still finish and reach the rest of the course,
+        # unless they take too long
+        if self.tasks:
+            _, pending = await asyncio.wait(
+                set(self.tasks), timeout=self.DISCONNECT_TIMEOUT
+            )
+            for task in pending:
+                task.cancel()
@@ -39,7 +39,9 @@ from typing import Any
 
 from channels.layers import get_channel_layer
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
 from django.db import transaction, models
+from loguru import logger
 
 from core.utils import get_course_channel_name, base64_to_file
 from core.models import course
@@ -71,7 +73,7 @@ class ChatHandler(EventHandler):
     def process_data(cls, course_id: str, data: dict) -> dict | None:
         try:
             room_id = data["room_id"]
-            obj = course.CourseChatRoom.objects.get(id=room_id)
+            obj = course.CourseChatRoom.objects.get(id=room_id, course_id=course_id)
             user = data["user"]
 
             chat_data = cls.create_chat_data(data)
@@ -81,7 +83,11 @@ class ChatHandler(EventHandler):
 
             ct, ct_obj = chat_data
             message_obj = course.CourseMessage.objects.create(
-                course=obj, user=user, content_id=ct_obj.id, content_ct=ct
+                room=obj,
+                user=user,
+                type=data["type"],
+                content_id=ct_obj.id,
+                content_ct=ct,
             )
             return {
                 "id": message_obj.id_str,
@@ -93,13 +99,14 @@ class ChatHandler(EventHandler):
             return {"type": "error", "data": "course chat does not exist"}
         except InvalidDataException:
             return {"type": "error", "data": "provided data is invalid"}
-        except KeyError:
+        except (KeyError, ValidationError):
             return {"type": "error", "data": "provided data is invalid"}
-        except Exception:
+        except Exception as err:
+            logger.exception(f"Could not save chat message: {err}")
             return {"type": "error", "data": "unknown"}
 
     @classmethod
-    def create_chat_data(data: dict) -> tuple[ContentType, models.Model] | None:
+    def create_chat_data(cls, data: dict) -> tuple[ContentType, models.Model] | None:
         type = data["type"]
         if type == course.CourseMessageType.AUDIO:
             # create the file from sent base64
@@ -25,7 +25,19 @@ class TransactionInitializationError(APIException):
     default_detail = "Could not initialize transaction"
 
 
+class PriceIsUnavailable(APIException):
+    status_code = 503
+    default_code = "price_unavailable"
+    default_detail = "Token prices are unavailable, try again shortly"
+
+
 class TransactionVerificationFailure(APIException):
     status_code = 400
     default_code = "tx_verification_failed"
     default_detail = "transaction verification failure"
+
+
+class TransactionPending(APIException):
+    status_code = 409
+    default_code = "tx_pending"
+    default_detail = "Payment has not been confirmed yet"
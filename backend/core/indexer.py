@@ -0,0 +1,192 @@
+"""
+Payment verification from Payment contract events.
+
+Instead of calling checkPaymentStatus once per verify request, the
+indexer reads InvoicePaid and InvoiceCancelled logs in block ranges and
+updates the matching transactions in bulk. The last processed block is
+stored in a ChainCheckpoint, so a restarted indexer carries on where it
+stopped, and replaying a range is harmless because only transactions
+that are still unverified are touched.
+
+InvoicePaid indexes the ref, so its log only carries keccak256(ref).
+Transactions store that hash in `ref_hash` to be matched by it.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from loguru import logger
+from web3 import Web3
+
+from core.blockchain import BlockchainService
+from core.models.blockchain import ChainCheckpoint, InvoiceStatus
+from core.models.sales import Order
+from core.models.user import CRYPTO_PAYMENTS, Transaction, TransactionStatus
+
+UNVERIFIED = [TransactionStatus.INITAILIZED, TransactionStatus.PENDING]
+
+
+def ref_hash(ref: str) -> str:
+    return Web3.to_hex(Web3.keccak(text=ref))
+
+
+class PaymentEventIndexer:
+    CHECKPOINT = "payment_events"
+
+    def __init__(
+        self,
+        web3: Web3,
+        contract,
+        block_range: int = 2_000,
+        confirmations: int = 0,
+        start_block: int = 0,
+        client=None,
+    ):
+        self.web3 = web3
+        self.contract = contract
+        # a core.blockchain.PaymentBatchClient, for reconcile()
+        self.client = client
+        self.block_range = block_range
+        self.confirmations = confirmations
+        self.start_block = start_block
+        self.paid_topic = self.event_topic("InvoicePaid")
+        self.cancelled_topic = self.event_topic("InvoiceCancelled")
+
+    @classmethod
+    def from_settings(cls, **kwargs):
+        kwargs.setdefault(
+            "confirmations", getattr(settings, "PAYMENT_CONFIRMATIONS", 0)
+        )
+        kwargs.setdefault("client", BlockchainService.get_payment_batch_client())
+        return cls(
+            BlockchainService.get_web3(),
+            BlockchainService.get_payment_contract(),
+            **kwargs,
+        )
+
+    def event_topic(self, name: str) -> str:
+        abi = next(
+            entry
+            for entry in self.contract.abi
+            if entry["type"] == "event" and entry["name"] == name
+        )
+        inputs = ",".join(item["type"] for item in abi["inputs"])
+        return Web3.to_hex(Web3.keccak(text=f"{name}({inputs})"))
+
+    def get_checkpoint(self) -> ChainCheckpoint:
+        checkpoint, _ = ChainCheckpoint.objects.get_or_create(
+            name=self.CHECKPOINT,
+            defaults={"block_number": max(self.start_block - 1, 0)},
+        )
+        return checkpoint
+
+    def get_logs(self, from_block: int, to_block: int) -> list:
+        return self.web3.eth.get_logs(
+            {
+                "address": self.contract.address,
+                "fromBlock": from_block,
+                "toBlock": to_block,
+                # either event, one request per range
+                "topics": [[self.paid_topic, self.cancelled_topic]],
+            }
+        )
+
+    def parse_logs(self, logs) -> tuple[set[str], set[str]]:
+        """
+        Split logs into paid ref hashes and cancelled refs.
+        """
+        paid, cancelled = set(), set()
+        for log in logs:
+            topic = Web3.to_hex(log["topics"][0])
+            if topic == self.paid_topic:
+                paid.add(Web3.to_hex(log["topics"][1]))
+            elif topic == self.cancelled_topic:
+                event = self.contract.events.InvoiceCancelled().process_log(log)
+                cancelled.add(event["args"]["ref"])
+        return paid, cancelled
+
+    def apply(self, paid: set[str], cancelled: set[str]) -> int:
+        """
+        Verify the paid transactions and fail the cancelled ones. Returns
+        the number of transactions verified.
+        """
+        now = timezone.now()
+        unverified = Transaction.objects.filter(
+            status__in=UNVERIFIED, payment_method__in=CRYPTO_PAYMENTS
+        )
+        if cancelled:
+            unverified.filter(ref__in=cancelled).update(
+                status=TransactionStatus.FAILED, updated_at=now
+            )
+        if not paid:
+            return 0
+
+        transactions = list(
+            unverified.select_for_update()
+            .filter(ref_hash__in=paid)
+            .only("id", "item_ct", "item_id")
+        )
+        if not transactions:
+            return 0
+        Transaction.objects.filter(pk__in=[tx.pk for tx in transactions]).update(
+            status=TransactionStatus.VERIFIED, date_verified=now, updated_at=now
+        )
+        order_ct = ContentType.objects.get_for_model(Order)
+        order_ids = [tx.item_id for tx in transactions if tx.item_ct_id == order_ct.id]
+        Order.objects.filter(pk__in=order_ids).verify_paid()
+        for tx in transactions:
+            if tx.item_ct_id != order_ct.id:
+                tx.item.tx_verify()
+        return len(transactions)
+
+    def run_once(self) -> int:
+        """
+        Index every confirmed block after the checkpoint. Returns the
+        number of transactions verified.
+        """
+        head = self.web3.eth.block_number - self.confirmations
+        verified = 0
+        while True:
+            with db_transaction.atomic():
+                checkpoint = ChainCheckpoint.objects.select_for_update().get(
+                    pk=self.get_checkpoint().pk
+                )
+                from_block = checkpoint.block_number + 1
+                if from_block > head:
+                    return verified
+                to_block = min(from_block + self.block_range - 1, head)
+                paid, cancelled = self.parse_logs(self.get_logs(from_block, to_block))
+                verified += self.apply(paid, cancelled)
+                checkpoint.block_number = to_block
+                checkpoint.save(update_fields=["block_number", "updated_at"])
+            logger.info(
+                f"Indexed payment events in blocks {from_block}-{to_block}"
+            )
+
+    def reconcile(self, limit: int = 1_000) -> int:
+        """
+        Ask the contract about unverified transactions whose invoice is
+        on-chain, in checkPaymentStatuses calls, and verify the paid ones.
+        Catches payments whose events were missed. Returns the number of
+        transactions verified.
+        """
+        refs = list(
+            Transaction.objects.filter(
+                status__in=UNVERIFIED,
+                payment_method__in=CRYPTO_PAYMENTS,
+                invoice__status=InvoiceStatus.CONFIRMED,
+            )
+            .order_by("created_at")
+            .values_list("ref", flat=True)[:limit]
+        )
+        statuses = self.client.check_payment_statuses(refs)
+        paid = {ref_hash(ref) for ref, is_paid in statuses.items() if is_paid}
+        with db_transaction.atomic():
+            return self.apply(paid, set())
+
+    def run_forever(self, poll_interval: float = 5.0):
+        while True:
+            self.run_once()
+            time.sleep(poll_interval)
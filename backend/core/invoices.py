@@ -0,0 +1,220 @@
+"""
+Submission of Payment contract invoices off the request path.
+
+Creating an order only queues a PaymentInvoice. The submitter run by
+the submit_invoices command picks queued invoices up in batches and
+sends each batch as a single createInvoices transaction, or as one
+createInvoice transaction per invoice while the deployed contract has no
+batch methods. It does not wait for the transaction to be mined;
+receipts are checked on later passes.
+
+An invoice whose transaction is still not mined after `submit_timeout`
+is looked up on the contract, and only when it is not there is its
+transaction replaced: the same call is sent again with the same nonce
+and a higher gas price, so at most one of the two can be mined.
+Resending with a new nonce is not safe, createInvoice overwrites an
+existing invoice and a late original could reset a paid one.
+
+Transactions are sent through core.blockchain.TransactionSender.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from loguru import logger
+from web3 import Web3
+
+from core.blockchain import (
+    BlockchainService,
+    PaymentBatchClient,
+    TransactionSender,
+)
+from core.models.blockchain import InvoiceStatus, PaymentInvoice
+
+
+class InvoiceSubmitter:
+    def __init__(
+        self,
+        web3: Web3,
+        contract,
+        address: str,
+        private_key: str,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        submit_timeout: timedelta = timedelta(minutes=10),
+    ):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.submit_timeout = submit_timeout
+        self.client = PaymentBatchClient(contract, max_batch=batch_size)
+        self.sender = TransactionSender(web3, address, private_key)
+
+    @classmethod
+    def from_settings(cls, **kwargs):
+        return cls(
+            BlockchainService.get_web3(),
+            BlockchainService.get_payment_contract(),
+            settings.ADMIN_ADDRESS,
+            settings.PRIVATE_KEY,
+            **kwargs,
+        )
+
+    def validate(self, invoice: PaymentInvoice) -> str:
+        """
+        Why the contract cannot take `invoice`, or an empty string.
+        """
+        if not Web3.is_address(invoice.token):
+            return f"invalid token address {invoice.token!r}"
+        if invoice.amount <= 0:
+            return f"invalid amount {invoice.amount}"
+        return ""
+
+    def submit_batch(self) -> int:
+        """
+        Send up to `batch_size` queued invoices in one createInvoices
+        transaction, or one transaction each on a contract without batches.
+        Invoices the contract cannot take fail on their own without holding
+        back the rest. Returns how many were sent.
+        """
+        with db_transaction.atomic():
+            invoices = list(
+                PaymentInvoice.objects.select_for_update(skip_locked=True)
+                .filter(status=InvoiceStatus.QUEUED)
+                .select_related("transaction")
+                .order_by("created_at")[: self.batch_size]
+            )
+            if not invoices:
+                return 0
+            invalid = {}
+            for invoice in invoices:
+                if error := self.validate(invoice):
+                    invalid[invoice.pk] = error
+            batch = [invoice for invoice in invoices if invoice.pk not in invalid]
+
+            outcomes, sent = {}, 0
+            for chunk in self.client.chunks(batch):
+                try:
+                    (function,) = self.client.create_invoices(
+                        [
+                            (invoice.transaction.ref, invoice.amount, invoice.token)
+                            for invoice in chunk
+                        ]
+                    )
+                    nonce, tx_hash = self.sender.send(function)
+                except Exception as err:
+                    logger.warning(f"Could not send {len(chunk)} invoices: {err}")
+                    outcome = (False, None, "", str(err))
+                else:
+                    outcome = (True, nonce, tx_hash, "")
+                    sent += len(chunk)
+                outcomes.update((invoice.pk, outcome) for invoice in chunk)
+
+            now = timezone.now()
+            for invoice in invoices:
+                invoice.attempts += 1
+                invoice.updated_at = now
+                if invoice.pk in invalid:
+                    # sending it again cannot help
+                    invoice.status = InvoiceStatus.FAILED
+                    invoice.error = invalid[invoice.pk]
+                    continue
+                submitted, nonce, tx_hash, error = outcomes[invoice.pk]
+                invoice.nonce, invoice.tx_hash, invoice.error = nonce, tx_hash, error
+                if submitted:
+                    invoice.status = InvoiceStatus.SUBMITTED
+                elif invoice.attempts >= self.max_attempts:
+                    invoice.status = InvoiceStatus.FAILED
+            PaymentInvoice.objects.bulk_update(
+                invoices,
+                ["attempts", "nonce", "tx_hash", "status", "error", "updated_at"],
+            )
+        return sent
+
+    def check_receipts(self) -> int:
+        """
+        Record the outcome of mined invoices, without waiting for the ones
+        that are still pending. Invoices not mined within `submit_timeout`
+        are settled by settle_expired. Returns how many were mined.
+        """
+        submitted = list(
+            PaymentInvoice.objects.filter(status=InvoiceStatus.SUBMITTED)
+            .select_related("transaction")
+            .order_by("nonce")[: self.batch_size * 4]
+        )
+        receipts = self.sender.receipts(invoice.tx_hash for invoice in submitted)
+        mined, expired, now = [], [], timezone.now()
+        for invoice in submitted:
+            if not (receipt := receipts.get(invoice.tx_hash)):
+                if invoice.updated_at < now - self.submit_timeout:
+                    expired.append(invoice)
+                continue
+            invoice.updated_at = now
+            if receipt["status"] == 1:
+                invoice.status = InvoiceStatus.CONFIRMED
+            else:
+                invoice.status = InvoiceStatus.FAILED
+                invoice.error = "createInvoices reverted"
+            mined.append(invoice)
+        confirmed = []
+        if expired:
+            logger.warning(f"{len(expired)} invoices were not mined in time")
+            confirmed = self.settle_expired(expired)
+        PaymentInvoice.objects.bulk_update(
+            mined + expired,
+            ["status", "tx_hash", "attempts", "error", "updated_at"],
+        )
+        return len(mined) + len(confirmed)
+
+    def settle_expired(self, expired: list[PaymentInvoice]) -> list:
+        """
+        Confirm the invoices in `expired` that are on the contract, fail the
+        ones out of attempts and replace the transactions of the rest.
+        Returns the confirmed invoices.
+        """
+        created = self.client.created(
+            [invoice.transaction.ref for invoice in expired]
+        )
+        confirmed, stuck, now = [], {}, timezone.now()
+        for invoice in expired:
+            invoice.updated_at = now
+            if invoice.transaction.ref in created:
+                # mined by a transaction whose receipt we never saw
+                invoice.status = InvoiceStatus.CONFIRMED
+                confirmed.append(invoice)
+            elif invoice.attempts >= self.max_attempts:
+                invoice.status = InvoiceStatus.FAILED
+                invoice.error = f"not mined within {self.submit_timeout}"
+            else:
+                stuck.setdefault(invoice.tx_hash, []).append(invoice)
+
+        for tx_hash, invoices in stuck.items():
+            try:
+                (function,) = self.client.create_invoices(
+                    [
+                        (invoice.transaction.ref, invoice.amount, invoice.token)
+                        for invoice in invoices
+                    ]
+                )
+                _, replacement = self.sender.replace(
+                    function, invoices[0].nonce, tx_hash
+                )
+            except Exception as err:
+                # e.g. the transaction was mined since, its receipt shows up
+                # on the next pass
+                logger.warning(f"Could not replace {tx_hash}: {err}")
+                replacement, error = tx_hash, str(err)
+            else:
+                error = f"replaced {tx_hash}, not mined within {self.submit_timeout}"
+            for invoice in invoices:
+                invoice.attempts += 1
+                invoice.tx_hash, invoice.error = replacement, error
+        return confirmed
+
+    def run_forever(self, poll_interval: float = 2.0):
+        while True:
+            sent = self.submit_batch()
+            self.check_receipts()
+            if sent < self.batch_size:
+                time.sleep(poll_interval)
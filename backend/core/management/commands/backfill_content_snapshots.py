@@ -0,0 +1,65 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import course as course_models
+
+
+class Command(BaseCommand):
+    help = "Copy item title/type/duration onto Content and Resource rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        updated = self.backfill(
+            course_models.Content,
+            [course_models.Video, course_models.Book, course_models.Text],
+            ["title", "type", "duration"],
+            batch_size,
+        )
+        self.stdout.write(f"{updated} contents updated")
+        updated = self.backfill(
+            course_models.Resource,
+            [course_models.Link],
+            ["title"],
+            batch_size,
+        )
+        self.stdout.write(self.style.SUCCESS(f"{updated} resources updated"))
+
+    @transaction.atomic
+    def backfill(self, model, item_models, fields, batch_size):
+        updated = 0
+        for item_model in item_models:
+            ct = ContentType.objects.get_for_model(item_model)
+            # only the snapshot columns are read, never e.g. Text.text
+            item_fields = ["title"]
+            if "duration" in fields and hasattr(item_model, "duration"):
+                item_fields.append("duration")
+            rows = model.objects.filter(item_ct=ct).only("item_id", *fields)
+            for batch in self.batches(rows.iterator(chunk_size=batch_size), batch_size):
+                items = item_model.objects.only(*item_fields).in_bulk(
+                    [row.item_id for row in batch]
+                )
+                for row in batch:
+                    if item := items.get(row.item_id):
+                        row.title = item.title
+                        if "type" in fields:
+                            row.type = item_model._meta.model_name
+                        if "duration" in fields:
+                            row.duration = getattr(item, "duration", None)
+                model.objects.bulk_update(batch, fields)
+                updated += len(batch)
+        return updated
+
+    @staticmethod
+    def batches(iterable, size):
+        batch = []
+        for row in iterable:
+            batch.append(row)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
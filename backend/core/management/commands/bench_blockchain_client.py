@@ -0,0 +1,71 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from web3 import Web3
+
+from core.blockchain import BlockchainClient
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare building Web3 and contracts per call with the shared "
+        "BlockchainClient. With --rpc, also time eth_blockNumber calls over "
+        "fresh and pooled connections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=1_000)
+        parser.add_argument("--rpc", action="store_true")
+
+    def timed(self, func, calls) -> list[float]:
+        timings = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def report(self, name, timings):
+        self.stdout.write(
+            f"{name:>28}: mean {statistics.fmean(timings):.3f}ms, "
+            f"max {max(timings):.3f}ms"
+        )
+
+    def handle(self, *args, **options):
+        calls = options["calls"]
+        contract_file = settings.CONTRACT_DIR / "data.json"
+
+        start = time.perf_counter()
+        client = BlockchainClient.from_settings()
+        client.contract("payment")
+        self.report("client startup", [(time.perf_counter() - start) * 1000])
+
+        def unpooled_contract():
+            # what every get_payment_contract() call used to do
+            with open(contract_file) as file:
+                data = json.load(file)
+            web3 = Web3(Web3.HTTPProvider(settings.PROVIDER_URL))
+            web3.eth.contract(
+                address=data["payment"]["address"], abi=data["payment"]["abi"]
+            )
+
+        self.report("contract per call", self.timed(unpooled_contract, calls))
+        self.report(
+            "memoized contract",
+            self.timed(lambda: client.contract("payment"), calls),
+        )
+
+        if options["rpc"]:
+            rpc_calls = min(calls, 100)
+
+            def fresh_connection():
+                Web3(Web3.HTTPProvider(settings.PROVIDER_URL)).eth.block_number
+
+            self.report("rpc, new connection", self.timed(fresh_connection, rpc_calls))
+            self.report(
+                "rpc, pooled connection",
+                self.timed(lambda: client.web3.eth.block_number, rpc_calls),
+            )
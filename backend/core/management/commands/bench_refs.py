@@ -0,0 +1,57 @@
+import secrets
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models.sales import Order
+from core.models.user import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare order inserts per second with probed random refs against "
+        "generated refs. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=5_000)
+
+    def probed_ref(self):
+        # the previous scheme, trimmed to fit the 20 character column
+        while True:
+            ref = secrets.token_urlsafe(15)
+            if not Order.objects.filter(ref=ref).exists():
+                return ref
+
+    def run(self, user, count, probe):
+        start = time.perf_counter()
+        for _ in range(count):
+            order = Order(user=user)
+            if probe:
+                order.ref = self.probed_ref()
+            order.save()
+        return count / (time.perf_counter() - start)
+
+    def handle(self, *args, **options):
+        count = options["orders"]
+        results = {}
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=f"bench-{secrets.token_hex(6)}@example.com",
+                    password=secrets.token_urlsafe(12),
+                )
+                results["probed refs"] = self.run(user, count, probe=True)
+                results["generated refs"] = self.run(user, count, probe=False)
+                raise Rollback
+        except Rollback:
+            pass
+        for name, rate in results.items():
+            self.stdout.write(f"{name:>15}: {rate:,.0f} inserts/s")
+        speedup = results["generated refs"] / results["probed refs"]
+        self.stdout.write(self.style.SUCCESS(f"{speedup:.2f}x"))
@@ -0,0 +1,70 @@
+import itertools
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from core.search import InvertedIndex, SearchDocument
+
+
+class Command(BaseCommand):
+    help = "Benchmark the in-process course search index on synthetic courses"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=1_000)
+        parser.add_argument("--vocabulary", type=int, default=20_000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        words = [f"word{i}" for i in range(options["vocabulary"])]
+        # zipf-like word frequencies, like real course text
+        weights = list(
+            itertools.accumulate(1 / (rank + 1) for rank in range(len(words)))
+        )
+        categories = [f"category-{i}" for i in range(40)]
+        owners = [uuid.uuid4() for _ in range(2_000)]
+
+        index = InvertedIndex()
+        start = time.perf_counter()
+        for _ in range(options["courses"]):
+            index.add(
+                SearchDocument(
+                    id=uuid.uuid4(),
+                    title=" ".join(rng.choices(words, cum_weights=weights, k=6)),
+                    description=" ".join(rng.choices(words, cum_weights=weights, k=60)),
+                    price=Decimal(rng.randint(0, 200)),
+                    owner_id=rng.choice(owners),
+                    categories=tuple(rng.sample(categories, 2)),
+                )
+            )
+        build_time = time.perf_counter() - start
+        self.stdout.write(f"Indexed {len(index)} courses in {build_time:.2f}s")
+
+        timings = []
+        for _ in range(options["queries"]):
+            # users search for specific words, not the most frequent ones
+            query = " ".join(rng.sample(words, rng.randint(1, 3)))
+            category = rng.choice([None, rng.choice(categories)])
+            start = time.perf_counter()
+            index.search(query, category)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+
+        def percentile(p):
+            return timings[int(p * (len(timings) - 1))]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(timings)} queries: "
+                f"mean {statistics.mean(timings):.2f}ms, "
+                f"p50 {percentile(0.50):.2f}ms, "
+                f"p95 {percentile(0.95):.2f}ms, "
+                f"p99 {percentile(0.99):.2f}ms"
+            )
+        )
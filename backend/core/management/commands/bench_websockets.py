@@ -0,0 +1,214 @@
+import asyncio
+import json
+import secrets
+import statistics
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+import websockets
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from core.consumers.service import SocketTypes, StrEventTypes
+from core.models import course as course_models
+from core.models.user import Instructor, User
+from core.utils import get_course_channel_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many ws/course/<id>/ connections to a running server and "
+        "measure broadcast latency of announcement and chat events. The "
+        "server and this command must share a Redis channel layer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="ws://127.0.0.1:8000")
+        parser.add_argument("--connections", type=int, default=2_000)
+        parser.add_argument("--messages", type=int, default=20)
+        parser.add_argument(
+            "--interval", type=float, default=0.5, help="seconds between events"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=200, help="handshakes in flight"
+        )
+        parser.add_argument(
+            "--events",
+            nargs="+",
+            choices=["announcement", "chat"],
+            default=["announcement", "chat"],
+        )
+
+    @transaction.atomic
+    def create_course(self):
+        """
+        A throwaway course with a chat room and one enrolled student that
+        every connection logs in as.
+        """
+        suffix = secrets.token_hex(6)
+        owner = User.objects.create_user(
+            email=f"bench-owner-{suffix}@example.com",
+            password=secrets.token_urlsafe(12),
+        )
+        instructor = Instructor.objects.create(user=owner, title="Bench", bio="")
+        course = course_models.Course.objects.create(
+            owner=instructor,
+            title=f"Websocket bench {suffix}",
+            description="",
+            price=Decimal("0.00"),
+        )
+        room = course_models.CourseChatRoom.objects.create(course=course)
+        student = User.objects.create_user(
+            email=f"bench-student-{suffix}@example.com",
+            password=secrets.token_urlsafe(12),
+        )
+        course_models.CourseStudent.objects.create(user=student, course=course)
+        client = Client()
+        client.force_login(student)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        return course, room, [owner, student], session
+
+    def handle(self, *args, **options):
+        course, room, users, session = self.create_course()
+        try:
+            results = asyncio.run(self.run(course, room, session, options))
+        finally:
+            course.delete()
+            for user in users:
+                user.delete()
+        for event, (latencies, delivered, expected) in results.items():
+            self.report(event, latencies, delivered, expected)
+
+    def report(self, event, latencies, delivered, expected):
+        if not latencies:
+            self.stdout.write(f"{event}: nothing delivered")
+            return
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[int(p * (len(latencies) - 1))]
+
+        self.stdout.write(
+            f"{event:>12}: {delivered}/{expected} delivered, "
+            f"p50 {percentile(0.5):.1f}ms, p95 {percentile(0.95):.1f}ms, "
+            f"p99 {percentile(0.99):.1f}ms, max {latencies[-1]:.1f}ms, "
+            f"mean {statistics.fmean(latencies):.1f}ms"
+        )
+
+    async def connect(self, uri, session, semaphore):
+        async with semaphore:
+            return await websockets.connect(
+                uri,
+                extra_headers=[
+                    ("Cookie", f"{settings.SESSION_COOKIE_NAME}={session}")
+                ],
+                origin=self.origin,
+                max_queue=None,
+                open_timeout=30,
+            )
+
+    async def listen(self, ws, arrivals):
+        """
+        Record when each tagged message reaches this connection.
+        """
+        try:
+            async for raw in ws:
+                received = time.perf_counter()
+                message = json.loads(raw)
+                tag = self.tag(message)
+                if tag:
+                    arrivals[tag].append(received)
+        except websockets.ConnectionClosed:
+            pass
+
+    def tag(self, message) -> str | None:
+        data = message.get("data")
+        if isinstance(data, dict) and "bench_tag" in data:
+            return data["bench_tag"]
+        content = message.get("content") or (
+            data.get("content") if isinstance(data, dict) else None
+        )
+        if isinstance(content, str) and content.startswith("bench:"):
+            return content
+        return None
+
+    async def run(self, course, room, session, options):
+        base = options["url"].rstrip("/")
+        self.origin = base.replace("ws://", "http://").replace("wss://", "https://")
+        uri = f"{base}/ws/course/{course.id}/"
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        start = time.perf_counter()
+        connections = await asyncio.gather(
+            *(
+                self.connect(uri, session, semaphore)
+                for _ in range(options["connections"])
+            ),
+            return_exceptions=True,
+        )
+        sockets = [ws for ws in connections if not isinstance(ws, Exception)]
+        failed = len(connections) - len(sockets)
+        self.stdout.write(
+            f"{len(sockets)} connections open in "
+            f"{time.perf_counter() - start:.1f}s, {failed} failed"
+        )
+        if not sockets:
+            raise CommandError("Could not open any connection")
+
+        arrivals = defaultdict(list)
+        listeners = [asyncio.create_task(self.listen(ws, arrivals)) for ws in sockets]
+        layer = get_channel_layer()
+        sent = {}
+
+        for event in options["events"]:
+            for seq in range(options["messages"]):
+                tag = f"bench:{event}:{seq}"
+                sent[tag] = (event, time.perf_counter())
+                if event == "announcement":
+                    await layer.group_send(
+                        get_course_channel_name(course.id),
+                        {
+                            "type": SocketTypes.SEND_MESSAGE,
+                            "data": {
+                                "type": str(StrEventTypes.announcement),
+                                "data": {"bench_tag": tag},
+                            },
+                        },
+                    )
+                else:
+                    await sockets[0].send(
+                        json.dumps(
+                            {
+                                "type": "chat",
+                                "data": {
+                                    "room_id": str(room.id),
+                                    "type": "text",
+                                    "content": tag,
+                                },
+                            }
+                        )
+                    )
+                await asyncio.sleep(options["interval"])
+
+        # let the last events drain
+        await asyncio.sleep(max(2.0, options["interval"]))
+        for ws in sockets:
+            await ws.close()
+        await asyncio.gather(*listeners)
+
+        results = {}
+        for event in options["events"]:
+            latencies, delivered, expected = [], 0, 0
+            for tag, (sent_event, sent_at) in sent.items():
+                if sent_event != event:
+                    continue
+                expected += len(sockets)
+                received = arrivals.get(tag, [])
+                delivered += len(received)
+                latencies.extend((at - sent_at) * 1000 for at in received)
+            results[event] = (latencies, delivered, expected)
+        return results
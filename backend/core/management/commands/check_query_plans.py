@@ -0,0 +1,89 @@
+import re
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import course as course_models
+from core.models import notification as notification_models
+from core.models import sales as sales_models
+from core.models import user as user_models
+
+SQLITE_FULL_SCAN = re.compile(r"\bSCAN \S+\s*$", re.MULTILINE)
+
+
+def hot_queries():
+    """
+    The filter/order pairs of the service and view methods that run on
+    every page load. Keep in sync with the composite indexes in
+    core.models.
+    """
+    pk = uuid.uuid4()
+    return {
+        "course questions": course_models.CourseQuestion.objects.filter(
+            course_id=pk
+        ).order_by("-created_at"),
+        "question comments": course_models.CourseQuestionComment.objects.filter(
+            question_id=pk
+        ).order_by("-created_at"),
+        "content notes": course_models.ContentNote.objects.filter(
+            user_id=pk, content_id=pk
+        ).order_by("-created_at"),
+        "chat messages": course_models.CourseMessage.objects.filter(
+            room_id=pk
+        ).order_by("-created_at"),
+        "content progress": course_models.ContentProgress.objects.filter(
+            student_id=pk, content_id=pk
+        ),
+        "module contents": course_models.Content.objects.filter(
+            module_id=pk
+        ).order_by("order"),
+        "content resources": course_models.Resource.objects.filter(
+            content_id=pk
+        ).order_by("order"),
+        "notifications": notification_models.Notification.objects.filter(
+            user_id=pk
+        ).order_by("-created_at"),
+        "unread notifications": notification_models.Notification.objects.filter(
+            user_id=pk, is_read=False
+        ),
+        "wallet transactions": user_models.WalletTransaction.objects.filter(
+            wallet_id=pk
+        ).order_by("-created_at"),
+        "order history": sales_models.Order.objects.filter(user_id=pk).order_by(
+            "-created_at"
+        ),
+        "coupon by code": sales_models.Coupon.objects.filter(code="CODE"),
+    }
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot queries and fail if any of them scans a whole table"
+
+    def handle(self, *args, **options):
+        failures = []
+        for name, queryset in hot_queries().items():
+            plan = self.explain(queryset)
+            if self.is_full_scan(plan):
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: full scan\n{plan}"))
+            elif options["verbosity"] > 1:
+                self.stdout.write(f"{name}:\n{plan}")
+        if failures:
+            raise CommandError(f"Full table scans in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("All hot queries use an index"))
+
+    def explain(self, queryset) -> str:
+        if connection.vendor != "postgresql":
+            return queryset.explain()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # empty tables would always be scanned, only fall back to
+                # a sequential scan when no index can serve the query
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
+
+    def is_full_scan(self, plan: str) -> bool:
+        if connection.vendor == "postgresql":
+            return "Seq Scan" in plan
+        return bool(SQLITE_FULL_SCAN.search(plan))
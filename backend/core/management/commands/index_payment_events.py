@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from core.indexer import PaymentEventIndexer
+
+
+class Command(BaseCommand):
+    help = "Verify crypto transactions from Payment contract events"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from-block", type=int, default=0)
+        parser.add_argument("--block-range", type=int, default=2_000)
+        parser.add_argument("--confirmations", type=int)
+        parser.add_argument(
+            "--once", action="store_true", help="stop when caught up"
+        )
+        parser.add_argument("--poll-interval", type=float, default=5.0)
+        parser.add_argument(
+            "--reconcile",
+            action="store_true",
+            help="check unverified invoices against the contract and stop",
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {
+            "block_range": options["block_range"],
+            "start_block": options["from_block"],
+        }
+        if options["confirmations"] is not None:
+            kwargs["confirmations"] = options["confirmations"]
+        indexer = PaymentEventIndexer.from_settings(**kwargs)
+        if options["reconcile"]:
+            verified = indexer.reconcile()
+            self.stdout.write(
+                self.style.SUCCESS(f"{verified} transactions verified")
+            )
+        elif options["once"]:
+            verified = indexer.run_once()
+            self.stdout.write(
+                self.style.SUCCESS(f"{verified} transactions verified")
+            )
+        else:
+            indexer.run_forever(options["poll_interval"])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from core.certificates import CertificateMinter
+
+
+class Command(BaseCommand):
+    help = "Queue certificates for completed courses and mint them in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument(
+            "--once", action="store_true", help="stop when the queue is empty"
+        )
+        parser.add_argument("--poll-interval", type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        minter = CertificateMinter.from_settings(
+            batch_size=options["batch_size"],
+            max_attempts=options["max_attempts"],
+        )
+        if options["once"]:
+            queued, sent, settled = minter.run_once()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{queued} queued, {sent} sent, {settled} settled"
+                )
+            )
+        else:
+            minter.run_forever(options["poll_interval"])
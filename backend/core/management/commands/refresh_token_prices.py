@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.prices import PriceUnavailable, get_price_oracle
+from core.utils import TOKEN_DECIMAL
+
+
+class Command(BaseCommand):
+    help = "Refresh cached token prices so checkouts never wait on the feed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="keep refreshing every INTERVAL seconds",
+        )
+
+    def refresh(self):
+        oracle = get_price_oracle()
+        for token in TOKEN_DECIMAL:
+            try:
+                price = oracle.refresh(token)
+            except PriceUnavailable as err:
+                self.stderr.write(str(err))
+            else:
+                self.stdout.write(f"{token or '<unset>'}: {price} USD")
+
+    def handle(self, *args, **options):
+        self.refresh()
+        while options["interval"]:
+            time.sleep(options["interval"])
+            self.refresh()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.models.sales import CouponReservation
+
+
+class Command(BaseCommand):
+    help = "Give back coupon uses reserved by orders that were never paid"
+
+    def handle(self, *args, **options):
+        released = CouponReservation.objects.release_expired()
+        self.stdout.write(self.style.SUCCESS(f"{released} reservations released"))
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from core.models.sales import Coupon, CouponExhausted
+
+
+class Command(BaseCommand):
+    help = (
+        "Redeem a throwaway coupon from many threads at once and check "
+        "that it is never oversold. Use a PostgreSQL database, SQLite "
+        "serializes all writers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--uses", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--shards", type=int, default=1)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        coupon = Coupon.objects.create(
+            code=f"STRESS{now:%H%M%S%f}"[:20],
+            discount=10,
+            valid_from=now - timezone.timedelta(hours=1),
+            valid_to=now + timezone.timedelta(hours=1),
+            uses=options["uses"],
+        )
+        if options["shards"] > 1:
+            coupon.shard(options["shards"])
+
+        redeemed = []
+        lock = threading.Lock()
+
+        def redeem():
+            count = 0
+            try:
+                while True:
+                    try:
+                        coupon.take_uses(1)
+                    except CouponExhausted:
+                        break
+                    except OperationalError:
+                        # sqlite "database is locked", try again
+                        continue
+                    count += 1
+            finally:
+                connection.close()
+                with lock:
+                    redeemed.append(count)
+
+        threads = [
+            threading.Thread(target=redeem) for _ in range(options["threads"])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        coupon.refresh_from_db()
+        if options["shards"] > 1:
+            remaining = sum(coupon.shards.values_list("uses", flat=True))
+        else:
+            remaining = coupon.uses
+        total = sum(redeemed)
+        coupon.delete()
+
+        self.stdout.write(
+            f"{total} redemptions by {len(threads)} threads in {elapsed:.2f}s "
+            f"({total / elapsed if elapsed else total:.0f}/s), {remaining} left"
+        )
+        if total != options["uses"] or remaining != 0:
+            raise CommandError(f"Expected {options['uses']} redemptions")
+        self.stdout.write(self.style.SUCCESS("Coupon was not oversold"))
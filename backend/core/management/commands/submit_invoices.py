@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.invoices import InvoiceSubmitter
+
+
+class Command(BaseCommand):
+    help = "Send queued payment invoices to the Payment contract"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument(
+            "--once", action="store_true", help="send one batch and stop"
+        )
+        parser.add_argument("--poll-interval", type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        submitter = InvoiceSubmitter.from_settings(
+            batch_size=options["batch_size"],
+            max_attempts=options["max_attempts"],
+        )
+        if options["once"]:
+            sent = submitter.submit_batch()
+            mined = submitter.check_receipts()
+            self.stdout.write(
+                self.style.SUCCESS(f"{sent} invoices sent, {mined} mined")
+            )
+        else:
+            submitter.run_forever(options["poll_interval"])
@@ -0,0 +1,33 @@
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from core.models.sales import Order
+
+
+class Command(BaseCommand):
+    help = "Mark orders as paid in batches, e.g. when replaying payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("refs", nargs="*", help="order refs")
+        parser.add_argument(
+            "--file", help="file with one order ref per line, '-' for stdin"
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def read_refs(self, refs, path):
+        yield from refs
+        if not path:
+            return
+        with (sys.stdin if path == "-" else open(path)) as lines:
+            for line in lines:
+                if ref := line.strip():
+                    yield ref
+
+    def handle(self, *args, **options):
+        refs = self.read_refs(options["refs"], options["file"])
+        verified = 0
+        while batch := list(islice(refs, options["batch_size"])):
+            verified += Order.objects.filter(ref__in=batch).verify_paid()
+        self.stdout.write(self.style.SUCCESS(f"{verified} orders marked as paid"))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_notification_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='duration',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='title',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='title',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='duration',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='content',
+            name='type',
+            field=models.CharField(choices=[('video', 'Video'), ('book', 'Book'), ('text', 'Text')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-18 07:41
+
+from django.db import migrations, models
+
+# model -> parent field of its OrderField
+ORDERED_MODELS = {
+    "courseobjective": "course_id",
+    "courserequirement": "course_id",
+    "module": "course_id",
+    "content": "module_id",
+    "resource": "content_id",
+}
+
+
+def renumber_duplicates(apps, schema_editor):
+    """
+    Renumber the rows of every parent that has two rows with the same
+    order, keeping their current order, so the constraints can be added.
+    """
+    for model_name, parent in ORDERED_MODELS.items():
+        model = apps.get_model("core", model_name)
+        parents = (
+            model.objects.values(parent, "order")
+            .annotate(rows=models.Count("id"))
+            .filter(rows__gt=1)
+            .values_list(parent, flat=True)
+            .distinct()
+        )
+        for parent_id in list(parents):
+            rows = list(
+                model.objects.filter(**{parent: parent_id}).order_by(
+                    "order", "created_at"
+                )
+            )
+            for i, row in enumerate(rows):
+                row.order = i
+            model.objects.bulk_update(rows, ["order"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_item_snapshots'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicates, migrations.RunPython.noop),
+    ]
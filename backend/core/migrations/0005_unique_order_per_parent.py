@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-18 08:59
+
+import core.models.base
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0004_renumber_duplicate_orders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='content',
+            name='order',
+            field=core.models.base.OrderField(for_fields=['module'], verbose_name='Order'),
+        ),
+        migrations.AlterField(
+            model_name='courseobjective',
+            name='order',
+            field=core.models.base.OrderField(for_fields=['course'], verbose_name='Order'),
+        ),
+        migrations.AlterField(
+            model_name='courserequirement',
+            name='order',
+            field=core.models.base.OrderField(for_fields=['course'], verbose_name='Order'),
+        ),
+        migrations.AlterField(
+            model_name='module',
+            name='order',
+            field=core.models.base.OrderField(for_fields=['course'], verbose_name='Order'),
+        ),
+        migrations.AlterField(
+            model_name='resource',
+            name='order',
+            field=core.models.base.OrderField(for_fields=['content']),
+        ),
+        migrations.AddConstraint(
+            model_name='content',
+            constraint=models.UniqueConstraint(fields=('module', 'order'), name='content_order_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='courseobjective',
+            constraint=models.UniqueConstraint(fields=('course', 'order'), name='course_objective_order_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='courserequirement',
+            constraint=models.UniqueConstraint(fields=('course', 'order'), name='course_requirement_order_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='module',
+            constraint=models.UniqueConstraint(fields=('course', 'order'), name='module_order_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='resource',
+            constraint=models.UniqueConstraint(fields=('content', 'order'), name='resource_order_unique'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0005_unique_order_per_parent'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='coursestudent',
+            options={'ordering': ('-created_at',)},
+        ),
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ('-created_at',)},
+        ),
+        migrations.AlterField(
+            model_name='coupon',
+            name='code',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='contentnote',
+            index=models.Index(fields=['user', 'content', '-created_at'], name='core_conten_user_id_bd2233_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contentprogress',
+            index=models.Index(fields=['student', 'content'], name='core_conten_student_9b9ea7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursemessage',
+            index=models.Index(fields=['room', '-created_at'], name='core_course_room_id_9a4619_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursequestion',
+            index=models.Index(fields=['course', '-created_at'], name='core_course_course__db7b34_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursequestioncomment',
+            index=models.Index(fields=['question', '-created_at'], name='core_course_questio_79a6fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at'], name='core_notifi_user_id_1cc5b6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read'], name='core_notifi_user_id_cb8f07_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='core_order_user_id_fdcf24_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['item_ct', 'item_id'], name='core_resour_item_ct_b353d6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', '-created_at'], name='core_wallet_wallet__2dd7eb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'type', '-created_at'], name='core_wallet_wallet__f35432_idx'),
+        ),
+    ]
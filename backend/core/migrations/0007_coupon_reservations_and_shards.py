@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-18 09:06
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.IntegerField(choices=[(0, 'New'), (1, 'Paid'), (2, 'Rejected')], default=0),
+        ),
+        migrations.CreateModel(
+            name='CouponUseShard',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('index', models.PositiveIntegerField()),
+                ('uses', models.PositiveIntegerField()),
+                ('coupon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='core.coupon')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CouponReservation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('uses', models.PositiveIntegerField()),
+                ('status', models.IntegerField(choices=[(0, 'Reserved'), (1, 'Consumed'), (2, 'Released')], default=0)),
+                ('expires_at', models.DateTimeField()),
+                ('coupon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.coupon')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='core.order')),
+                ('shard', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.couponuseshard')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='couponuseshard',
+            constraint=models.UniqueConstraint(fields=('coupon', 'index'), name='coupon_shard_index_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='couponreservation',
+            index=models.Index(fields=['status', 'expires_at'], name='core_coupon_status_f988d5_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 08:02
+
+from django.db import migrations
+from web3 import Web3
+
+BATCH_SIZE = 1000
+
+
+def backfill_ref_hash(apps, schema_editor):
+    """
+    Hash the refs of transactions saved before ref_hash was filled on
+    save, so the payment indexer can match their events.
+    """
+    Transaction = apps.get_model("core", "Transaction")
+    missing = Transaction.objects.filter(ref_hash="").exclude(ref="").only("id", "ref")
+    # hashed rows drop out of `missing`, so each batch is the next one
+    while batch := list(missing[:BATCH_SIZE]):
+        for transaction in batch:
+            # the same hash as core.indexer.ref_hash
+            transaction.ref_hash = Web3.to_hex(Web3.keccak(text=transaction.ref))
+        Transaction.objects.bulk_update(batch, ["ref_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_payment_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ref_hash, migrations.RunPython.noop),
+    ]
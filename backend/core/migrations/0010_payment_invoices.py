@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 09:15
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_backfill_transaction_ref_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentInvoice',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('token', models.CharField(max_length=42)),
+                ('amount', models.DecimalField(decimal_places=0, max_digits=78)),
+                ('status', models.IntegerField(choices=[(0, 'Queued'), (1, 'Submitted'), (2, 'Confirmed'), (3, 'Failed')], default=0)),
+                ('nonce', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('tx_hash', models.CharField(blank=True, max_length=66)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('transaction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='invoice', to='core.transaction')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+                'abstract': False,
+                'indexes': [models.Index(fields=['status', 'created_at'], name='core_paymen_status_2d7269_idx')],
+            },
+        ),
+    ]
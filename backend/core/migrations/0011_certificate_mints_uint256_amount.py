@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 09:19
+
+import core.models.base
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_payment_invoices'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentinvoice',
+            name='amount',
+            field=core.models.base.Uint256Field(max_length=78),
+        ),
+        migrations.CreateModel(
+            name='CertificateMint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('recipient', models.CharField(max_length=42)),
+                ('token_id', core.models.base.Uint256Field(max_length=78, unique=True)),
+                ('status', models.IntegerField(choices=[(0, 'Queued'), (1, 'Submitted'), (2, 'Minted'), (3, 'Failed')], default=0)),
+                ('nonce', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('tx_hash', models.CharField(blank=True, max_length=66)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('course_student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='certificate', to='core.coursestudent')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+                'abstract': False,
+                'indexes': [models.Index(fields=['status', 'created_at'], name='core_certif_status_b33954_idx')],
+            },
+        ),
+    ]
@@ -4,8 +4,10 @@ from typing import Any
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, models, router, transaction
+
+from core.refs import generate_ref
 
 
 class NotificationType(models.TextChoices):
@@ -26,31 +28,231 @@ class BaseModel(models.Model):
         return str(self.id)
 
 
+class UniqueRefMixin:
+    """
+    Fills an empty `ref` with core.refs.generate_ref() on insert. Refs are
+    not checked against the database beforehand, a clash with the unique
+    constraint is retried with a new ref instead.
+    """
+
+    REF_RETRIES = 3
+
+    def save(self, *args, **kwargs):
+        if self.ref:
+            return super().save(*args, **kwargs)
+        for attempt in range(self.REF_RETRIES):
+            self.ref = generate_ref()
+            try:
+                # a savepoint keeps an outer transaction usable after a clash
+                with transaction.atomic(using=kwargs.get("using")):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                clashed = type(self)._default_manager.filter(ref=self.ref).exists()
+                self.ref = ""
+                if not clashed or attempt == self.REF_RETRIES - 1:
+                    raise
+
+
 class OrderField(models.PositiveIntegerField):
+    """
+    Allocates the next order value among the rows sharing `for_fields`.
+
+    Inside a transaction the parent rows of `for_fields` are locked with
+    SELECT ... FOR UPDATE until the transaction ends, so concurrent
+    inserts into the same parent cannot get the same value. Models should
+    inherit OrderedModelMixin, which saves in a transaction, and declare a
+    unique constraint on `for_fields` + the order field.
+    """
+
     def __init__(self, for_fields=None, *args, **kwargs) -> None:
         self.for_fields = for_fields
         super().__init__(*args, **kwargs)
 
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.for_fields:
+            kwargs["for_fields"] = self.for_fields
+        return name, path, args, kwargs
+
+    def parent_attnames(self) -> list[str]:
+        return [
+            self.model._meta.get_field(name).attname for name in self.for_fields or []
+        ]
+
+    def parent_lookup(self, model_instance: models.Model) -> dict[str, Any]:
+        return {
+            attname: getattr(model_instance, attname)
+            for attname in self.parent_attnames()
+        }
+
+    def lock_parents(self, lookup: dict[str, Any]):
+        using = router.db_for_write(self.model)
+        if not connections[using].in_atomic_block:
+            return
+        for name in self.for_fields or []:
+            field = self.model._meta.get_field(name)
+            if field.is_relation:
+                parents = field.related_model._default_manager.using(using)
+                list(parents.select_for_update().filter(pk=lookup[field.attname]))
+
+    def next_value(self, lookup: dict[str, Any]) -> int:
+        qs = self.model._default_manager.filter(**lookup)
+        last = qs.aggregate(last=models.Max(self.attname))["last"]
+        return 0 if last is None else last + 1
+
+    def is_taken(self, model_instance: models.Model) -> bool:
+        return (
+            self.model._default_manager.filter(
+                **self.parent_lookup(model_instance),
+                **{self.attname: getattr(model_instance, self.attname)},
+            )
+            .exclude(pk=model_instance.pk)
+            .exists()
+        )
+
     def pre_save(self, model_instance: models.Model, add: bool) -> Any:
         if getattr(model_instance, self.attname) is None:
-            try:
-                qs = self.model.objects.all()
-                if self.for_fields:
-                    query = {
-                        field: getattr(model_instance, field)
-                        for field in self.for_fields
-                    }
-                    qs = qs.filter(**query)
-                    # get the order of the last item
-                last_item = qs.latest(self.attname)
-                value = last_item.order + 1
-            except ObjectDoesNotExist:
-                value = 0
+            lookup = self.parent_lookup(model_instance)
+            self.lock_parents(lookup)
+            value = self.next_value(lookup)
             setattr(model_instance, self.attname, value)
             return value
         return super().pre_save(model_instance, add)
 
 
+class Uint256Field(models.CharField):
+    """
+    A uint256, stored as its decimal digits. 78 digit DecimalFields are
+    kept as lossy floating point numbers by SQLite.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", 78)
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection) -> int | None:
+        return None if value is None else int(value)
+
+    def to_python(self, value) -> int | None:
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValidationError(
+                "%(value)s is not an integer", code="invalid", params={"value": value}
+            )
+
+    def get_prep_value(self, value) -> str | None:
+        value = self.to_python(value)
+        return None if value is None else str(value)
+
+
+def get_order_fields(model) -> list[OrderField]:
+    return [f for f in model._meta.concrete_fields if isinstance(f, OrderField)]
+
+
+class OrderedModelMixin:
+    """
+    Saves a row whose OrderField is unset in a transaction, so the parent
+    lock taken while allocating the value is held until the row is
+    written. A clash with the unique constraint, possible where rows
+    cannot be locked (SQLite), is retried with a new value.
+    """
+
+    ORDER_RETRIES = 3
+
+    def save(self, *args, **kwargs):
+        unset = [
+            field
+            for field in get_order_fields(type(self))
+            if getattr(self, field.attname) is None
+        ]
+        if not unset:
+            return super().save(*args, **kwargs)
+        for attempt in range(self.ORDER_RETRIES):
+            try:
+                # a savepoint keeps an outer transaction usable after a clash
+                with transaction.atomic(using=kwargs.get("using")):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                clashed = any(field.is_taken(self) for field in unset)
+                for field in unset:
+                    setattr(self, field.attname, None)
+                if not clashed or attempt == self.ORDER_RETRIES - 1:
+                    raise
+
+
+class OrderedQuerySet(models.QuerySet):
+    """
+    Neither method sends save signals, callers are responsible for
+    invalidating caches built from the rows they touch.
+    """
+
+    def bulk_create_ordered(self, objs, batch_size=None):
+        """
+        bulk_create() that allocates order values for every object
+        with one lock and one MAX() per parent instead of one per row.
+        """
+        objs = list(objs)
+        fields = get_order_fields(self.model)
+        with transaction.atomic(using=self.db):
+            next_values = {}
+            for obj in objs:
+                for field in fields:
+                    if getattr(obj, field.attname) is not None:
+                        continue
+                    lookup = field.parent_lookup(obj)
+                    key = (field.attname, *lookup.items())
+                    if key not in next_values:
+                        field.lock_parents(lookup)
+                        next_values[key] = field.next_value(lookup)
+                    setattr(obj, field.attname, next_values[key])
+                    next_values[key] += 1
+            return self.bulk_create(objs, batch_size=batch_size)
+
+    def renumber(self, ids) -> int:
+        """
+        Give the rows of `ids`, children of one parent, the orders 0, 1, ...
+        in that order, and move their other siblings after them in their
+        current order, e.g. Content.objects.filter(module=m).renumber(ids).
+        The parent is locked like for an insert. Returns the number of
+        rows renumbered.
+        """
+        field = get_order_fields(self.model)[0]
+        attnames = field.parent_attnames()
+        pk_field = self.model._meta.pk
+        ids = list(dict.fromkeys(pk_field.to_python(pk) for pk in ids))
+        with transaction.atomic(using=self.db):
+            parents, found = set(), set()
+            for *parent, pk in self.filter(pk__in=ids).values_list(*attnames, "pk"):
+                parents.add(tuple(parent))
+                found.add(pk)
+            if not found:
+                return 0
+            if len(parents) > 1:
+                raise ValueError("renumber() needs rows of a single parent")
+            lookup = dict(zip(attnames, parents.pop()))
+            field.lock_parents(lookup)
+            siblings = self.model._default_manager.using(self.db).filter(**lookup)
+            order = [pk for pk in ids if pk in found]
+            order += [
+                pk
+                for pk in siblings.order_by(field.attname).values_list("pk", flat=True)
+                if pk not in found
+            ]
+            whens = [
+                models.When(pk=pk, then=models.Value(i)) for i, pk in enumerate(order)
+            ]
+            # the unique constraint is checked row by row, so first move
+            # the rows past every current value, then into place
+            last = siblings.aggregate(last=models.Max(field.attname))["last"] or 0
+            siblings.update(**{field.attname: models.F(field.attname) + last + 1})
+            return siblings.update(
+                **{field.attname: models.Case(*whens, output_field=field)}
+            )
+
+
 class BaseItem(BaseModel):
     owner = models.ForeignKey("User", null=True, on_delete=models.SET_NULL)
     title = models.CharField(max_length=200)
@@ -0,0 +1,120 @@
+# module for models that track on-chain state
+from django.db import models
+
+from .base import BaseModel, Uint256Field
+from .course import CourseStudent, CourseStudentStatus
+from .user import Transaction
+
+
+class InvoiceStatus(models.IntegerChoices):
+    QUEUED = 0, "Queued"
+    SUBMITTED = 1, "Submitted"
+    CONFIRMED = 2, "Confirmed"
+    FAILED = 3, "Failed"
+
+
+class MintStatus(models.IntegerChoices):
+    QUEUED = 0, "Queued"
+    SUBMITTED = 1, "Submitted"
+    MINTED = 2, "Minted"
+    FAILED = 3, "Failed"
+
+
+class ChainCheckpoint(BaseModel):
+    """
+    The last block a chain indexer has fully processed.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    block_number = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}@{self.block_number}"
+
+
+class PaymentInvoice(BaseModel):
+    """
+    A createInvoice call waiting for, or sent by, the invoice submitter.
+    """
+
+    STATUSES = InvoiceStatus
+
+    transaction = models.OneToOneField(
+        Transaction, related_name="invoice", on_delete=models.CASCADE
+    )
+    token = models.CharField(max_length=42)
+    # in the token's smallest unit, as the contract expects it
+    amount = Uint256Field()
+    status = models.IntegerField(
+        choices=InvoiceStatus.choices, default=InvoiceStatus.QUEUED
+    )
+    nonce = models.PositiveBigIntegerField(null=True, blank=True)
+    tx_hash = models.CharField(max_length=66, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.transaction.ref} ({self.get_status_display()})"
+
+
+class CertificateMintQuerySet(models.QuerySet):
+    def enqueue_completed(self) -> int:
+        """
+        Queue a certificate for every completed enrollment that has none
+        yet and whose student has a wallet. Returns the number of
+        enrollments picked up.
+        """
+        pending = (
+            CourseStudent.objects.filter(
+                status=CourseStudentStatus.COMPLETED,
+                user__wallet_id__isnull=False,
+                certificate__isnull=True,
+            )
+            .exclude(user__wallet_id="")
+            .values_list("id", "user__wallet_id")
+        )
+        created = self.bulk_create(
+            (
+                CertificateMint(
+                    course_student_id=course_student_id,
+                    recipient=wallet_id,
+                    token_id=course_student_id.int,
+                )
+                for course_student_id, wallet_id in pending.iterator()
+            ),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        return len(created)
+
+
+class CertificateMint(BaseModel):
+    """
+    A certificate NFT for a completed enrollment, queued for, or sent by,
+    the certificate minter.
+    """
+
+    STATUSES = MintStatus
+
+    course_student = models.OneToOneField(
+        CourseStudent, related_name="certificate", on_delete=models.CASCADE
+    )
+    recipient = models.CharField(max_length=42)
+    # uint256, the enrollment id as an integer
+    token_id = Uint256Field(unique=True)
+    status = models.IntegerField(choices=MintStatus.choices, default=MintStatus.QUEUED)
+    nonce = models.PositiveBigIntegerField(null=True, blank=True)
+    tx_hash = models.CharField(max_length=66, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    objects = CertificateMintQuerySet.as_manager()
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.token_id} ({self.get_status_display()})"
@@ -11,20 +11,27 @@ from django.db import models
 from django.template.defaultfilters import slugify
 from django.utils.translation import gettext_lazy as _
 
-from .base import BaseItem, BaseModel, OrderField
+from .base import (
+    BaseItem,
+    BaseModel,
+    OrderedModelMixin,
+    OrderedQuerySet,
+    OrderField,
+)
 from .user import Instructor, User
 
 
 class ContentTypeChoice(models.TextChoices):
     VIDEO = "video", "Video"
     BOOK = "book", "Book"
+    TEXT = "text", "Text"
 
 
 class ResourceType(models.TextChoices):
     LINK = "link", "Link"
 
 
-class CourseStudentStatus(models.IntegerField):
+class CourseStudentStatus(models.IntegerChoices):
     NOT_STARTED = 0, "Not Started"
     IN_PROGRESS = 1, "In Progress"
     COMPLETED = 2, "Completed"
@@ -49,6 +56,31 @@ class CourseCategory(BaseModel):
         return super().save(*args, **kwargs)
 
 
+class CourseQuerySet(models.QuerySet):
+    def with_students_count(self):
+        return self.annotate(
+            students_count=models.Count("students", distinct=True)
+        )
+
+    def catalog(self):
+        """
+        Courses with everything the catalog serializers read loaded
+        up front, so the query count does not grow with the page size.
+        """
+        return (
+            self.with_students_count()
+            .select_related("owner__user")
+            .prefetch_related(
+                "category",
+                "co_instructors__user",
+                "courseobjective_set",
+                "courserequirement_set",
+                # CourseSerializer lists the student ids
+                models.Prefetch("students", queryset=User.objects.only("id")),
+            )
+        )
+
+
 class Course(BaseModel):
     owner = models.ForeignKey(
         Instructor, related_name="courses", on_delete=models.PROTECT
@@ -64,6 +96,8 @@ class Course(BaseModel):
     )
     students = models.ManyToManyField(User, through="CourseStudent")
 
+    objects = CourseQuerySet.as_manager()
+
     @property
     def crypto_price(self):
         pass
@@ -96,24 +130,51 @@ class Course(BaseModel):
         return self.title
 
 
-class CourseObjective(BaseModel):
+class CourseObjective(OrderedModelMixin, BaseModel):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     order = OrderField(for_fields=["course"], verbose_name=_("Order"))
 
+    objects = OrderedQuerySet.as_manager()
+
     class Meta:
         ordering = ["order"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "order"], name="course_objective_order_unique"
+            )
+        ]
 
 
-class CourseRequirement(BaseModel):
+class CourseRequirement(OrderedModelMixin, BaseModel):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     order = OrderField(for_fields=["course"], verbose_name=_("Order"))
 
+    objects = OrderedQuerySet.as_manager()
+
     class Meta:
         ordering = ["order"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "order"], name="course_requirement_order_unique"
+            )
+        ]
+
+
+class CourseStudentQuerySet(models.QuerySet):
+    def owned_course_ids(self, user, course_ids) -> set:
+        """
+        The subset of `course_ids` `user` is already enrolled in, read in
+        one query off the (user, course) unique index.
+        """
+        return set(
+            self.filter(user=user, course_id__in=course_ids).values_list(
+                "course_id", flat=True
+            )
+        )
 
 
 class CourseStudent(BaseModel):
@@ -124,7 +185,9 @@ class CourseStudent(BaseModel):
         default=CourseStudentStatus.NOT_STARTED,
     )
 
-    class Meta:
+    objects = CourseStudentQuerySet.as_manager()
+
+    class Meta(BaseModel.Meta):
         constraints = [
             models.UniqueConstraint(
                 fields=["user", "course"], name="user_course_unique"
@@ -135,20 +198,61 @@ class CourseStudent(BaseModel):
         return self.user.get_full_name()
 
 
-class Module(BaseModel):
+class Module(OrderedModelMixin, BaseModel):
     course = models.ForeignKey(Course, related_name="modules", on_delete=models.CASCADE)
     title = models.CharField(_("Module Title"), max_length=300)
     order = OrderField(for_fields=["course"], verbose_name=_("Order"))
     description = models.TextField(blank=True)
 
+    objects = OrderedQuerySet.as_manager()
+
     def __str__(self) -> str:
         return f"{self.order}. {self.title}"
 
     class Meta:
         ordering = ["order"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "order"], name="module_order_unique"
+            )
+        ]
 
 
-class Content(BaseModel):
+class ItemSnapshotMixin:
+    """
+    Copies fields of the generic `item` onto the row, with
+    sync_item_snapshot(), when the row is first saved and whenever it is
+    pointed at another item. Later changes to the item itself are copied
+    by core.signals.
+    """
+
+    snapshot_fields = ["title"]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_item = instance.snapshot_item()
+        return instance
+
+    def snapshot_item(self) -> tuple:
+        # read from __dict__ so deferred fields are not loaded
+        return self.__dict__.get("item_ct_id"), self.__dict__.get("item_id")
+
+    def save(self, *args, **kwargs):
+        item = self.snapshot_item()
+        if not self.title or item != getattr(self, "_snapshot_item", item):
+            self.sync_item_snapshot()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {
+                    *kwargs["update_fields"],
+                    *self.snapshot_fields,
+                }
+        result = super().save(*args, **kwargs)
+        self._snapshot_item = item
+        return result
+
+
+class Content(ItemSnapshotMixin, OrderedModelMixin, BaseModel):
     module = models.ForeignKey(
         Module, related_name="contents", on_delete=models.CASCADE
     )
@@ -161,19 +265,31 @@ class Content(BaseModel):
         limit_choices_to={"model__in": ["video", "text", "book"]},
     )
     item = GenericForeignKey("item_ct", "item_id")
+    # snapshot of the item so outlines never read the item tables,
+    # kept in sync by core.signals
+    title = models.CharField(max_length=200, blank=True)
+    duration = models.DurationField(blank=True, null=True)
+
+    objects = OrderedQuerySet.as_manager()
+    snapshot_fields = ["title", "type", "duration"]
 
     class Meta:
         ordering = ["order"]
-        indexes = [
-            models.Index(fields=["item_ct", "item_id"]),
+        indexes = [models.Index(fields=["item_ct", "item_id"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["module", "order"], name="content_order_unique"
+            )
         ]
 
     def __str__(self) -> str:
-        return str(self.item)
+        return self.title
 
-    @property
-    def title(self):
-        return str(self.item.title)
+    def sync_item_snapshot(self):
+        item = self.item
+        self.title = item.title
+        self.type = item._meta.model_name
+        self.duration = getattr(item, "duration", None)
 
 
 class ContentProgress(BaseModel):
@@ -183,12 +299,16 @@ class ContentProgress(BaseModel):
     completed_at = models.DateTimeField(blank=True, null=True)
     last_video_position = models.DurationField(blank=True, null=True)
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["student", "content"])]
+
 
 class Video(BaseItem):
     file = models.FileField(
         upload_to=["videos"],
         validators=[FileExtensionValidator(["mp4", "webm", "mkv"])],
     )
+    duration = models.DurationField(blank=True, null=True)
 
     def __str__(self) -> str:
         return self.title
@@ -218,7 +338,7 @@ class Link(BaseItem):
         return self.title
 
 
-class Resource(BaseModel):
+class Resource(ItemSnapshotMixin, OrderedModelMixin, BaseModel):
     content = models.ForeignKey(
         Content, related_name="resources", on_delete=models.CASCADE
     )
@@ -231,10 +351,21 @@ class Resource(BaseModel):
         limit_choices_to={"model__in": ["link"]},
     )
     item = GenericForeignKey("item_ct", "item_id")
+    # snapshot of the item title, kept in sync by core.signals
+    title = models.CharField(max_length=200, blank=True)
 
-    @property
-    def title(self):
-        return self.item.title
+    objects = OrderedQuerySet.as_manager()
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["item_ct", "item_id"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content", "order"], name="resource_order_unique"
+            )
+        ]
+
+    def sync_item_snapshot(self):
+        self.title = self.item.title
 
 
 # extras
@@ -246,6 +377,9 @@ class ContentNote(BaseModel):
     video_timestamp = models.DurationField(blank=True, null=True)
     note = models.TextField()
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["user", "content", "-created_at"])]
+
 
 class CourseAnnouncement(BaseModel):
     poster = models.ForeignKey(Instructor, null=True, on_delete=models.SET_NULL)
@@ -283,6 +417,9 @@ class CourseQuestion(BaseModel):
     subject = models.CharField(max_length=200)
     description = models.TextField()
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["course", "-created_at"])]
+
     def __str__(self) -> str:
         return self.subject
 
@@ -292,6 +429,9 @@ class CourseQuestionComment(BaseModel):
     question = models.ForeignKey(CourseQuestion, on_delete=models.CASCADE)
     message = models.TextField()
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["question", "-created_at"])]
+
     def __str__(self) -> str:
         return self.message
 
@@ -315,6 +455,9 @@ class CourseMessage(BaseModel):
     content_ct = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     content = GenericForeignKey("content_ct", "content_id")
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["room", "-created_at"])]
+
 
 class MessageText(BaseModel):
     content = models.TextField()
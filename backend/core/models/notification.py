@@ -20,7 +20,9 @@ class NotificationType(models.TextChoices):
 
 
 class Notification(BaseModel):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(
+        User, related_name="notifications", on_delete=models.CASCADE
+    )
     title = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
     object_id = models.UUIDField()
@@ -37,5 +39,9 @@ class Notification(BaseModel):
     def __str__(self):
         return self.title
 
-    class Meta:
-        indexes = [models.Index(fields=["content_type", "object_id"])]
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(fields=["content_type", "object_id"]),
+            models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["user", "is_read"]),
+        ]
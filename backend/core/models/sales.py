@@ -1,21 +1,68 @@
 # module for models that have to do with course purchases
-import secrets
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from decimal import Decimal
 from functools import cached_property
 
+from django.core.cache import cache
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db import transaction as db_transaction
 from django.utils import timezone
 
-from .base import BaseModel
+from core.cache import bump_coupon_version, coupon_key
+
+from .base import BaseModel, UniqueRefMixin
 from .course import Course, CourseStudent
-from .user import User
+from .user import InstructorWallet, User
+
+
+class CouponExhausted(Exception):
+    pass
 
 
 class OrderStatus(models.IntegerChoices):
     NEW = 0, "New"
     PAID = 1, "Paid"
+    # paid after its coupon reservation expired, with the coupon used up
+    # since, so it was not fulfilled and has to be refunded
+    REJECTED = 2, "Rejected"
+
+
+class CouponReservationStatus(models.IntegerChoices):
+    RESERVED = 0, "Reserved"
+    CONSUMED = 1, "Consumed"
+    RELEASED = 2, "Released"
+
+
+@dataclass(frozen=True)
+class CachedCoupon:
+    """
+    What pricing needs to know about a coupon, cached by code until the
+    coupon expires. Remaining uses are not cached, they are checked when
+    the coupon is redeemed.
+    """
+
+    id: object
+    code: str
+    discount: int
+    valid_from: datetime
+    valid_to: datetime
+    course_ids: frozenset
+
+    @property
+    def is_valid(self):
+        now = timezone.now()
+        return now > self.valid_from and now < self.valid_to
+
+    def applies_to(self, course_id) -> bool:
+        return not self.course_ids or course_id in self.course_ids
+
+    def discount_price(self, price: Decimal):
+        from core.pricing import apply_discount
+
+        return apply_discount(price, self.discount)
 
 
 class Coupon(BaseModel):
@@ -28,7 +75,7 @@ class Coupon(BaseModel):
         if uses is None, it can be used infinitely till it expires.
     """
 
-    code = models.CharField(max_length=20)
+    code = models.CharField(max_length=20, unique=True)
     discount = models.PositiveIntegerField(
         validators=[MaxValueValidator(100), MinValueValidator(0)]
     )
@@ -40,6 +87,34 @@ class Coupon(BaseModel):
     def __str__(self) -> str:
         return self.code
 
+    @classmethod
+    def get_cached(cls, code: str) -> CachedCoupon | None:
+        key = coupon_key(code)
+        if (cached := cache.get(key)) is not None:
+            return cached
+        try:
+            coupon = cls.objects.prefetch_related("courses").get(code=code)
+        except cls.DoesNotExist:
+            return None
+        if coupon.uses is not None and coupon.uses <= 0:
+            return None
+        cached = CachedCoupon(
+            id=coupon.id,
+            code=coupon.code,
+            discount=coupon.discount,
+            valid_from=coupon.valid_from,
+            valid_to=coupon.valid_to,
+            course_ids=frozenset(course.id for course in coupon.courses.all()),
+        )
+        timeout = (coupon.valid_to - timezone.now()).total_seconds()
+        if timeout > 0:
+            cache.set(key, cached, timeout)
+        return cached
+
+    @classmethod
+    def invalidate_cached(cls):
+        bump_coupon_version()
+
     @property
     def is_valid(self):
         now = timezone.now()
@@ -49,15 +124,157 @@ class Coupon(BaseModel):
         return False
 
     def redeem_coupon(self):
-        if self.is_valid:
-            if self.uses:
-                self.uses -= 1
-            return True
-        return False
+        if not self.is_valid:
+            return False
+        try:
+            self.take_uses(1)
+        except CouponExhausted:
+            return False
+        return True
+
+    def take_uses(self, uses: int) -> "CouponUseShard | None":
+        """
+        Atomically take `uses` from the coupon with a conditional UPDATE,
+        so it can never be oversold. Sharded coupons take from the shards,
+        see take_from_shards, and return a shard the uses can be given
+        back to.
+        """
+        if self.uses is None:
+            return None
+        # sharded coupons keep `uses` as an upper bound only
+        unsharded = ~models.Exists(
+            CouponUseShard.objects.filter(coupon=models.OuterRef("pk"))
+        )
+        if Coupon.objects.filter(unsharded, pk=self.pk, uses__gte=uses).update(
+            uses=models.F("uses") - uses
+        ):
+            if not Coupon.objects.filter(pk=self.pk, uses__gt=0).exists():
+                # the last uses were taken, stop offering the coupon
+                Coupon.invalidate_cached()
+            return None
+        shards = list(self.shards.all())
+        if not shards:
+            Coupon.invalidate_cached()
+            raise CouponExhausted
+        try:
+            shard, drained = self.take_from_shards(shards, uses)
+        except CouponExhausted:
+            self.invalidate_if_used_up()
+            raise
+        if drained:
+            self.invalidate_if_used_up()
+        return shard
+
+    def take_from_shards(
+        self, shards: list["CouponUseShard"], uses: int
+    ) -> tuple["CouponUseShard", bool]:
+        """
+        Take `uses` from a random shard that has them all, or else spread
+        over as many shards as it takes. Returns the first shard taken
+        from and whether a shard may have been emptied.
+        """
+        shards = [shard for shard in shards if shard.uses > 0]
+        random.shuffle(shards)
+        for shard in shards:
+            if CouponUseShard.objects.filter(pk=shard.pk, uses__gte=uses).update(
+                uses=models.F("uses") - uses
+            ):
+                return shard, shard.uses <= uses
+        # concurrent spreads lock their shards in the same order, so they
+        # wait on each other instead of deadlocking. Raising rolls back the
+        # uses taken so far.
+        with db_transaction.atomic():
+            taken = []
+            for shard in sorted(shards, key=lambda shard: shard.index):
+                available = shard.uses
+                while available > 0:
+                    take = min(uses, available)
+                    if CouponUseShard.objects.filter(
+                        pk=shard.pk, uses__gte=take
+                    ).update(uses=models.F("uses") - take):
+                        uses -= take
+                        taken.append(shard)
+                        break
+                    # another checkout took some, try what is left
+                    available = (
+                        CouponUseShard.objects.filter(pk=shard.pk)
+                        .values_list("uses", flat=True)
+                        .first()
+                        or 0
+                    )
+                if not uses:
+                    return taken[0], True
+            raise CouponExhausted
+
+    def invalidate_if_used_up(self):
+        if not self.shards.filter(uses__gt=0).exists():
+            # keep is_valid accurate once every shard is empty
+            Coupon.objects.filter(pk=self.pk).update(uses=0)
+            Coupon.invalidate_cached()
+
+    def give_back_uses(self, uses: int, shard: "CouponUseShard | None" = None):
+        if self.uses is None:
+            return
+        if shard is not None:
+            CouponUseShard.objects.filter(pk=shard.pk).update(
+                uses=models.F("uses") + uses
+            )
+            Coupon.objects.filter(pk=self.pk, uses=0).update(uses=uses)
+        else:
+            Coupon.objects.filter(pk=self.pk).update(uses=models.F("uses") + uses)
+
+    @db_transaction.atomic
+    def shard(self, count: int):
+        """
+        Spread the remaining uses of a hot coupon over `count` rows so
+        concurrent checkouts do not all wait on the coupon's row lock.
+        `uses` then stays as an upper bound and the shards are the truth.
+        Existing shards are updated in place; live reservations on a shard
+        that goes away are moved to the first one, so releasing them still
+        gives their uses back.
+        """
+        if count < 1:
+            raise ValueError("A coupon needs at least one shard")
+        coupon = Coupon.objects.select_for_update().get(pk=self.pk)
+        if coupon.uses is None:
+            return
+        shards = list(coupon.shards.select_for_update().order_by("index"))
+        remaining = sum(shard.uses for shard in shards) if shards else coupon.uses
+        kept, dropped = shards[:count], shards[count:]
+        added = [
+            CouponUseShard(coupon=coupon, index=index, uses=0)
+            for index in range(len(kept), count)
+        ]
+        for index, shard in enumerate(kept + added):
+            shard.uses = remaining // count + (1 if index < remaining % count else 0)
+        CouponUseShard.objects.bulk_update(kept, ["uses"])
+        CouponUseShard.objects.bulk_create(added)
+        kept += added
+        CouponReservation.objects.filter(
+            models.Q(shard__in=dropped) | models.Q(shard=None),
+            coupon=coupon,
+            status=CouponReservationStatus.RESERVED,
+        ).update(shard=kept[0])
+        CouponUseShard.objects.filter(pk__in=[shard.pk for shard in dropped]).delete()
+        Coupon.objects.filter(pk=self.pk).update(uses=remaining)
 
     def discount_price(self, price: Decimal):
-        discount = Decimal(self.discount / 100) * price
-        return price - discount
+        from core.pricing import apply_discount
+
+        return apply_discount(price, self.discount)
+
+
+class CouponUseShard(BaseModel):
+    coupon = models.ForeignKey(Coupon, related_name="shards", on_delete=models.CASCADE)
+    index = models.PositiveIntegerField()
+    uses = models.PositiveIntegerField()
+
+    class Meta(BaseModel.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=["coupon", "index"], name="coupon_shard_index_unique"
+            )
+        ]
 
 
 class Cart(BaseModel):
@@ -66,11 +283,13 @@ class Cart(BaseModel):
 
     @property
     def total_price(self):
-        return self.cartitem_set.all()
+        from core.pricing import CartPricing
+
+        return CartPricing(self).price().total
 
     @property
     def is_empty(self):
-        return self.cartitem_set.count() == 0
+        return not self.cartitem_set.exists()
 
     def revalidate_coupon(self):
         if self.coupon:
@@ -94,50 +313,109 @@ class CartItem(BaseModel):
     def discounted_price(self):
         if not self.cart.coupon:
             return self.course.price
-        if not self.cart.coupon.is_valid:
-            return self.course.price
-        if coupon_courses := self.cart.coupon.courses.all():
-            if self.course in coupon_courses:
-                return self.cart.coupon.discount_price(self.course.price)
+        coupon = Coupon.get_cached(self.cart.coupon.code)
+        if not coupon or not coupon.is_valid:
             return self.course.price
-        return self.cart.coupon.discount_price(self.course.price)
+        if coupon.applies_to(self.course_id):
+            return coupon.discount_price(self.course.price)
+        return self.course.price
+
 
+class OrderQuerySet(models.QuerySet):
+    ENROLL_BATCH_SIZE = 1000
 
-class Order(BaseModel):
+    @db_transaction.atomic
+    def verify_paid(self) -> int:
+        """
+        Mark the unpaid orders in this queryset as paid, consume their
+        coupon reservations, enroll their users and credit the course
+        owners, each as one set-based statement. Orders that are already
+        paid are skipped, so replaying payments is safe. An order whose
+        reservation expired before the payment takes its coupon uses again,
+        or is rejected if the coupon has run out. Returns the number of
+        orders marked as paid.
+        """
+        ids = list(
+            self.select_for_update()
+            .filter(status=OrderStatus.NEW)
+            .values_list("pk", flat=True)
+        )
+        if not ids:
+            return 0
+        CouponReservation.objects.filter(
+            order_id__in=ids, status=CouponReservationStatus.RESERVED
+        ).update(status=CouponReservationStatus.CONSUMED)
+        rejected = CouponReservation.objects.retake_released(ids)
+        if rejected:
+            Order.objects.filter(pk__in=rejected).update(
+                status=OrderStatus.REJECTED, updated_at=timezone.now()
+            )
+            ids = [pk for pk in ids if pk not in rejected]
+        Order.objects.filter(pk__in=ids).update(
+            status=OrderStatus.PAID, updated_at=timezone.now()
+        )
+
+        items = OrderItem.objects.filter(order_id__in=ids)
+        CourseStudent.objects.bulk_create(
+            (
+                CourseStudent(user_id=user_id, course_id=course_id)
+                for user_id, course_id in items.values_list(
+                    "order__user_id", "course_id"
+                ).iterator()
+            ),
+            batch_size=self.ENROLL_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        earnings = (
+            items.order_by()
+            .values("course__owner_id")
+            .annotate(total=models.Sum("price"))
+        )
+        InstructorWallet.objects.credit(
+            {row["course__owner_id"]: row["total"] for row in earnings}
+        )
+        return len(ids)
+
+
+class Order(UniqueRefMixin, BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     ref = models.CharField(max_length=20, editable=False, unique=True)
     coupon = models.ForeignKey(Coupon, null=True, blank=True, on_delete=models.SET_NULL)
     status = models.IntegerField(choices=OrderStatus.choices, default=OrderStatus.NEW)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["user", "-created_at"])]
+
     @property
     def total_price(self):
         return OrderItem.objects.filter(order=self).aggregate(
             total_price=models.Sum("price")
         )["total_price"]
 
-    def save(self, *args, **kwargs) -> None:
-        while not self.ref:
-            ref = secrets.token_urlsafe(18)
-            if not Order.objects.filter(ref=ref).exists():
-                self.ref = ref
-        return super().save(*args, **kwargs)
-
     @db_transaction.atomic
-    def create_order(self):
-        cart: Cart = self.user.cart
-        cart_items = CartItem.objects.filter(cart=cart)
-        for item in cart_items:
-            OrderItem.objects.create(order=self, course=item.course)
+    def create_order(self, cart: Cart, pricing) -> Decimal:
+        """
+        Create all order items at once from a core.pricing.PricedCart.
+        Each discounted item uses up one coupon use. Returns the order total.
+        """
+        OrderItem.objects.bulk_create(
+            OrderItem(order=self, course=line.course, price=line.discounted_price)
+            for line in pricing.lines
+        )
+        if pricing.redemptions:
+            # raises CouponExhausted if a concurrent order took the uses
+            CouponReservation.objects.reserve(self.coupon, self, pricing.redemptions)
         # clear cart after order creation and revalidate cart coupon
         cart.revalidate_coupon()
         cart.clear()
+        return pricing.total
 
     def tx_verify(self):
         # TODO: send mail to user with receipt asynchronously
-        self.status = OrderStatus.PAID
-        self.save()
-        for item in self.orderitem_set.all():
-            CourseStudent.objects.create(course=item.course, user=self.user)
+        Order.objects.filter(pk=self.pk).verify_paid()
+        self.refresh_from_db(fields=["status"])
 
 
 class OrderItem(BaseModel):
@@ -148,17 +426,103 @@ class OrderItem(BaseModel):
     def calculate_price(self):
         if not self.order.coupon:
             return self.course.price
-        if not self.order.coupon.is_valid:
+        coupon = Coupon.get_cached(self.order.coupon.code)
+        if not coupon or not coupon.is_valid:
+            return self.course.price
+        if not coupon.applies_to(self.course_id):
             return self.course.price
-        if coupon_courses := self.order.coupon.courses.all():
-            if self.course in coupon_courses:
-                self.order.coupon.redeem_coupon()  # redeem the coupon
-                return self.order.coupon.discount_price(self.course.price)
+        if not self.order.coupon.redeem_coupon():  # redeem the coupon
             return self.course.price
-        self.order.coupon.redeem_coupon()  # redeem the coupon
-        return self.order.coupon.discount_price(self.course.price)
+        return coupon.discount_price(self.course.price)
 
     def save(self, *args, **kwargs):
         if not self.price:
             self.price = self.calculate_price()
         return super().save(*args, **kwargs)
+
+
+class CouponReservationQuerySet(models.QuerySet):
+    def reserve(
+        self, coupon: Coupon, order: Order, uses: int
+    ) -> "CouponReservation | None":
+        shard = coupon.take_uses(uses)
+        if coupon.uses is None:
+            # unlimited coupons have nothing to give back
+            return None
+        return self.create(
+            coupon=coupon,
+            order=order,
+            uses=uses,
+            shard=shard,
+            expires_at=timezone.now() + CouponReservation.TTL,
+        )
+
+    def release_expired(self) -> int:
+        """
+        Give back the uses held by orders that were never paid.
+        """
+        expired = self.filter(
+            status=CouponReservationStatus.RESERVED,
+            expires_at__lt=timezone.now(),
+            order__status=OrderStatus.NEW,
+        ).select_related("coupon", "shard")
+        released = 0
+        for reservation in expired.iterator():
+            if reservation.release():
+                released += 1
+        return released
+
+    def retake_released(self, order_ids) -> set:
+        """
+        Take the uses of released reservations again, for orders that were
+        paid after their reservation expired. Returns the ids of the orders
+        whose coupon has run out in the meantime.
+        """
+        released = self.filter(
+            order_id__in=order_ids, status=CouponReservationStatus.RELEASED
+        ).select_related("coupon")
+        rejected = set()
+        for reservation in released:
+            try:
+                reservation.retake()
+            except CouponExhausted:
+                rejected.add(reservation.order_id)
+        return rejected
+
+
+class CouponReservation(BaseModel):
+    TTL = timedelta(minutes=30)
+
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE)
+    order = models.OneToOneField(Order, on_delete=models.CASCADE)
+    shard = models.ForeignKey(
+        CouponUseShard, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    uses = models.PositiveIntegerField()
+    status = models.IntegerField(
+        choices=CouponReservationStatus.choices,
+        default=CouponReservationStatus.RESERVED,
+    )
+    expires_at = models.DateTimeField()
+
+    objects = CouponReservationQuerySet.as_manager()
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["status", "expires_at"])]
+
+    @db_transaction.atomic
+    def release(self) -> bool:
+        # the status check makes releasing and consuming mutually exclusive
+        updated = CouponReservation.objects.filter(
+            pk=self.pk, status=CouponReservationStatus.RESERVED
+        ).update(status=CouponReservationStatus.RELEASED)
+        if updated:
+            self.coupon.give_back_uses(self.uses, self.shard)
+        return bool(updated)
+
+    def retake(self):
+        # raises CouponExhausted, leaving the reservation released
+        shard = self.coupon.take_uses(self.uses)
+        CouponReservation.objects.filter(pk=self.pk).update(
+            status=CouponReservationStatus.CONSUMED, shard=shard
+        )
@@ -12,7 +12,7 @@ from django.utils import timezone
 from django.utils.crypto import get_random_string
 from django.utils.translation import gettext_lazy as _
 
-from .base import BaseModel, BaseNotification
+from .base import BaseModel, BaseNotification, UniqueRefMixin
 
 
 class AuthProviders(models.TextChoices):
@@ -145,7 +145,7 @@ class User(BaseModel, AbstractUser):
     class Meta:
         constraints = [
             models.CheckConstraint(
-                check=models.Q(wallet_id__isnull=False) | models.Q(email_isnull=False),
+                check=models.Q(wallet_id__isnull=False) | models.Q(email__isnull=False),
                 name="address_or_email_not_null",
             )
         ]
@@ -199,6 +199,50 @@ class OTPToken(BaseModel):
             return False
 
 
+class InstructorWalletQuerySet(models.QuerySet):
+    @db_transaction.atomic
+    def credit(self, amounts: dict) -> list["WalletTransaction"]:
+        """
+        Credit each instructor in `amounts` (instructor id -> Decimal),
+        creating missing wallets, recording one wallet transaction per
+        instructor and updating every balance in a single UPDATE.
+        """
+        amounts = {k: v for k, v in amounts.items() if v}
+        if not amounts:
+            return []
+        wallets = {
+            wallet.instructor_id: wallet
+            for wallet in self.filter(instructor_id__in=amounts).order_by("created_at")
+        }
+        missing = [
+            InstructorWallet(instructor_id=instructor_id)
+            for instructor_id in amounts
+            if instructor_id not in wallets
+        ]
+        for wallet in self.bulk_create(missing):
+            wallets[wallet.instructor_id] = wallet
+
+        self.filter(pk__in=[w.pk for w in wallets.values()]).update(
+            amount=models.F("amount")
+            + models.Case(
+                *(
+                    models.When(pk=wallets[instructor_id].pk, then=models.Value(amount))
+                    for instructor_id, amount in amounts.items()
+                ),
+                output_field=models.DecimalField(max_digits=15, decimal_places=2),
+            )
+        )
+        return WalletTransaction.objects.bulk_create(
+            WalletTransaction(
+                wallet=wallets[instructor_id],
+                amount=amount,
+                type=WalletTransactionType.CREDIT,
+                status=WalletTransactionStatus.SUCCESS,
+            )
+            for instructor_id, amount in amounts.items()
+        )
+
+
 class InstructorWallet(BaseModel):
     instructor = models.ForeignKey(Instructor, on_delete=models.CASCADE)
     amount = models.DecimalField(
@@ -206,6 +250,8 @@ class InstructorWallet(BaseModel):
     )
     is_active = models.BooleanField(default=True)
 
+    objects = InstructorWalletQuerySet.as_manager()
+
     @db_transaction.atomic
     def add_balance(self, amount: str | int | float):
         self.amount = models.F("amount") + Decimal(amount)
@@ -230,6 +276,12 @@ class WalletTransaction(BaseModel):
         default=WalletTransactionStatus.PENDING,
     )
 
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(fields=["wallet", "-created_at"]),
+            models.Index(fields=["wallet", "type", "-created_at"]),
+        ]
+
     @db_transaction.atomic
     def tx_verify(self):
         if self.status == WalletTransactionStatus.PENDING:
@@ -238,7 +290,7 @@ class WalletTransaction(BaseModel):
             self.wallet.add_balance(self.amount)
 
 
-class Transaction(BaseModel):
+class Transaction(UniqueRefMixin, BaseModel):
     STATUSES = TransactionStatus
     REASONS = TransactionReason
     PAYMENT_METHODS = PaymentMethods
@@ -252,6 +304,10 @@ class Transaction(BaseModel):
     item = GenericForeignKey("item_ct", "item_id")
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     ref = models.CharField(editable=False, max_length=20, unique=True)
+    # keccak256 of the ref, how indexed contract events refer to it
+    ref_hash = models.CharField(
+        editable=False, max_length=66, blank=True, db_index=True
+    )
     status = models.PositiveIntegerField(
         default=TransactionStatus.INITAILIZED,
         choices=TransactionStatus.choices,
@@ -260,13 +316,6 @@ class Transaction(BaseModel):
     reason = models.CharField(max_length=20, choices=TransactionReason.choices)
     date_verified = models.DateTimeField(blank=True, null=True)
 
-    def save(self, *args, **kwargs):
-        while not self.ref:
-            ref = secrets.token_urlsafe(18)
-            if not Transaction.objects.filter(ref=ref).exists():
-                self.ref = ref
-        super().save(*args, **kwargs)
-
     def verify(self):
         # validate with the transaction payment service
         self.item.tx_verify()
@@ -0,0 +1,167 @@
+"""
+USD prices for payment tokens.
+
+PriceOracle keeps prices in the Django cache. A price younger than
+`ttl` is served as is. An older one, up to `stale_ttl`, is still served
+while a background thread refreshes it (stale-while-revalidate). Without
+a price in the cache, the refresh also runs in the background and
+PriceUnavailable is raised right away, so a checkout never waits on a
+remote price feed. The refresh_token_prices command keeps the cache
+warm.
+
+Prices come from a PriceSource, settings.PRICE_SOURCE, so tests and
+local setups can use FixturePriceSource instead of CoinGecko.
+"""
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PRICE_TTL = 60
+PRICE_STALE_TTL = 60 * 10
+REFRESH_LOCK_TIMEOUT = 30
+
+
+class PriceUnavailable(Exception):
+    pass
+
+
+class PriceSource(ABC):
+    # whether fetch() goes over the network, see PriceOracle.get_price
+    remote = True
+
+    @abstractmethod
+    def fetch(self, token: str) -> Decimal:
+        """
+        The current USD price of `token`, raising PriceUnavailable if
+        there is none.
+        """
+        raise NotImplementedError
+
+
+class FixturePriceSource(PriceSource):
+    """
+    Prices from settings.PRICE_FIXTURES, a dict or a path to a JSON
+    file mapping token addresses to prices. Tokens that are not listed
+    cost 1 USD, like the stablecoins.
+    """
+
+    remote = False
+
+    def __init__(self, prices: dict | str | None = None):
+        if prices is None:
+            prices = getattr(settings, "PRICE_FIXTURES", {})
+        if isinstance(prices, str):
+            with open(prices) as file:
+                prices = json.load(file)
+        self.prices = {token: Decimal(str(price)) for token, price in prices.items()}
+
+    def fetch(self, token: str) -> Decimal:
+        return self.prices.get(token, Decimal(1))
+
+
+class CoinGeckoPriceSource(PriceSource):
+    URL = "https://api.coingecko.com/api/v3/simple/price"
+    TIMEOUT = 3
+
+    def __init__(self, ids: dict[str, str] | None = None):
+        from core.utils import TOKEN_TO_ID
+
+        self.ids = ids if ids is not None else TOKEN_TO_ID
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=2, backoff_factor=0.2, status_forcelist=[429, 502, 503]
+            ),
+        )
+        self.session.mount("https://", adapter)
+
+    def fetch(self, token: str) -> Decimal:
+        if token not in self.ids:
+            # stablecoins
+            return Decimal(1)
+        coin = self.ids[token]
+        try:
+            response = self.session.get(
+                self.URL,
+                params={"ids": coin, "vs_currencies": "usd"},
+                timeout=self.TIMEOUT,
+            )
+            response.raise_for_status()
+            # parse as Decimal so the price is never a float
+            data = response.json(parse_float=Decimal)
+            return Decimal(data[coin]["usd"])
+        except (requests.RequestException, KeyError, ValueError) as err:
+            raise PriceUnavailable(f"No price for {coin}: {err}") from err
+
+
+class PriceOracle:
+    def __init__(
+        self,
+        source: PriceSource,
+        ttl: int = PRICE_TTL,
+        stale_ttl: int = PRICE_STALE_TTL,
+    ):
+        self.source = source
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+    def price_key(self, token: str) -> str:
+        return "token_price_%s" % token
+
+    def refresh(self, token: str) -> Decimal:
+        price = self.source.fetch(token)
+        cache.set(self.price_key(token), (price, time.time()), self.stale_ttl)
+        return price
+
+    def refresh_in_background(self, token: str):
+        # one refresh per token at a time, across processes
+        lock_key = "%s_refreshing" % self.price_key(token)
+        if not cache.add(lock_key, 1, REFRESH_LOCK_TIMEOUT):
+            return
+
+        def run():
+            try:
+                self.refresh(token)
+            except PriceUnavailable as err:
+                logger.warning(str(err))
+            finally:
+                cache.delete(lock_key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get_price(self, token: str) -> Decimal:
+        cached = cache.get(self.price_key(token))
+        if cached is None:
+            if not self.source.remote:
+                return self.refresh(token)
+            self.refresh_in_background(token)
+            raise PriceUnavailable(f"No recent price for {token}, refreshing")
+        price, fetched_at = cached
+        if time.time() - fetched_at > self.ttl:
+            self.refresh_in_background(token)
+        return price
+
+
+_oracle = None
+
+
+def get_price_oracle() -> PriceOracle:
+    global _oracle
+    if _oracle is None:
+        source = getattr(
+            settings, "PRICE_SOURCE", "core.prices.CoinGeckoPriceSource"
+        )
+        _oracle = PriceOracle(import_string(source)())
+    return _oracle
@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+
+from core.models import sales as sales_models
+
+CENT = Decimal("0.01")
+
+
+def apply_discount(price: Decimal, discount: int) -> Decimal:
+    """
+    `price` less `discount` percent, rounded to the cent.
+    """
+    discounted = price * (100 - Decimal(discount)) / 100
+    return discounted.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+@dataclass(frozen=True)
+class PricedLine:
+    item: sales_models.CartItem
+    price: Decimal
+    discounted_price: Decimal
+
+    @property
+    def course(self):
+        return self.item.course
+
+    @property
+    def discount(self) -> Decimal:
+        return self.price - self.discounted_price
+
+
+@dataclass(frozen=True)
+class PricedCart:
+    lines: list[PricedLine]
+    subtotal: Decimal
+    discount: Decimal
+    total: Decimal
+    # number of discounted lines, each one uses up a coupon use
+    redemptions: int
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.lines
+
+
+class CartPricing:
+    """
+    Prices a cart in a single pass: one query for the items and their
+    courses, the coupon comes from the cart's select_related() and its
+    courses from the coupon cache.
+    """
+
+    def __init__(self, cart: sales_models.Cart):
+        self.cart = cart
+
+    def get_items(self):
+        return (
+            sales_models.CartItem.objects.filter(cart=self.cart)
+            .select_related("course")
+            .order_by("created_at")
+        )
+
+    def get_coupon(self) -> sales_models.CachedCoupon | None:
+        coupon = self.cart.coupon
+        if not coupon or not coupon.is_valid:
+            return None
+        return sales_models.Coupon.get_cached(coupon.code)
+
+    def price(self) -> PricedCart:
+        coupon = self.get_coupon()
+        uses = self.cart.coupon.uses if coupon else None
+        lines, redemptions = [], 0
+        subtotal = total = Decimal("0.00")
+        for item in self.get_items():
+            item.cart = self.cart
+            price = discounted_price = item.course.price
+            if coupon and coupon.is_valid and coupon.applies_to(item.course_id):
+                if uses is None or redemptions < uses:
+                    discounted_price = apply_discount(price, coupon.discount)
+                    redemptions += 1
+            lines.append(PricedLine(item, price, discounted_price))
+            subtotal += price
+            total += discounted_price
+        return PricedCart(
+            lines=lines,
+            subtotal=subtotal,
+            discount=subtotal - total,
+            total=total,
+            redemptions=redemptions,
+        )
@@ -0,0 +1,95 @@
+"""
+Order and transaction references.
+
+A ref is 20 Crockford base32 characters, so refs sort by creation time:
+
+    10 chars  milliseconds since the unix epoch (48 bits)
+     2 chars  node id (10 bits)
+     8 chars  sequence (40 bits), randomly seeded every millisecond
+
+Refs from one process are strictly increasing. Two processes can only
+collide if they share a node id and draw the same random sequence in
+the same millisecond. The unique constraint on `ref` catches that case
+and the save is retried with a fresh ref, so nothing queries the
+database before an insert.
+"""
+import os
+import secrets
+import socket
+import threading
+import time
+import zlib
+
+from django.conf import settings
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+REF_LENGTH = 20
+
+NODE_BITS = 10
+SEQUENCE_BITS = 40
+# leave room to count up within a millisecond after a random start
+SEQUENCE_SEED_BITS = SEQUENCE_BITS - 1
+SEQUENCE_MAX = (1 << SEQUENCE_BITS) - 1
+
+
+def encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def default_node_id() -> int:
+    """
+    settings.REF_NODE_ID when set, otherwise derived from the host name
+    and process id.
+    """
+    node_id = getattr(settings, "REF_NODE_ID", None)
+    if node_id is None:
+        seed = f"{socket.gethostname()}:{os.getpid()}".encode()
+        return zlib.crc32(seed) % (1 << NODE_BITS)
+    return int(node_id) % (1 << NODE_BITS)
+
+
+class RefGenerator:
+    def __init__(self, node_id: int | None = None):
+        self._node_id = node_id
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    @property
+    def node_id(self) -> int:
+        # a forked worker gets its own node id
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._last_ms = -1
+            if self._node_id is None:
+                self._node = default_node_id()
+            else:
+                self._node = self._node_id
+        return self._node
+
+    def __call__(self) -> str:
+        with self._lock:
+            node_id = self.node_id
+            now = time.time_ns() // 1_000_000
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = secrets.randbits(SEQUENCE_SEED_BITS)
+            elif self._sequence < SEQUENCE_MAX:
+                self._sequence += 1
+            else:
+                # sequence exhausted, borrow the next millisecond
+                self._last_ms += 1
+                self._sequence = secrets.randbits(SEQUENCE_SEED_BITS)
+            return (
+                encode(self._last_ms, 10)
+                + encode(node_id, 2)
+                + encode(self._sequence, 8)
+            )
+
+
+generate_ref = RefGenerator()
@@ -0,0 +1,319 @@
+"""
+Course search.
+
+On PostgreSQL courses are matched with a weighted tsvector over the title
+and description, backed by a GIN expression index created after migrate.
+Other databases (SQLite) use an in-process inverted index that is built
+on first use and kept up to date by core.signals. Every course write
+bumps a version key in the shared cache, so a process whose index missed
+a write made elsewhere rebuilds it on its next search.
+"""
+
+import heapq
+import itertools
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from functools import cached_property
+
+from django.db import connections, models, transaction
+from django.db.models.expressions import RawSQL
+
+from core.cache import bump_search_version, get_search_version
+from core.models import course as course_models
+
+# (key, lower bound, upper bound) with the upper bound exclusive
+PRICE_BANDS = [
+    ("free", Decimal("0"), Decimal("0.01")),
+    ("under_20", Decimal("0.01"), Decimal("20")),
+    ("20_to_50", Decimal("20"), Decimal("50")),
+    ("50_to_100", Decimal("50"), Decimal("100")),
+    ("over_100", Decimal("100"), None),
+]
+
+TOKEN_RE = re.compile(r"\w+")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in is it of on or the this to with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        token
+        for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def price_band(price: Decimal) -> str:
+    for key, low, high in PRICE_BANDS:
+        if price >= low and (high is None or price < high):
+            return key
+    return PRICE_BANDS[0][0]
+
+
+@dataclass
+class SearchDocument:
+    id: object
+    title: str
+    description: str
+    price: Decimal
+    owner_id: object
+    categories: tuple[str, ...] = field(default_factory=tuple)
+
+    @cached_property
+    def price_band(self) -> str:
+        return price_band(self.price)
+
+    @classmethod
+    def from_course(cls, course: course_models.Course) -> "SearchDocument":
+        return cls(
+            id=course.id,
+            title=course.title,
+            description=course.description,
+            price=course.price,
+            owner_id=course.owner_id,
+            categories=tuple(category.slug for category in course.category.all()),
+        )
+
+
+class InvertedIndex:
+    """
+    Term -> {document id: weight} postings with tf-idf ranking.
+    Title terms weigh more than description terms.
+    """
+
+    TITLE_WEIGHT = 3
+
+    def __init__(self):
+        self.postings: dict[str, dict[object, int]] = defaultdict(dict)
+        self.documents: dict[object, SearchDocument] = {}
+        self.document_terms: dict[object, tuple[str, ...]] = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, document: SearchDocument):
+        weights = Counter()
+        for token in tokenize(document.title):
+            weights[token] += self.TITLE_WEIGHT
+        for token in tokenize(document.description):
+            weights[token] += 1
+        with self.lock:
+            self._remove(document.id)
+            for term, weight in weights.items():
+                self.postings[term][document.id] = weight
+            self.documents[document.id] = document
+            self.document_terms[document.id] = tuple(weights)
+
+    def remove(self, document_id):
+        with self.lock:
+            self._remove(document_id)
+
+    def _remove(self, document_id):
+        for term in self.document_terms.pop(document_id, ()):
+            postings = self.postings[term]
+            postings.pop(document_id, None)
+            if not postings:
+                del self.postings[term]
+        self.documents.pop(document_id, None)
+
+    def search(self, query: str, category: str | None = None, limit: int = 20):
+        terms = set(tokenize(query))
+        if not terms:
+            return {"count": 0, "ids": [], "facets": self.facets([])}
+        with self.lock:
+            total = len(self.documents)
+            postings = sorted(
+                (self.postings.get(term, {}) for term in terms), key=len
+            )
+            # every term must match, start from the rarest one
+            matches = set(postings[0]).intersection(*postings[1:])
+            if category:
+                matches = {
+                    doc_id
+                    for doc_id in matches
+                    if category in self.documents[doc_id].categories
+                }
+            idf = [math.log(1 + total / max(len(p), 1)) for p in postings]
+            scores = {
+                doc_id: sum(p[doc_id] * weight for p, weight in zip(postings, idf))
+                for doc_id in matches
+            }
+            ids = heapq.nlargest(limit, scores, key=scores.__getitem__)
+            facets = self.facets(matches)
+        return {"count": len(matches), "ids": ids, "facets": facets}
+
+    def facets(self, ids) -> dict[str, dict[str, int]]:
+        documents = [self.documents[doc_id] for doc_id in ids]
+        categories = Counter(
+            itertools.chain.from_iterable(d.categories for d in documents)
+        )
+        bands = Counter(d.price_band for d in documents)
+        instructors = Counter(d.owner_id for d in documents)
+        return {
+            "categories": dict(categories),
+            "price_bands": {key: bands[key] for key, _, _ in PRICE_BANDS},
+            "instructors": {str(owner): n for owner, n in instructors.items()},
+        }
+
+
+class InMemoryCourseSearch:
+    def __init__(self):
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> InvertedIndex:
+        # read before building, a write made during the build bumps it again
+        version = get_search_version()
+        if self._index is None or self._version != version:
+            with self._lock:
+                if self._index is None or self._version != version:
+                    self._index = self.build_index()
+                    self._version = version
+        return self._index
+
+    def build_index(self) -> InvertedIndex:
+        index = InvertedIndex()
+        courses = course_models.Course.objects.filter(
+            is_available=True
+        ).prefetch_related("category")
+        for course in courses.iterator(chunk_size=2000):
+            index.add(SearchDocument.from_course(course))
+        return index
+
+    def search(self, query: str, category: str | None = None, limit: int = 20):
+        return self.index.search(query, category, limit)
+
+    def apply(self, change):
+        """
+        Apply `change` to the local index once the write is committed, and
+        mark every other process's index as stale.
+        """
+
+        def run():
+            version = bump_search_version()
+            with self._lock:
+                # if another process wrote in between, the next search
+                # rebuilds the index instead
+                if self._index is not None and self._version == version - 1:
+                    change(self._index)
+                    self._version = version
+
+        transaction.on_commit(run)
+
+    def update(self, course: course_models.Course):
+        if course.is_available:
+            self.apply(lambda index: index.add(SearchDocument.from_course(course)))
+        else:
+            self.apply(lambda index: index.remove(course.id))
+
+    def remove(self, course_id):
+        self.apply(lambda index: index.remove(course_id))
+
+
+class PostgresCourseSearch:
+    INDEX_NAME = "core_course_search_idx"
+    TSQUERY = "websearch_to_tsquery('english', %s)"
+
+    @classmethod
+    def vector(cls) -> str:
+        table = course_models.Course._meta.db_table
+        return (
+            f"(setweight(to_tsvector('english', coalesce({table}.title, '')), 'A')"
+            f" || setweight(to_tsvector('english', "
+            f"coalesce({table}.description, '')), 'B'))"
+        )
+
+    @classmethod
+    def create_index(cls, using: str):
+        table = course_models.Course._meta.db_table
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {cls.INDEX_NAME} "
+                f"ON {table} USING GIN ({cls.vector()})"
+            )
+
+    def search(self, query: str, category: str | None = None, limit: int = 20):
+        if not query.strip():
+            return {"count": 0, "ids": [], "facets": self.facets(None)}
+        vector = self.vector()
+        courses = course_models.Course.objects.filter(
+            RawSQL(
+                f"{vector} @@ {self.TSQUERY}",
+                [query],
+                output_field=models.BooleanField(),
+            ),
+            is_available=True,
+        )
+        if category:
+            courses = courses.filter(category__slug=category)
+        ranked = courses.annotate(
+            rank=RawSQL(
+                f"ts_rank({vector}, {self.TSQUERY})",
+                [query],
+                output_field=models.FloatField(),
+            )
+        ).order_by("-rank")
+        return {
+            "count": courses.count(),
+            "ids": list(ranked.values_list("id", flat=True)[:limit]),
+            "facets": self.facets(courses),
+        }
+
+    def facets(self, courses) -> dict[str, dict[str, int]]:
+        if courses is None:
+            return {"categories": {}, "price_bands": {}, "instructors": {}}
+        categories = (
+            courses.exclude(category__slug=None)
+            .values_list("category__slug")
+            .annotate(count=models.Count("id", distinct=True))
+            .order_by()
+        )
+        bands = courses.aggregate(
+            **{
+                key: models.Count(
+                    "id",
+                    filter=models.Q(price__gte=low)
+                    & (models.Q(price__lt=high) if high is not None else models.Q()),
+                )
+                for key, low, high in PRICE_BANDS
+            }
+        )
+        instructors = (
+            courses.values_list("owner_id")
+            .annotate(count=models.Count("id"))
+            .order_by()
+        )
+        return {
+            "categories": dict(categories),
+            "price_bands": bands,
+            "instructors": {str(owner): count for owner, count in instructors},
+        }
+
+    def update(self, course: course_models.Course):
+        # the expression index is maintained by postgres
+        pass
+
+    def remove(self, course_id):
+        pass
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        if connections["default"].vendor == "postgresql":
+            _backend = PostgresCourseSearch()
+        else:
+            _backend = InMemoryCourseSearch()
+    return _backend
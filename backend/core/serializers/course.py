@@ -1,19 +1,18 @@
-from models import course
 from rest_framework import serializers
 
+from core.models import course
+
 from .user import InstructorSerializer, UserSerializer
 
 
 class CourseCategorySerializer(serializers.ModelSerializer):
-    course_number = serializers.SerializerMethodField()
+    # annotated by CoreService.get_course_categories
+    course_number = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = course.CourseCategory
         fields = ["name", "slug", "course_number"]
 
-    def get_course_number(self, obj):
-        return obj.course_set.count()
-
 
 class SimpleCourseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -46,17 +45,19 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
     def get_students_count(self, obj: course.Course):
+        # annotated by Course.objects.catalog()
+        if hasattr(obj, "students_count"):
+            return obj.students_count
         return obj.students.count()
 
     def get_objectives(self, obj: course.Course):
-        objectives = course.CourseObjective.objects.filter(course=obj).order_by("order")
+        # ordered by CourseObjective.Meta.ordering, prefetched by catalog()
+        objectives = obj.courseobjective_set.all()
         data = CourseObjectiveSerializer(objectives, many=True).data
         return data
 
     def get_requirements(self, obj: course.Course):
-        requirements = course.CourseRequirement.objects.filter(course=obj).order_by(
-            "order"
-        )
+        requirements = obj.courserequirement_set.all()
         data = CourseRequirementSerializer(requirements, many=True).data
         return data
 
@@ -68,14 +69,31 @@ class ModuleSerializer(serializers.ModelSerializer):
 
 
 class ContentSerializer(serializers.ModelSerializer):
-    title = serializers.SerializerMethodField()
+    class Meta:
+        model = course.Content
+        fields = ["title", "type", "duration"]
+
+
+class SyllabusResourceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = course.Resource
+        fields = ["id", "order", "type", "title"]
+
+
+class SyllabusContentSerializer(serializers.ModelSerializer):
+    resources = SyllabusResourceSerializer(many=True)
 
     class Meta:
         model = course.Content
-        fields = ["title", "type"]
+        fields = ["id", "order", "type", "title", "duration", "resources"]
+
 
-    def get_title(self, obj):
-        return obj.item.title
+class SyllabusModuleSerializer(serializers.ModelSerializer):
+    contents = SyllabusContentSerializer(many=True)
+
+    class Meta:
+        model = course.Module
+        fields = ["id", "order", "title", "description", "contents"]
 
 
 class CourseReviewsSerializer(serializers.ModelSerializer):
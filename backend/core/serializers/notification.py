@@ -1,7 +1,9 @@
-from models import course, notification, user
+from rest_framework import serializers
+
+from core.models import course, notification, user
+
 from . import course as course_serializers
 from . import user as user_serializers
-from rest_framework import serializers
 
 
 class RelateObjectField(serializers.RelatedField):
@@ -1,10 +1,11 @@
 from django.db import transaction as db_transaction
-from models import course as course_models
-from models import sales
-from models import user as user_models
 from rest_framework import generics, serializers
 
 from core import exceptions
+from core.models import course as course_models
+from core.models import sales
+from core.models import user as user_models
+from core.pricing import CartPricing, PricedCart
 from core.service import CoreService
 
 from . import course as course_serializer
@@ -16,33 +17,57 @@ class CouponSerializer(serializers.ModelSerializer):
         fields = ["code", "discount", "is_valid"]
 
 
-class CartItemSerializer(serializers.ModelSerializer):
-    course = course_serializer.SimpleCourseSerializer()
+class CartItemSerializer(serializers.Serializer):
+    """
+    Serializes a core.pricing.PricedLine
+    """
 
-    class Meta:
-        model = sales.CartItem
-        fields = ["course", "price", "discounted_price"]
+    course = course_serializer.SimpleCourseSerializer()
+    price = serializers.DecimalField(max_digits=15, decimal_places=2)
+    discounted_price = serializers.DecimalField(max_digits=15, decimal_places=2)
 
 
 class CartSerializer(serializers.ModelSerializer):
     coupon = CouponSerializer()
     items = serializers.SerializerMethodField()
+    subtotal = serializers.SerializerMethodField()
+    discount = serializers.SerializerMethodField()
+    total = serializers.SerializerMethodField()
 
     class Meta:
         model = sales.Cart
         fields = "__all__"
 
+    def get_pricing(self, obj: sales.Cart) -> PricedCart:
+        if "pricing" not in self.context:
+            self.context["pricing"] = CartPricing(obj).price()
+        return self.context["pricing"]
+
     def get_items(self, obj: sales.Cart):
-        items = CoreService.get_cart_contents(obj)
-        data = CartItemSerializer(items, many=True).data
+        lines = self.get_pricing(obj).lines
+        data = CartItemSerializer(lines, many=True).data
         return data
 
+    def get_subtotal(self, obj: sales.Cart):
+        return str(self.get_pricing(obj).subtotal)
+
+    def get_discount(self, obj: sales.Cart):
+        return str(self.get_pricing(obj).discount)
+
+    def get_total(self, obj: sales.Cart):
+        return str(self.get_pricing(obj).total)
+
 
 class AddToCartSerializer(serializers.Serializer):
     course = serializers.UUIDField()
 
     def validate(self, attrs):
         course = generics.get_object_or_404(course_models.Course, id=attrs["course"])
+        owned = course_models.CourseStudent.objects.owned_course_ids(
+            self.context["user"], [course.id]
+        )
+        if owned:
+            raise serializers.ValidationError({"detail": f"{course} already Purchased"})
         self.context["course"] = course
         return attrs
 
@@ -70,7 +95,8 @@ class ApplyCouponSerializer(serializers.Serializer):
     coupon = serializers.CharField()
 
     def validate(self, attrs):
-        coupon = generics.get_object_or_404(sales.Coupon, code=attrs["coupon"])
+        if not (coupon := sales.Coupon.get_cached(attrs["coupon"])):
+            raise exceptions.CouponIsInvalid
         if not coupon.is_valid:
             raise exceptions.CouponIsInvalid
         self.context["coupon"] = coupon
@@ -95,24 +121,35 @@ class CreateOrderSerializer(serializers.Serializer):
     def validate(self, attrs):
         cart: sales.Cart = self.context["cart"]
         user = self.context["user"]
-        items = sales.CartItem.objects.filter(cart=cart)
-        for item in items:
-            if user in item.course.students.all():
+        pricing = CartPricing(cart).price()
+        owned = course_models.CourseStudent.objects.owned_course_ids(
+            user, [line.course.id for line in pricing.lines]
+        )
+        for line in pricing.lines:
+            if line.course.id in owned:
                 raise serializers.ValidationError(
-                    {"detail": f"{item.course} already Purchased"}
+                    {"detail": f"{line.course} already Purchased"}
                 )
+        self.context["pricing"] = pricing
         return attrs
 
     @db_transaction.atomic
     def save(self):
         order, tx = CoreService.create_order(
-            self.context["user"], self.validated_data["payment_method"]
+            self.context["user"],
+            self.validated_data["payment_method"],
+            cart=self.context["cart"],
+            pricing=self.context["pricing"],
         )
-        return {
+        data = {
             "ref": tx.ref,
             "order": order.id_str,
             "payment_method": tx.payment_method,
         }
+        if tx.payment_method in user_models.CRYPTO_PAYMENTS:
+            # payable once the invoice submitter has confirmed the invoice
+            data["invoice_status"] = tx.invoice.get_status_display()
+        return data
 
 
 class VerifyTransactionSerializer(serializers.Serializer):
@@ -123,7 +160,11 @@ class VerifyTransactionSerializer(serializers.Serializer):
             transaction = user_models.Transaction.objects.get(ref=attrs["transaction"])
         except user_models.Transaction.DoesNotExist:
             raise exceptions.InvalidTransaction
-        if transaction.status != transaction.STATUSES.INITAILIZED:
+        allowed = [transaction.STATUSES.INITAILIZED]
+        if transaction.payment_method in user_models.CRYPTO_PAYMENTS:
+            # confirmed by the payment indexer, nothing left to do
+            allowed.append(transaction.STATUSES.VERIFIED)
+        if transaction.status not in allowed:
             raise exceptions.InvalidTransaction
         self.context["transaction"] = transaction
         return attrs
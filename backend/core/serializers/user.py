@@ -1,6 +1,7 @@
-from models import user
 from rest_framework import serializers
 
+from core.models import user
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,11 +1,19 @@
 from django.contrib.contenttypes.models import ContentType
-from models import course as course_models
-from models import sales as sales_models
-from models import user as user_models
+from django.core.cache import cache
+from django.db.models import Count, Prefetch, Q
 from rest_framework.exceptions import ValidationError
 
-from . import exceptions
+from core import cache as core_cache
 from core import payment
+from core.models import course as course_models
+from core.models import sales as sales_models
+from core.models import user as user_models
+from core.prices import PriceUnavailable
+from core.pricing import CartPricing, PricedCart
+from core.search import get_search_backend
+from core.serializers import course as course_serializers
+
+from . import exceptions
 
 
 class DashboardService:
@@ -15,7 +23,7 @@ class DashboardService:
 class CoreService:
     @classmethod
     def get_user_cart(cls, user: user_models.User) -> sales_models.Cart:
-        return user.cart
+        return sales_models.Cart.objects.select_related("coupon").get(user=user)
 
     @classmethod
     def get_course_reviews(cls, course: course_models.Course):
@@ -34,18 +42,88 @@ class CoreService:
         modules = course_models.Module.objects.filter(course=course)
         return modules.order_by("order")
 
+    @classmethod
+    def get_course_categories(cls) -> list[dict]:
+        """
+        Categories with their number of available courses, counted in a
+        single query and cached until a course or category changes.
+        """
+        if (categories := cache.get(core_cache.CATEGORIES_CACHE_KEY)) is not None:
+            return categories
+        queryset = course_models.CourseCategory.objects.annotate(
+            course_number=Count("course", filter=Q(course__is_available=True))
+        ).order_by("name")
+        categories = course_serializers.CourseCategorySerializer(
+            queryset, many=True
+        ).data
+        cache.set(
+            core_cache.CATEGORIES_CACHE_KEY,
+            categories,
+            core_cache.CATEGORIES_CACHE_TIMEOUT,
+        )
+        return categories
+
+    @classmethod
+    def search_courses(cls, query: str, category: str | None = None, limit=20):
+        result = get_search_backend().search(query, category, limit)
+        courses = course_models.Course.objects.in_bulk(result["ids"])
+        return {
+            "count": result["count"],
+            "results": course_serializers.SimpleCourseSerializer(
+                [courses[pk] for pk in result["ids"] if pk in courses], many=True
+            ).data,
+            "facets": result["facets"],
+        }
+
+    @classmethod
+    def get_course_syllabus(cls, course_id) -> list[dict] | None:
+        """
+        The course -> modules -> contents -> resources tree, built with
+        four queries and cached until the course is edited.
+        Returns None if the course does not exist.
+        """
+        key = core_cache.course_syllabus_key(course_id)
+        if (syllabus := cache.get(key)) is not None:
+            return syllabus
+        if not course_models.Course.objects.filter(id=course_id).exists():
+            return None
+        resources = course_models.Resource.objects.only(
+            "content_id", "order", "type", "title"
+        ).order_by("order")
+        contents = (
+            course_models.Content.objects.only(
+                "module_id", "order", "type", "title", "duration"
+            )
+            .prefetch_related(Prefetch("resources", queryset=resources))
+            .order_by("order")
+        )
+        modules = (
+            course_models.Module.objects.filter(course_id=course_id)
+            .prefetch_related(Prefetch("contents", queryset=contents))
+            .order_by("order")
+        )
+        syllabus = course_serializers.SyllabusModuleSerializer(
+            modules, many=True
+        ).data
+        cache.set(key, syllabus, core_cache.SYLLABUS_CACHE_TIMEOUT)
+        return syllabus
+
     @classmethod
     def get_cart_contents(cls, cart: sales_models.Cart):
         cartitems = sales_models.CartItem.objects.filter(cart=cart)
         return cartitems
 
     @classmethod
-    def apply_coupon(cls, user: user_models.User, coupon: sales_models.Coupon):
+    def apply_coupon(
+        cls,
+        user: user_models.User,
+        coupon: sales_models.Coupon | sales_models.CachedCoupon,
+    ):
         if not coupon.is_valid:
             return  # raise error here later
         cart: sales_models.Cart = cls.get_user_cart(user)
-        cart.coupon = coupon
-        cart.save()
+        cart.coupon_id = coupon.id
+        cart.save(update_fields=["coupon", "updated_at"])
 
     @classmethod
     def remove_coupon(cls, user: user_models.User):
@@ -69,24 +147,32 @@ class CoreService:
         cls,
         user: user_models.User,
         payment_method: user_models.Transaction.PAYMENT_METHODS,
+        cart: sales_models.Cart | None = None,
+        pricing: PricedCart | None = None,
     ):
-        cart: sales_models.Cart = cls.get_user_cart(user)
-        if cart.is_empty:
+        cart = cart or cls.get_user_cart(user)
+        pricing = pricing or CartPricing(cart).price()
+        if pricing.is_empty:
             raise exceptions.CartIsEmpty
 
         order = sales_models.Order.objects.create(user=user, coupon=cart.coupon)
-        order.create_order()
+        try:
+            total_price = order.create_order(cart, pricing)
+        except sales_models.CouponExhausted:
+            raise exceptions.CouponIsInvalid
         order_ct = ContentType.objects.get_for_model(sales_models.Order)
         tx = user_models.Transaction.objects.create(
             item_ct=order_ct,
             item_id=order.id,
-            amount=order.total_price,
+            amount=total_price,
             payment_method=payment_method,
             reason=user_models.Transaction.REASONS.ORDER_PAY,
         )
         # initialize the transaction
         try:
             cls.initalize_transaction(tx)
+        except PriceUnavailable:
+            raise exceptions.PriceIsUnavailable
         except Exception:
             raise exceptions.TransactionInitializationError
         return order, tx
@@ -104,8 +190,11 @@ class CoreService:
     def verify_transaction(cls, tx: user_models.Transaction):
         # transaction verification
         if tx.payment_method in user_models.CRYPTO_PAYMENTS:
-            verified = payment.CryptoPayment.verify_transaction(tx)
-        elif tx.payment_method == user_models.PaymentMethods.FIAT:
+            if not payment.CryptoPayment.verify_transaction(tx):
+                raise exceptions.TransactionPending
+            # the indexer has already processed the order
+            return
+        if tx.payment_method == user_models.PaymentMethods.FIAT:
             verified = payment.FiatPayment.verify_transaction(tx)
         else:
             verified = payment.InternalPayment.verify_transaction(tx)
@@ -0,0 +1,139 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.cache import bump_course_version, invalidate_categories
+from core.indexer import ref_hash
+from core.models import course as course_models
+from core.models import sales as sales_models
+from core.models import user as user_models
+from core.search import PostgresCourseSearch, get_search_backend
+
+
+@receiver(post_save, sender=course_models.Video)
+@receiver(post_save, sender=course_models.Book)
+@receiver(post_save, sender=course_models.Text)
+def sync_content_snapshot(sender, instance, created, **kwargs):
+    if created:
+        # no content can point at an item before it exists
+        return
+    ct = ContentType.objects.get_for_model(sender)
+    contents = course_models.Content.objects.filter(item_ct=ct, item_id=instance.id)
+    course_ids = set(contents.values_list("module__course_id", flat=True))
+    contents.update(
+        title=instance.title, duration=getattr(instance, "duration", None)
+    )
+    for course_id in course_ids:
+        bump_course_version(course_id)
+
+
+@receiver(post_save, sender=course_models.Link)
+def sync_resource_snapshot(sender, instance, created, **kwargs):
+    if created:
+        return
+    ct = ContentType.objects.get_for_model(sender)
+    resources = course_models.Resource.objects.filter(item_ct=ct, item_id=instance.id)
+    course_ids = set(resources.values_list("content__module__course_id", flat=True))
+    resources.update(title=instance.title)
+    for course_id in course_ids:
+        bump_course_version(course_id)
+
+
+@receiver(post_save, sender=course_models.Module)
+@receiver(post_delete, sender=course_models.Module)
+def invalidate_module_syllabus(sender, instance, **kwargs):
+    bump_course_version(instance.course_id)
+
+
+@receiver(post_save, sender=course_models.Content)
+@receiver(post_delete, sender=course_models.Content)
+def invalidate_content_syllabus(sender, instance, **kwargs):
+    course_id = (
+        course_models.Module.objects.filter(id=instance.module_id)
+        .values_list("course_id", flat=True)
+        .first()
+    )
+    if course_id:
+        bump_course_version(course_id)
+
+
+@receiver(post_save, sender=course_models.Resource)
+@receiver(post_delete, sender=course_models.Resource)
+def invalidate_resource_syllabus(sender, instance, **kwargs):
+    course_id = (
+        course_models.Content.objects.filter(id=instance.content_id)
+        .values_list("module__course_id", flat=True)
+        .first()
+    )
+    if course_id:
+        bump_course_version(course_id)
+
+
+@receiver(post_save, sender=course_models.Course)
+@receiver(post_delete, sender=course_models.Course)
+@receiver(post_save, sender=course_models.CourseCategory)
+@receiver(post_delete, sender=course_models.CourseCategory)
+def invalidate_course_categories(sender, **kwargs):
+    invalidate_categories()
+
+
+@receiver(m2m_changed, sender=course_models.Course.category.through)
+def invalidate_course_category_links(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_categories()
+
+
+@receiver(post_save, sender=course_models.Course)
+def index_course(sender, instance, **kwargs):
+    get_search_backend().update(instance)
+
+
+@receiver(post_delete, sender=course_models.Course)
+def unindex_course(sender, instance, **kwargs):
+    get_search_backend().remove(instance.id)
+
+
+@receiver(m2m_changed, sender=course_models.Course.category.through)
+def reindex_course_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        get_search_backend().update(instance)
+        return
+    # categories changed from the category side
+    for course in course_models.Course.objects.filter(id__in=pk_set or []):
+        get_search_backend().update(course)
+
+
+@receiver(post_migrate)
+def create_course_search_index(sender, using, **kwargs):
+    if sender.name == "core" and connections[using].vendor == "postgresql":
+        PostgresCourseSearch.create_index(using)
+
+
+@receiver(post_save, sender=sales_models.Coupon)
+@receiver(post_delete, sender=sales_models.Coupon)
+def invalidate_coupon(sender, instance, **kwargs):
+    # a new version also drops the entry cached under a previous code
+    sales_models.Coupon.invalidate_cached()
+
+
+@receiver(m2m_changed, sender=sales_models.Coupon.courses.through)
+def invalidate_coupon_courses(sender, action, **kwargs):
+    # from either side, only the coupons cache their courses
+    if action in ("post_add", "post_remove", "post_clear"):
+        sales_models.Coupon.invalidate_cached()
+
+
+@receiver(pre_save, sender=user_models.Transaction)
+def hash_transaction_ref(sender, instance, **kwargs):
+    # the ref is generated just before pre_save, and again on a retry
+    if instance.ref:
+        instance.ref_hash = ref_hash(instance.ref)
@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from urllib3.exceptions import NewConnectionError, ReadTimeoutError
+
+from core.blockchain import (
+    BlockchainClient,
+    NonceManager,
+    PaymentBatchClient,
+    TransactionSender,
+)
+
+from .utils import contract_abi
+
+
+class PaymentBatchClientTest(SimpleTestCase):
+    refs = ["a", "b", "c"]
+
+    def batch_client(self, *functions: str) -> PaymentBatchClient:
+        contract = mock.MagicMock()
+        contract.abi = contract_abi(*functions)
+        # every ref but "b" is paid
+        contract.functions.checkPaymentStatuses.side_effect = lambda refs: mock.Mock(
+            call=mock.Mock(return_value=[ref != "b" for ref in refs])
+        )
+        contract.functions.checkPaymentStatus.side_effect = lambda ref: mock.Mock(
+            call=mock.Mock(return_value=ref != "b")
+        )
+        return PaymentBatchClient(contract, max_batch=2)
+
+    def test_batches_once_the_contract_has_the_batch_methods(self):
+        client = self.batch_client("createInvoices", "checkPaymentStatuses")
+
+        statuses = client.check_payment_statuses(self.refs)
+
+        self.assertEqual(statuses, {"a": True, "b": False, "c": True})
+        functions = client.contract.functions
+        self.assertEqual(functions.checkPaymentStatuses.call_count, 2)
+        functions.checkPaymentStatus.assert_not_called()
+
+    def test_checks_one_ref_at_a_time_without_them(self):
+        client = self.batch_client("createInvoice", "checkPaymentStatus")
+
+        statuses = client.check_payment_statuses(self.refs)
+
+        self.assertEqual(statuses, {"a": True, "b": False, "c": True})
+        functions = client.contract.functions
+        self.assertEqual(functions.checkPaymentStatus.call_count, 3)
+        functions.checkPaymentStatuses.assert_not_called()
+
+
+class BlockchainClientTest(SimpleTestCase):
+    def retry(self):
+        client = BlockchainClient("http://node", "data.json", retries=2)
+        return client.session.get_adapter("http://node").max_retries
+
+    def test_failed_connections_are_retried(self):
+        retry = self.retry()
+        for _ in range(2):
+            retry = retry.increment(
+                "POST", "/", error=NewConnectionError(None, "refused")
+            )
+        self.assertEqual(retry.connect, 0)
+
+    def test_posts_that_reached_the_node_are_not_retried(self):
+        # e.g. an eth_sendRawTransaction whose response timed out
+        with self.assertRaises(ReadTimeoutError):
+            self.retry().increment(
+                "POST", "/", error=ReadTimeoutError(None, "/", "timed out")
+            )
+        for status in (429, 502, 503):
+            with self.subTest(status=status):
+                self.assertFalse(
+                    self.retry().is_retry("POST", status, has_retry_after=True)
+                )
+
+
+class TransactionSenderTest(SimpleTestCase):
+    address = "0x" + "55" * 20
+
+    def setUp(self):
+        self.web3 = mock.MagicMock()
+        self.web3.eth.get_transaction_count.return_value = 5
+        self.web3.eth.gas_price = 100
+        self.web3.eth.send_raw_transaction.return_value = b"\x01"
+        managers = mock.patch.dict(NonceManager._managers, clear=True)
+        managers.start()
+        self.addCleanup(managers.stop)
+        self.sender = TransactionSender(self.web3, self.address, "key")
+        self.function = mock.MagicMock()
+        self.function.estimate_gas.return_value = 1000
+
+    def sent(self) -> dict:
+        return self.function.build_transaction.call_args.args[0]
+
+    def test_failed_send_gives_its_nonce_back(self):
+        for failing in (
+            self.function.build_transaction,
+            self.web3.eth.account.sign_transaction,
+            self.web3.eth.send_raw_transaction,
+        ):
+            with self.subTest(failing=failing):
+                failing.side_effect = ValueError("failed")
+                with self.assertRaises(ValueError):
+                    self.sender.send(self.function)
+                failing.side_effect = None
+
+                self.assertEqual(self.sender.send(self.function), (5, "0x01"))
+
+    def test_replacement_reuses_the_nonce_and_pays_more(self):
+        self.web3.eth.get_transaction.return_value = {"gasPrice": 200}
+
+        self.assertEqual(self.sender.replace(self.function, 3, "0xabc"), (3, "0x01"))
+
+        self.assertEqual((self.sent()["nonce"], self.sent()["gasPrice"]), (3, 240))
+        self.web3.eth.get_transaction_count.assert_not_called()
@@ -0,0 +1,143 @@
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import course as course_models
+
+from .utils import CoreTestCase, create_course, create_instructor, create_user
+
+
+class CatalogQueriesTest(CoreTestCase):
+    def add_relations(self, course, count: int):
+        for i in range(count):
+            course.co_instructors.add(create_instructor())
+            course.category.add(
+                course_models.CourseCategory.objects.create(name=f"{course.id}-{i}")
+            )
+            course_models.CourseObjective.objects.create(
+                course=course, title=f"Objective {i}"
+            )
+            course_models.CourseRequirement.objects.create(
+                course=course, title=f"Requirement {i}"
+            )
+            course_models.CourseStudent.objects.create(
+                user=create_user(), course=course
+            )
+
+    def test_course_detail_query_count_is_fixed(self):
+        small, large = create_course(), create_course()
+        self.add_relations(small, 1)
+        self.add_relations(large, 5)
+
+        # the course with its owner, then one query per prefetched relation
+        for course in (small, large):
+            with self.assertNumQueries(7):
+                response = self.client.get(
+                    reverse("course_details", kwargs={"id": course.id})
+                )
+            self.assertEqual(response.status_code, 200)
+
+        data = response.json()
+        self.assertEqual(data["students_count"], 5)
+        self.assertEqual(len(data["students"]), 5)
+        self.assertEqual(len(data["co_instructors"]), 5)
+        self.assertEqual(len(data["category"]), 5)
+        self.assertEqual(
+            [item["title"] for item in data["objectives"]],
+            [f"Objective {i}" for i in range(5)],
+        )
+        self.assertEqual(len(data["requirements"]), 5)
+
+    def test_course_list_is_one_query(self):
+        for _ in range(3):
+            self.add_relations(create_course(), 2)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("courses"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+
+class CourseContentQueriesTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def enrolled_course(self):
+        course = create_course()
+        course_models.CourseStudent.objects.create(user=self.student, course=course)
+        return course
+
+    def add_contents(self, module, count: int) -> list:
+        contents = []
+        for i in range(count):
+            if i % 2:
+                item = course_models.Text.objects.create(title=f"Text {i}", text="")
+            else:
+                item = course_models.Video.objects.create(title=f"Video {i}")
+            contents.append(
+                course_models.Content.objects.create(module=module, item=item)
+            )
+        return contents
+
+    def get(self, url: str, queries: int):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_module_outline_query_count_is_fixed(self):
+        for size in (1, 4):
+            course = self.enrolled_course()
+            for i in range(size):
+                module = course_models.Module.objects.create(
+                    course=course, title=f"Module {i}"
+                )
+                self.add_contents(module, size)
+
+            # the course, the enrollment, the modules, their contents
+            data = self.get(f"/account/courses/{course.id}/modules/", 4)
+
+            counts = [len(module["contents"]) for module in data]
+            self.assertEqual(counts, [size] * size)
+
+    def test_content_query_count_is_fixed(self):
+        for size in (1, 4):
+            course = self.enrolled_course()
+            module = course_models.Module.objects.create(course=course, title="Module")
+            content = self.add_contents(module, 1)[0]
+            for i in range(size):
+                link = course_models.Link.objects.create(
+                    title=f"Link {i}", url="https://example.com"
+                )
+                course_models.Resource.objects.create(
+                    content=content, type=course_models.ResourceType.LINK, item=link
+                )
+
+            # the course, the enrollment, the content and its item, its
+            # resources and their links
+            data = self.get(f"/account/courses/{course.id}/content/{content.id}/", 6)
+
+            self.assertEqual(data["item"]["title"], "Video 0")
+            self.assertEqual(len(data["resources"]), size)
+
+    def test_chat_messages_query_count_is_fixed(self):
+        for size in (1, 4):
+            course = self.enrolled_course()
+            room = course_models.CourseChatRoom.objects.create(course=course)
+            for i in range(size):
+                text = course_models.MessageText.objects.create(content=f"Hi {i}")
+                course_models.CourseMessage.objects.create(
+                    room=room,
+                    user=self.student,
+                    type=course_models.CourseMessageType.TEXT,
+                    content=text,
+                )
+
+            # the course, the enrollment, the room (once more for the
+            # default model permissions), the messages with their users and
+            # their texts
+            data = self.get(f"/account/courses/{course.id}/messages/", 6)
+
+            self.assertEqual(len(data["data"]), size)
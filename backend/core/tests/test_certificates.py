@@ -0,0 +1,165 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.utils import timezone
+from web3.exceptions import ContractLogicError
+
+from core.certificates import CertificateMinter
+from core.models import course as course_models
+from core.models.blockchain import CertificateMint, MintStatus
+
+from .utils import CoreTestCase, contract_abi, create_course, create_user
+
+WALLET = "0x" + "33" * 20
+
+
+class CertificateMinterTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contract = mock.MagicMock()
+        self.contract.abi = contract_abi("mint", "mintBatch", "ownerOf")
+        self.course = create_course()
+
+    def minter(self) -> CertificateMinter:
+        minter = CertificateMinter(
+            mock.MagicMock(), self.contract, "0x" + "44" * 20, "key"
+        )
+        send = mock.patch.object(minter.sender, "send", return_value=(3, "0xabc"))
+        self.send = send.start()
+        self.addCleanup(send.stop)
+        return minter
+
+    def queue(self) -> CertificateMint:
+        enrollment = course_models.CourseStudent.objects.create(
+            user=create_user(), course=self.course
+        )
+        return CertificateMint.objects.create(
+            course_student=enrollment, recipient=WALLET, token_id=enrollment.id.int
+        )
+
+    def test_completed_enrollments_keep_their_whole_id(self):
+        student = create_user(wallet_id=WALLET)
+        enrollment = course_models.CourseStudent.objects.create(
+            user=student,
+            course=self.course,
+            status=course_models.CourseStudentStatus.COMPLETED,
+        )
+
+        self.assertEqual(CertificateMint.objects.enqueue_completed(), 1)
+
+        mint = CertificateMint.objects.get()
+        # a uuid needs all 128 bits, more than a float can hold
+        self.assertEqual(mint.token_id, enrollment.id.int)
+        self.assertEqual(
+            CertificateMint.objects.get(token_id=enrollment.id.int).pk, mint.pk
+        )
+
+    def test_queued_certificates_are_minted_in_one_transaction(self):
+        mints = [self.queue() for _ in range(3)]
+
+        self.assertEqual(self.minter().mint_batch(), 3)
+
+        self.send.assert_called_once()
+        self.contract.functions.mint.assert_not_called()
+        recipients, token_ids = self.contract.functions.mintBatch.call_args.args
+        self.assertCountEqual(token_ids, [mint.token_id for mint in mints])
+
+    def test_contract_without_mint_batch_gets_one_transaction_each(self):
+        self.contract.abi = contract_abi("mint", "ownerOf")
+        for _ in range(3):
+            self.queue()
+
+        self.assertEqual(self.minter().mint_batch(), 3)
+
+        self.assertEqual(self.send.call_count, 3)
+        self.contract.functions.mintBatch.assert_not_called()
+        self.assertEqual(
+            CertificateMint.objects.filter(status=MintStatus.SUBMITTED).count(), 3
+        )
+
+    def test_reverted_mint_of_a_minted_token_counts_as_minted(self):
+        self.contract.abi = contract_abi("mint", "ownerOf")
+        minted, missing = self.queue(), self.queue()
+        CertificateMint.objects.update(status=MintStatus.SUBMITTED, tx_hash="0x1")
+
+        def owner_of(token_id):
+            if token_id == minted.token_id:
+                return mock.Mock(call=mock.Mock(return_value=WALLET))
+            # as for a token that does not exist
+            return mock.Mock(call=mock.Mock(side_effect=ContractLogicError()))
+
+        self.contract.functions.ownerOf.side_effect = owner_of
+        minter = self.minter()
+
+        with mock.patch.object(
+            minter.sender, "receipts", return_value={"0x1": {"status": 0}}
+        ):
+            self.assertEqual(minter.check_receipts(), 2)
+
+        minted.refresh_from_db()
+        missing.refresh_from_db()
+        self.assertEqual(minted.status, MintStatus.MINTED)
+        self.assertEqual(missing.status, MintStatus.QUEUED)
+
+    def test_mints_not_mined_in_time_are_replaced(self):
+        self.contract.abi = contract_abi("mint", "ownerOf")
+        minted, stuck, exhausted = self.queue(), self.queue(), self.queue()
+        CertificateMint.objects.update(
+            status=MintStatus.SUBMITTED,
+            nonce=4,
+            attempts=1,
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        for mint, tx_hash in [(minted, "0x1"), (stuck, "0x2"), (exhausted, "0x3")]:
+            CertificateMint.objects.filter(pk=mint.pk).update(tx_hash=tx_hash)
+        CertificateMint.objects.filter(pk=exhausted.pk).update(attempts=5)
+
+        def owner_of(token_id):
+            if token_id == minted.token_id:
+                return mock.Mock(call=mock.Mock(return_value=WALLET))
+            return mock.Mock(call=mock.Mock(side_effect=ContractLogicError()))
+
+        self.contract.functions.ownerOf.side_effect = owner_of
+        minter = self.minter()
+
+        with (
+            mock.patch.object(minter.sender, "receipts", return_value={}),
+            mock.patch.object(
+                minter.sender, "replace", return_value=(4, "0x4")
+            ) as replace,
+        ):
+            self.assertEqual(minter.check_receipts(), 2)
+
+        self.send.assert_not_called()
+        replace.assert_called_once_with(
+            self.contract.functions.mint.return_value, 4, "0x2"
+        )
+        self.contract.functions.mint.assert_called_once_with(WALLET, stuck.token_id)
+        for mint, status, tx_hash in [
+            (minted, MintStatus.MINTED, "0x1"),
+            (stuck, MintStatus.SUBMITTED, "0x4"),
+            (exhausted, MintStatus.FAILED, "0x3"),
+        ]:
+            mint.refresh_from_db()
+            self.assertEqual((mint.status, mint.tx_hash), (status, tx_hash))
+        self.assertEqual(stuck.attempts, 2)
+
+
+class CertificateMinterSettingsTest(CoreTestCase):
+    @override_settings(
+        CERTIFICATE_MINTER_ADDRESS=None, CERTIFICATE_MINTER_PRIVATE_KEY=None
+    )
+    def test_minter_account_is_required(self):
+        with self.assertRaises(ImproperlyConfigured):
+            CertificateMinter.from_settings()
+
+    @override_settings(
+        ADMIN_ADDRESS=WALLET,
+        CERTIFICATE_MINTER_ADDRESS=WALLET.upper().replace("0X", "0x"),
+        CERTIFICATE_MINTER_PRIVATE_KEY="key",
+    )
+    def test_minter_cannot_share_the_payment_account(self):
+        with self.assertRaises(ImproperlyConfigured):
+            CertificateMinter.from_settings()
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+from unittest import SkipTest, mock
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.test import TransactionTestCase, override_settings
+
+from core.consumers.course import CourseConsumer
+from core.consumers.service import EventHandler, SocketTypes
+from core.models import course as course_models
+from core.routing import websocket_urlpatterns
+from core.utils import get_course_channel_name
+
+from .utils import (
+    IN_MEMORY_CHANNEL_LAYERS,
+    LOCMEM_CACHES,
+    REDIS_CHANNEL_LAYERS,
+    create_course,
+    create_user,
+    redis_is_up,
+)
+
+
+class EchoHandler(EventHandler):
+    # set to hold events in their worker thread
+    hold = None
+
+    @classmethod
+    def process_data(cls, course_id: str, data: dict) -> dict:
+        if cls.hold is not None:
+            cls.hold.wait(5)
+        return {"content": data["content"]}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class CourseConsumerTest(TransactionTestCase):
+    def setUp(self):
+        self.course = create_course()
+        self.owner = self.course.owner.user
+        self.student = create_user()
+        course_models.CourseStudent.objects.create(
+            user=self.student, course=self.course
+        )
+        self.room = course_models.CourseChatRoom.objects.create(course=self.course)
+
+    def hold_events(self) -> threading.Event:
+        """
+        Handle chat events with EchoHandler, which waits for the returned
+        event to be set.
+        """
+        handlers = mock.patch.dict(
+            "core.consumers.course.EVENT_HANDLERS", {"chat": EchoHandler}
+        )
+        handlers.start()
+        self.addCleanup(handlers.stop)
+        EchoHandler.hold = threading.Event()
+        # never leave a worker thread waiting
+        self.addCleanup(EchoHandler.hold.set)
+        return EchoHandler.hold
+
+    async def connect(self, user) -> WebsocketCommunicator:
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f"/ws/course/{self.course.id}/"
+        )
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def chat(self, message: str, room=None) -> dict:
+        room = room or self.room
+        return {
+            "type": "chat",
+            "data": {"room_id": str(room.id), "type": "text", "content": message},
+        }
+
+    async def test_chat_messages_are_saved_and_broadcast(self):
+        owner = await self.connect(self.owner)
+        student = await self.connect(self.student)
+
+        await owner.send_json_to(self.chat("hello"))
+
+        received = [await owner.receive_json_from(), await student.receive_json_from()]
+        message = await course_models.CourseMessage.objects.aget()
+        self.assertEqual(message.room_id, self.room.id)
+        self.assertEqual(message.user_id, self.owner.id)
+        self.assertEqual(message.type, course_models.CourseMessageType.TEXT)
+        self.assertEqual(
+            await course_models.MessageText.objects.values_list(
+                "content", flat=True
+            ).aget(pk=message.content_id),
+            "hello",
+        )
+        for event in received:
+            self.assertEqual(event["type"], "chat")
+            self.assertEqual(event["data"]["id"], message.id_str)
+            self.assertEqual(event["data"]["user"], str(self.owner))
+            self.assertEqual(event["data"]["content"], "hello")
+        await owner.disconnect()
+        await student.disconnect()
+
+    async def test_chat_in_another_courses_room_is_refused(self):
+        other_room = await course_models.CourseChatRoom.objects.acreate(
+            course=await database_sync_to_async(create_course)()
+        )
+        owner = await self.connect(self.owner)
+        student = await self.connect(self.student)
+
+        await owner.send_json_to(self.chat("hello", room=other_room))
+
+        self.assertEqual(
+            await owner.receive_json_from(),
+            {"type": "error", "data": "course chat does not exist"},
+        )
+        self.assertTrue(await student.receive_nothing(0.3))
+        self.assertFalse(await course_models.CourseMessage.objects.aexists())
+        await owner.disconnect()
+        await student.disconnect()
+
+    async def test_excess_events_are_rejected_without_blocking(self):
+        hold = self.hold_events()
+        owner = await self.connect(self.owner)
+        for i in range(CourseConsumer.MAX_PENDING_EVENTS):
+            await owner.send_json_to(self.chat(f"held {i}"))
+
+        await owner.send_json_to(self.chat("one too many"))
+        self.assertEqual(
+            await owner.receive_json_from(),
+            {"type": "error", "data": "Too many pending events"},
+        )
+
+        # messages from the rest of the course still get through
+        await get_channel_layer().group_send(
+            get_course_channel_name(self.course.id),
+            {"type": SocketTypes.SEND_MESSAGE, "data": {"type": "announcement"}},
+        )
+        self.assertEqual(await owner.receive_json_from(), {"type": "announcement"})
+
+        hold.set()
+        messages = [
+            (await owner.receive_json_from())["data"]["content"]
+            for _ in range(CourseConsumer.MAX_PENDING_EVENTS)
+        ]
+        self.assertCountEqual(
+            messages, [f"held {i}" for i in range(CourseConsumer.MAX_PENDING_EVENTS)]
+        )
+        await owner.disconnect()
+
+    async def test_pending_events_finish_after_disconnect(self):
+        hold = self.hold_events()
+        owner = await self.connect(self.owner)
+        student = await self.connect(self.student)
+
+        await owner.send_json_to(self.chat("goodbye"))
+        await asyncio.sleep(0.1)
+        asyncio.get_running_loop().call_later(0.1, hold.set)
+        await owner.disconnect()
+
+        self.assertEqual(
+            await student.receive_json_from(),
+            {"type": "chat", "data": {"content": "goodbye"}},
+        )
+        await student.disconnect()
+
+    async def test_disconnect_cancels_events_that_take_too_long(self):
+        hold = self.hold_events()
+        owner = await self.connect(self.owner)
+        student = await self.connect(self.student)
+
+        await owner.send_json_to(self.chat("stuck"))
+        await asyncio.sleep(0.1)
+        with mock.patch.object(CourseConsumer, "DISCONNECT_TIMEOUT", 0.1):
+            await owner.disconnect()
+
+        hold.set()
+        self.assertTrue(await student.receive_nothing(0.3))
+        await student.disconnect()
+
+    async def test_anonymous_users_are_turned_away(self):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f"/ws/course/{self.course.id}/"
+        )
+        communicator.scope["user"] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+
+@override_settings(CHANNEL_LAYERS=REDIS_CHANNEL_LAYERS)
+class RedisCourseConsumerTest(CourseConsumerTest):
+    """
+    The same tests over channels_redis, as deployed. Needs a redis server
+    at CHANNEL_LAYER_LOCATION.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if not redis_is_up(settings.CHANNEL_LAYER_LOCATION):
+            raise SkipTest(f"no redis server at {settings.CHANNEL_LAYER_LOCATION}")
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        async_to_sync(get_channel_layer().flush)()
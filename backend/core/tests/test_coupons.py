@@ -0,0 +1,268 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import close_old_connections, connection
+from django.test import (
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from django.utils import timezone
+
+from core.models import course as course_models
+from core.models.sales import (
+    Coupon,
+    CouponExhausted,
+    CouponReservation,
+    CouponReservationStatus,
+    Order,
+    OrderItem,
+    OrderStatus,
+)
+
+from .utils import LOCMEM_CACHES, CoreTestCase, create_course, create_user
+
+
+def create_coupon(uses: int | None = 5, **kwargs) -> Coupon:
+    now = timezone.now()
+    return Coupon.objects.create(
+        code=kwargs.pop("code", f"CODE{Coupon.objects.count()}"),
+        discount=50,
+        valid_from=now - timedelta(days=1),
+        valid_to=now + timedelta(days=1),
+        uses=uses,
+        **kwargs,
+    )
+
+
+def remaining_uses(coupon: Coupon) -> int:
+    if coupon.shards.exists():
+        return sum(coupon.shards.values_list("uses", flat=True))
+    return Coupon.objects.get(pk=coupon.pk).uses
+
+
+class CouponReservationTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = create_course()
+        self.coupon = create_coupon(uses=1)
+
+    def order(self) -> Order:
+        order = Order.objects.create(user=create_user(), coupon=self.coupon)
+        OrderItem.objects.create(order=order, course=self.course, price=Decimal("5"))
+        return order
+
+    def reserve(self, order: Order) -> CouponReservation:
+        return CouponReservation.objects.reserve(self.coupon, order, 1)
+
+    def expire(self, reservation: CouponReservation):
+        CouponReservation.objects.filter(pk=reservation.pk).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(CouponReservation.objects.release_expired(), 1)
+
+    def test_paid_order_consumes_its_reservation(self):
+        order = self.order()
+        reservation = self.reserve(order)
+
+        self.assertEqual(Order.objects.filter(pk=order.pk).verify_paid(), 1)
+
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, CouponReservationStatus.CONSUMED)
+        self.assertEqual(remaining_uses(self.coupon), 0)
+        self.assertTrue(
+            course_models.CourseStudent.objects.filter(
+                user=order.user, course=self.course
+            ).exists()
+        )
+
+    def test_expired_reservation_gives_its_uses_back(self):
+        self.expire(self.reserve(self.order()))
+        self.assertEqual(remaining_uses(self.coupon), 1)
+
+    def test_payment_after_release_takes_the_uses_again(self):
+        order = self.order()
+        reservation = self.reserve(order)
+        self.expire(reservation)
+
+        self.assertEqual(Order.objects.filter(pk=order.pk).verify_paid(), 1)
+
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, CouponReservationStatus.CONSUMED)
+        self.assertEqual(remaining_uses(self.coupon), 0)
+
+    def test_payment_after_release_is_rejected_once_the_coupon_ran_out(self):
+        late = self.order()
+        self.expire(self.reserve(late))
+        # the released use went to another order in the meantime
+        self.reserve(self.order())
+
+        self.assertEqual(Order.objects.filter(pk=late.pk).verify_paid(), 0)
+
+        late.refresh_from_db()
+        self.assertEqual(late.status, OrderStatus.REJECTED)
+        self.assertEqual(remaining_uses(self.coupon), 0)
+        self.assertFalse(
+            course_models.CourseStudent.objects.filter(user=late.user).exists()
+        )
+
+    def test_resharding_keeps_reservations_on_a_shard(self):
+        self.coupon.uses = 6
+        self.coupon.save()
+        # reserved before the coupon was sharded
+        unsharded = self.reserve(self.order())
+        self.coupon.shard(3)
+        sharded = [self.reserve(self.order()) for _ in range(2)]
+        self.coupon.shard(2)
+
+        self.assertEqual(self.coupon.shards.count(), 2)
+        self.assertEqual(remaining_uses(self.coupon), 3)
+        for reservation in [unsharded, *sharded]:
+            reservation.refresh_from_db()
+            self.assertIsNotNone(reservation.shard_id)
+            reservation.release()
+        self.assertEqual(remaining_uses(self.coupon), 6)
+
+
+class CouponShardTest(CoreTestCase):
+    def test_take_spreads_over_shards(self):
+        coupon = create_coupon(uses=10)
+        coupon.shard(4)
+        shard_uses = coupon.shards.values_list("uses", flat=True)
+        self.assertCountEqual(shard_uses, [3, 3, 2, 2])
+
+        self.assertIsNotNone(coupon.take_uses(4))
+        self.assertEqual(remaining_uses(coupon), 6)
+
+    def test_shortfall_takes_nothing(self):
+        coupon = create_coupon(uses=6)
+        coupon.shard(3)
+
+        with self.assertRaises(CouponExhausted):
+            coupon.take_uses(7)
+
+        self.assertCountEqual(coupon.shards.values_list("uses", flat=True), [2, 2, 2])
+        coupon.take_uses(6)
+        self.assertEqual(remaining_uses(coupon), 0)
+        self.assertFalse(Coupon.objects.get(pk=coupon.pk).is_valid)
+
+    def test_unsharded_take_does_not_look_for_shards(self):
+        coupon = create_coupon(uses=5)
+
+        # the conditional update and the used up check
+        with self.assertNumQueries(2):
+            coupon.take_uses(2)
+        self.assertEqual(remaining_uses(coupon), 3)
+
+    def test_at_least_one_shard(self):
+        coupon = create_coupon(uses=5)
+
+        with self.assertRaises(ValueError):
+            coupon.shard(0)
+        self.assertFalse(coupon.shards.exists())
+
+
+class CachedCouponTest(CoreTestCase):
+    def test_lookup_is_cached(self):
+        coupon = create_coupon()
+        Coupon.get_cached(coupon.code)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(Coupon.get_cached(coupon.code).id, coupon.id)
+
+    def test_renamed_coupon_is_not_served_under_its_old_code(self):
+        coupon = create_coupon(code="OLD")
+        Coupon.get_cached("OLD")
+
+        coupon.code = "NEW"
+        coupon.save()
+
+        self.assertIsNone(Coupon.get_cached("OLD"))
+        self.assertEqual(Coupon.get_cached("NEW").id, coupon.id)
+
+    def test_used_up_coupon_is_no_longer_served(self):
+        for shards in (0, 2):
+            with self.subTest(shards=shards):
+                coupon = create_coupon(uses=2)
+                if shards:
+                    coupon.shard(shards)
+                Coupon.get_cached(coupon.code)
+
+                coupon.take_uses(1)
+                self.assertIsNotNone(Coupon.get_cached(coupon.code))
+                coupon.take_uses(1)
+                self.assertIsNone(Coupon.get_cached(coupon.code))
+
+    def test_course_changes_are_picked_up(self):
+        coupon = create_coupon()
+        course = create_course()
+        self.assertEqual(Coupon.get_cached(coupon.code).course_ids, frozenset())
+
+        course.coupon_set.add(coupon)
+
+        self.assertEqual(
+            Coupon.get_cached(coupon.code).course_ids, frozenset([course.id])
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@skipUnlessDBFeature("has_select_for_update")
+class CouponConcurrencyTest(TransactionTestCase):
+    threads = 8
+    uses = 5
+
+    def redeem_concurrently(self, coupon: Coupon, uses: int = 1) -> tuple[int, list]:
+        barrier = threading.Barrier(self.threads)
+        taken = []
+        errors = []
+
+        def take():
+            try:
+                barrier.wait()
+                Coupon.objects.get(pk=coupon.pk).take_uses(uses)
+                taken.append(uses)
+            except CouponExhausted:
+                pass
+            except Exception as err:
+                errors.append(err)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        workers = [threading.Thread(target=take) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return sum(taken), errors
+
+    def test_coupon_is_never_oversold(self):
+        coupon = create_coupon(uses=self.uses)
+
+        taken, errors = self.redeem_concurrently(coupon)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(taken, self.uses)
+        self.assertEqual(remaining_uses(coupon), 0)
+
+    def test_sharded_coupon_is_never_oversold(self):
+        coupon = create_coupon(uses=self.uses)
+        coupon.shard(3)
+
+        taken, errors = self.redeem_concurrently(coupon)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(taken, self.uses)
+        self.assertEqual(remaining_uses(coupon), 0)
+
+    def test_takes_spread_over_shards_are_never_oversold(self):
+        # 3/3/2/2, most takes of 3 need two shards
+        coupon = create_coupon(uses=10)
+        coupon.shard(4)
+
+        taken, errors = self.redeem_concurrently(coupon, uses=3)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(taken, 9)
+        self.assertEqual(remaining_uses(coupon), 1)
@@ -0,0 +1,199 @@
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from eth_tester import EthereumTester, PyEVMBackend
+from eth_utils import keccak
+from web3 import EthereumTesterProvider, Web3
+
+from core.indexer import PaymentEventIndexer
+from core.models import course as course_models
+from core.models.blockchain import ChainCheckpoint
+from core.models.sales import Order, OrderItem, OrderStatus
+from core.models.user import (
+    InstructorWallet,
+    PaymentMethods,
+    Transaction,
+    TransactionReason,
+    TransactionStatus,
+    WalletTransaction,
+)
+
+from .utils import CoreTestCase, create_course, create_user
+
+PAYMENT = b"\x0a" * 20
+TOKEN = b"\x0b" * 20
+BALANCE = 10**21
+
+
+def mapping_slot(key: bytes, slot: int) -> int:
+    # storage slot of mapping[key] for a mapping declared at `slot`
+    return int.from_bytes(keccak(key.rjust(32, b"\0") + slot.to_bytes(32, "big")))
+
+
+def payment_chain(contracts: dict) -> tuple[Web3, str, str]:
+    """
+    A local chain with the Payment contract and its token already in the
+    genesis block. contracts/data.json only holds runtime bytecode, so the
+    storage their constructors would have written is set directly: the
+    ADMIN_ROLE of the first account (AccessControl._roles, slot 0) and the
+    token balance of the second (ERC20._balances, slot 0). Returns the
+    chain with the admin and payer addresses.
+    """
+    state = PyEVMBackend.generate_genesis_state(num_accounts=2)
+    admin, payer = state
+    admin_role = keccak(text="ADMIN_ROLE")
+    state[PAYMENT] = {
+        "balance": 0,
+        "nonce": 1,
+        "code": bytes.fromhex(contracts["payment"]["bytecode"]),
+        "storage": {mapping_slot(admin, mapping_slot(admin_role, 0)): 1},
+    }
+    state[TOKEN] = {
+        "balance": 0,
+        "nonce": 1,
+        "code": bytes.fromhex(contracts["learnbestia"]["bytecode"]),
+        "storage": {mapping_slot(payer, 0): BALANCE},
+    }
+    web3 = Web3(
+        EthereumTesterProvider(EthereumTester(PyEVMBackend(genesis_state=state)))
+    )
+    return web3, Web3.to_checksum_address(admin), Web3.to_checksum_address(payer)
+
+
+class PaymentEventIndexerTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        with open(settings.CONTRACT_DIR / "data.json") as file:
+            contracts = json.load(file)
+        self.web3, self.admin, self.payer = payment_chain(contracts)
+        self.payment = self.web3.eth.contract(
+            address=Web3.to_checksum_address(PAYMENT),
+            abi=contracts["payment"]["abi"],
+        )
+        self.token = self.web3.eth.contract(
+            address=Web3.to_checksum_address(TOKEN),
+            abi=contracts["learnbestia"]["abi"],
+        )
+        self.course = create_course()
+
+    def indexer(self, **kwargs) -> PaymentEventIndexer:
+        return PaymentEventIndexer(self.web3, self.payment, **kwargs)
+
+    def order_transaction(self) -> Transaction:
+        order = Order.objects.create(user=create_user())
+        OrderItem.objects.create(order=order, course=self.course, price=Decimal("10"))
+        return Transaction.objects.create(
+            item_ct=ContentType.objects.get_for_model(Order),
+            item_id=order.id,
+            amount=Decimal("10"),
+            payment_method=PaymentMethods.ERC_USDT,
+            reason=TransactionReason.ORDER_PAY,
+        )
+
+    def invoice(self, transaction: Transaction, amount: int = 10**19):
+        self.payment.functions.createInvoice(
+            transaction.ref, amount, self.token.address
+        ).transact({"from": self.admin})
+
+    def pay(self, transaction: Transaction, amount: int = 10**19):
+        self.token.functions.approve(self.payment.address, amount).transact(
+            {"from": self.payer}
+        )
+        self.payment.functions.payInvoice(transaction.ref).transact(
+            {"from": self.payer}
+        )
+
+    def assertVerified(self, transaction: Transaction, verified: bool = True):
+        transaction.refresh_from_db()
+        order = Order.objects.get(pk=transaction.item_id)
+        enrolled = course_models.CourseStudent.objects.filter(
+            user=order.user, course=self.course
+        ).exists()
+        if verified:
+            self.assertEqual(transaction.status, TransactionStatus.VERIFIED)
+            self.assertEqual(order.status, OrderStatus.PAID)
+            self.assertTrue(enrolled)
+        else:
+            self.assertNotEqual(transaction.status, TransactionStatus.VERIFIED)
+            self.assertEqual(order.status, OrderStatus.NEW)
+            self.assertFalse(enrolled)
+
+    def test_paid_invoice_verifies_its_order(self):
+        paid, unpaid = self.order_transaction(), self.order_transaction()
+        for transaction in (paid, unpaid):
+            self.invoice(transaction)
+        self.pay(paid)
+
+        self.assertEqual(self.indexer().run_once(), 1)
+
+        self.assertVerified(paid)
+        self.assertVerified(unpaid, verified=False)
+        checkpoint = ChainCheckpoint.objects.get(name=PaymentEventIndexer.CHECKPOINT)
+        self.assertEqual(checkpoint.block_number, self.web3.eth.block_number)
+
+    def test_events_are_read_in_block_ranges(self):
+        transactions = [self.order_transaction() for _ in range(3)]
+        for transaction in transactions:
+            self.invoice(transaction)
+            self.pay(transaction)
+
+        self.assertEqual(self.indexer(block_range=2).run_once(), 3)
+
+        for transaction in transactions:
+            self.assertVerified(transaction)
+
+    def test_replayed_blocks_change_nothing(self):
+        transaction = self.order_transaction()
+        self.invoice(transaction)
+        self.pay(transaction)
+        indexer = self.indexer()
+        indexer.run_once()
+
+        ChainCheckpoint.objects.update(block_number=0)
+        self.assertEqual(indexer.run_once(), 0)
+
+        self.assertVerified(transaction)
+        self.assertEqual(
+            course_models.CourseStudent.objects.filter(course=self.course).count(), 1
+        )
+        # the course owner is paid once
+        wallet = InstructorWallet.objects.get(instructor=self.course.owner)
+        self.assertEqual(wallet.amount, Decimal("10"))
+        self.assertEqual(WalletTransaction.objects.filter(wallet=wallet).count(), 1)
+
+    def test_payments_reorged_out_before_confirmation_are_never_verified(self):
+        transaction = self.order_transaction()
+        self.invoice(transaction)
+        tester = self.web3.provider.ethereum_tester
+        fork = tester.take_snapshot()
+        self.pay(transaction)
+        indexer = self.indexer(confirmations=3)
+
+        # still within the confirmation window
+        self.assertEqual(indexer.run_once(), 0)
+        # the blocks with the payment are dropped and replaced
+        tester.revert_to_snapshot(fork)
+        tester.mine_blocks(5)
+
+        self.assertEqual(indexer.run_once(), 0)
+        self.assertVerified(transaction, verified=False)
+
+        self.pay(transaction)
+        tester.mine_blocks(3)
+        self.assertEqual(indexer.run_once(), 1)
+        self.assertVerified(transaction)
+
+    def test_cancelled_invoice_fails_its_transaction(self):
+        transaction = self.order_transaction()
+        self.invoice(transaction)
+        self.payment.functions.cancelInvoice(transaction.ref).transact(
+            {"from": self.admin}
+        )
+
+        self.assertEqual(self.indexer().run_once(), 0)
+
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.status, TransactionStatus.FAILED)
+        self.assertVerified(transaction, verified=False)
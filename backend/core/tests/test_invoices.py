@@ -0,0 +1,212 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+
+from core.invoices import InvoiceSubmitter
+from core.models.blockchain import InvoiceStatus, PaymentInvoice
+from core.models.sales import Order
+from core.models.user import PaymentMethods, Transaction, TransactionReason
+
+from .utils import CoreTestCase, contract_abi, create_user
+
+TOKEN = "0x" + "11" * 20
+
+
+class InvoiceSubmitterTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contract = mock.MagicMock()
+        self.contract.abi = contract_abi(
+            "createInvoice", "createInvoices", "checkPaymentStatuses"
+        )
+        self.submitter = InvoiceSubmitter(
+            mock.MagicMock(), self.contract, "0x" + "22" * 20, "key", max_attempts=2
+        )
+        send = mock.patch.object(
+            self.submitter.sender, "send", return_value=(7, "0xabc")
+        )
+        self.send = send.start()
+        self.addCleanup(send.stop)
+
+    def queue(self, token: str = TOKEN, amount: int = 100) -> PaymentInvoice:
+        transaction = Transaction.objects.create(
+            item_ct=ContentType.objects.get_for_model(Order),
+            item_id=Order.objects.create(user=create_user()).id,
+            amount=Decimal("10"),
+            payment_method=PaymentMethods.ERC_USDT,
+            reason=TransactionReason.ORDER_PAY,
+        )
+        return PaymentInvoice.objects.create(
+            transaction=transaction, token=token, amount=amount
+        )
+
+    def test_queued_invoices_are_sent_in_one_transaction(self):
+        invoices = [self.queue() for _ in range(3)]
+
+        self.assertEqual(self.submitter.submit_batch(), 3)
+
+        self.send.assert_called_once()
+        refs, amounts, tokens = self.contract.functions.createInvoices.call_args.args
+        self.assertCountEqual(refs, [invoice.transaction.ref for invoice in invoices])
+        for invoice in invoices:
+            invoice.refresh_from_db()
+            self.assertEqual(invoice.status, InvoiceStatus.SUBMITTED)
+            self.assertEqual((invoice.nonce, invoice.tx_hash), (7, "0xabc"))
+
+    def test_amounts_keep_every_unit(self):
+        # 1234.567... tokens of 18 decimals
+        amount = 1234_567890123456789012
+        self.queue(amount=amount)
+
+        self.submitter.submit_batch()
+
+        _, amounts, _ = self.contract.functions.createInvoices.call_args.args
+        self.assertEqual(amounts, [amount])
+        self.assertEqual(PaymentInvoice.objects.get().amount, amount)
+
+    def test_contract_without_batches_gets_one_transaction_per_invoice(self):
+        self.contract.abi = contract_abi("createInvoice", "checkPaymentStatus")
+        invoices = [self.queue() for _ in range(2)]
+        self.send.side_effect = [(1, "0x1"), ValueError("nonce too low")]
+
+        self.assertEqual(self.submitter.submit_batch(), 1)
+
+        self.contract.functions.createInvoices.assert_not_called()
+        self.assertEqual(self.contract.functions.createInvoice.call_count, 2)
+        statuses = {
+            invoice.tx_hash: invoice.status
+            for invoice in PaymentInvoice.objects.filter(
+                pk__in=[invoice.pk for invoice in invoices]
+            )
+        }
+        self.assertEqual(
+            statuses, {"0x1": InvoiceStatus.SUBMITTED, "": InvoiceStatus.QUEUED}
+        )
+
+    def test_invalid_invoices_fail_on_their_own(self):
+        good = self.queue()
+        no_token = self.queue(token="")
+        no_amount = self.queue(amount=0)
+
+        self.assertEqual(self.submitter.submit_batch(), 1)
+
+        refs = self.contract.functions.createInvoices.call_args.args[0]
+        self.assertEqual(refs, [good.transaction.ref])
+        for invoice in (no_token, no_amount):
+            invoice.refresh_from_db()
+            self.assertEqual(invoice.status, InvoiceStatus.FAILED)
+            self.assertEqual(invoice.attempts, 1)
+            self.assertTrue(invoice.error)
+
+    def test_failed_send_counts_an_attempt(self):
+        invoice = self.queue()
+        self.contract.functions.createInvoices.side_effect = ValueError("bad call")
+
+        for status in (InvoiceStatus.QUEUED, InvoiceStatus.FAILED):
+            self.assertEqual(self.submitter.submit_batch(), 0)
+            invoice.refresh_from_db()
+            self.assertEqual(invoice.status, status)
+            self.assertEqual(invoice.error, "bad call")
+        self.assertEqual(invoice.attempts, 2)
+
+    def test_check_receipts(self):
+        confirmed, reverted, pending = [self.queue() for _ in range(3)]
+        PaymentInvoice.objects.update(status=InvoiceStatus.SUBMITTED)
+        hashes = {confirmed: "0x1", reverted: "0x2", pending: "0x3"}
+        for invoice, tx_hash in hashes.items():
+            PaymentInvoice.objects.filter(pk=invoice.pk).update(tx_hash=tx_hash)
+        receipts = {"0x1": {"status": 1}, "0x2": {"status": 0}}
+
+        with mock.patch.object(
+            self.submitter.sender, "receipts", return_value=receipts
+        ):
+            self.assertEqual(self.submitter.check_receipts(), 2)
+
+        for invoice, status in [
+            (confirmed, InvoiceStatus.CONFIRMED),
+            (reverted, InvoiceStatus.FAILED),
+            (pending, InvoiceStatus.SUBMITTED),
+        ]:
+            invoice.refresh_from_db()
+            self.assertEqual(invoice.status, status)
+
+    def test_invoices_not_mined_in_time_are_replaced(self):
+        self.contract.abi = contract_abi("createInvoice", "checkPaymentStatus")
+        created, stuck, exhausted = self.queue(), self.queue(), self.queue()
+        PaymentInvoice.objects.update(
+            status=InvoiceStatus.SUBMITTED,
+            nonce=4,
+            attempts=1,
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        for invoice, tx_hash in [(created, "0x1"), (stuck, "0x2"), (exhausted, "0x3")]:
+            PaymentInvoice.objects.filter(pk=invoice.pk).update(tx_hash=tx_hash)
+        PaymentInvoice.objects.filter(pk=exhausted.pk).update(attempts=2)
+        # only the first invoice made it onto the contract
+        def transactions(ref):
+            date_created = int(ref == created.transaction.ref)
+            return mock.Mock(
+                call=mock.Mock(return_value=(ref, 100, TOKEN, 0, date_created, 0))
+            )
+
+        self.contract.functions.transactions.side_effect = transactions
+
+        with (
+            mock.patch.object(self.submitter.sender, "receipts", return_value={}),
+            mock.patch.object(
+                self.submitter.sender, "replace", return_value=(4, "0x4")
+            ) as replace,
+        ):
+            self.assertEqual(self.submitter.check_receipts(), 1)
+
+        self.send.assert_not_called()
+        replace.assert_called_once_with(
+            self.contract.functions.createInvoice.return_value, 4, "0x2"
+        )
+        self.contract.functions.createInvoice.assert_called_once_with(
+            stuck.transaction.ref, 100, TOKEN
+        )
+        for invoice, status, tx_hash in [
+            (created, InvoiceStatus.CONFIRMED, "0x1"),
+            (stuck, InvoiceStatus.SUBMITTED, "0x4"),
+            (exhausted, InvoiceStatus.FAILED, "0x3"),
+        ]:
+            invoice.refresh_from_db()
+            self.assertEqual((invoice.status, invoice.tx_hash), (status, tx_hash))
+        self.assertEqual(stuck.attempts, 2)
+
+    def test_transaction_mined_before_its_replacement_is_kept(self):
+        invoice = self.queue()
+        PaymentInvoice.objects.update(
+            status=InvoiceStatus.SUBMITTED,
+            nonce=4,
+            tx_hash="0x1",
+            attempts=1,
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        self.contract.functions.transactions.return_value.call.return_value = (
+            "",
+            0,
+            "0x" + "00" * 20,
+            0,
+            0,
+            0,
+        )
+
+        with (
+            mock.patch.object(self.submitter.sender, "receipts", return_value={}),
+            mock.patch.object(
+                self.submitter.sender,
+                "replace",
+                side_effect=ValueError("nonce too low"),
+            ),
+        ):
+            self.assertEqual(self.submitter.check_receipts(), 0)
+
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.status, InvoiceStatus.SUBMITTED)
+        self.assertEqual(invoice.tx_hash, "0x1")
+        self.assertEqual(invoice.error, "nonce too low")
@@ -0,0 +1,38 @@
+import importlib
+from decimal import Decimal
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+
+from core.indexer import ref_hash
+from core.models.sales import Order
+from core.models.user import PaymentMethods, Transaction, TransactionReason
+
+from .utils import CoreTestCase, create_user
+
+backfill = importlib.import_module("core.migrations.0009_backfill_transaction_ref_hash")
+
+
+class BackfillRefHashTest(CoreTestCase):
+    def test_missing_hashes_are_filled(self):
+        order = Order.objects.create(user=create_user())
+        transactions = [
+            Transaction.objects.create(
+                item_ct=ContentType.objects.get_for_model(Order),
+                item_id=order.id,
+                amount=Decimal("10"),
+                payment_method=PaymentMethods.ERC_USDT,
+                reason=TransactionReason.ORDER_PAY,
+            )
+            for _ in range(3)
+        ]
+        # as saved before the pre_save signal filled it
+        Transaction.objects.update(ref_hash="")
+
+        with mock.patch.object(backfill, "BATCH_SIZE", 2):
+            backfill.backfill_ref_hash(apps, None)
+
+        for transaction in transactions:
+            transaction.refresh_from_db()
+            self.assertEqual(transaction.ref_hash, ref_hash(transaction.ref))
@@ -0,0 +1,25 @@
+from django.apps import apps
+from django.test import TestCase
+
+from core.management.commands.check_query_plans import Command, hot_queries
+from core.models.base import BaseModel
+from core.models.user import User
+
+
+class ModelMetaTest(TestCase):
+    def test_every_model_has_a_default_ordering(self):
+        # a Meta that does not inherit BaseModel.Meta drops its ordering,
+        # User keeps the unordered Meta of AbstractUser
+        for model in apps.get_app_config("core").get_models():
+            if issubclass(model, BaseModel) and model is not User:
+                with self.subTest(model=model.__name__):
+                    self.assertTrue(model._meta.ordering)
+
+
+class QueryPlanTest(TestCase):
+    def test_hot_queries_use_an_index(self):
+        command = Command()
+        for name, queryset in hot_queries().items():
+            with self.subTest(query=name):
+                plan = command.explain(queryset)
+                self.assertFalse(command.is_full_scan(plan), plan)
@@ -0,0 +1,146 @@
+import threading
+from unittest import mock
+
+from django.db import IntegrityError, close_old_connections, connection
+from django.test import (
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+
+from core.models import course as course_models
+from core.models.base import OrderField
+
+from .utils import LOCMEM_CACHES, CoreTestCase, create_course
+
+
+class OrderFieldTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = create_course()
+
+    def add_module(self, course=None, **kwargs) -> course_models.Module:
+        return course_models.Module.objects.create(
+            course=course or self.course, title="Module", **kwargs
+        )
+
+    def test_orders_are_allocated_per_parent(self):
+        other = create_course(owner=self.course.owner)
+        orders = [self.add_module().order for _ in range(3)]
+        self.assertEqual(orders, [0, 1, 2])
+        self.assertEqual(self.add_module(other).order, 0)
+
+    def test_duplicate_orders_are_rejected(self):
+        self.add_module(order=0)
+        with self.assertRaises(IntegrityError):
+            self.add_module(order=0)
+
+    def test_clash_is_retried_with_a_new_value(self):
+        self.add_module()
+        # an allocation that raced with the insert above
+        with mock.patch.object(
+            OrderField, "next_value", autospec=True, side_effect=[0, 1]
+        ) as next_value:
+            module = self.add_module()
+        self.assertEqual(module.order, 1)
+        self.assertEqual(next_value.call_count, 2)
+
+    def module_ids(self, course=None) -> list:
+        return list(
+            course_models.Module.objects.filter(
+                course=course or self.course
+            ).values_list("id", flat=True)
+        )
+
+    def test_renumber(self):
+        modules = [self.add_module() for _ in range(3)]
+        ids = [modules[2].id, modules[0].id, modules[1].id]
+
+        count = course_models.Module.objects.filter(course=self.course).renumber(
+            [str(pk) for pk in ids]
+        )
+
+        self.assertEqual(count, 3)
+        self.assertEqual(self.module_ids(), ids)
+
+    def test_renumbered_rows_go_before_their_siblings(self):
+        modules = [self.add_module() for _ in range(4)]
+
+        course_models.Module.objects.filter(course=self.course).renumber(
+            [modules[3].id, modules[1].id]
+        )
+
+        self.assertEqual(
+            self.module_ids(),
+            [modules[3].id, modules[1].id, modules[0].id, modules[2].id],
+        )
+        self.assertEqual(
+            list(
+                course_models.Module.objects.filter(course=self.course).values_list(
+                    "order", flat=True
+                )
+            ),
+            [0, 1, 2, 3],
+        )
+
+    def test_renumber_locks_the_parent(self):
+        modules = [self.add_module() for _ in range(2)]
+
+        with mock.patch.object(OrderField, "lock_parents", autospec=True) as lock:
+            course_models.Module.objects.all().renumber([modules[1].id])
+
+        lock.assert_called_once_with(mock.ANY, {"course_id": self.course.id})
+        self.assertEqual(self.module_ids(), [modules[1].id, modules[0].id])
+
+    def test_renumber_leaves_other_parents_alone(self):
+        other = create_course(owner=self.course.owner)
+        mine = [self.add_module() for _ in range(2)]
+        theirs = [self.add_module(other) for _ in range(2)]
+
+        with self.assertRaises(ValueError):
+            course_models.Module.objects.renumber([mine[1].id, theirs[1].id])
+        # ids of another parent are not renumbered
+        course_models.Module.objects.filter(course=self.course).renumber(
+            [mine[1].id, theirs[1].id]
+        )
+
+        self.assertEqual(self.module_ids(), [mine[1].id, mine[0].id])
+        self.assertEqual(self.module_ids(other), [theirs[0].id, theirs[1].id])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@skipUnlessDBFeature("has_select_for_update")
+class OrderFieldConcurrencyTest(TransactionTestCase):
+    threads = 8
+
+    def test_concurrent_inserts_get_distinct_orders(self):
+        course = create_course()
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def add_module():
+            try:
+                barrier.wait()
+                # plain save(), outside any transaction
+                course_models.Module.objects.create(course=course, title="Module")
+            except Exception as err:
+                errors.append(err)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        workers = [threading.Thread(target=add_module) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            sorted(
+                course_models.Module.objects.filter(course=course).values_list(
+                    "order", flat=True
+                )
+            ),
+            list(range(self.threads)),
+        )
@@ -0,0 +1,173 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import course as course_models
+from core.models.sales import Cart, CartItem, Order, OrderItem, OrderStatus
+from core.models.user import (
+    InstructorWallet,
+    PaymentMethods,
+    WalletTransaction,
+    WalletTransactionStatus,
+    WalletTransactionType,
+)
+from core.serializers.sales import AddToCartSerializer, CreateOrderSerializer
+
+from .utils import CoreTestCase, create_course, create_instructor, create_user
+
+
+class VerifyPaidTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice, self.bob = create_instructor(), create_instructor()
+        self.alice_courses = [create_course(owner=self.alice) for _ in range(2)]
+        self.bob_course = create_course(owner=self.bob)
+
+    def order(self, *courses, user=None) -> Order:
+        order = Order.objects.create(user=user or create_user())
+        for course in courses:
+            OrderItem.objects.create(order=order, course=course, price=course.price)
+        return order
+
+    def balance(self, instructor) -> Decimal:
+        return InstructorWallet.objects.get(instructor=instructor).amount
+
+    def test_orders_enroll_their_users(self):
+        first = self.order(self.alice_courses[0], self.bob_course)
+        second = self.order(self.alice_courses[1])
+
+        self.assertEqual(Order.objects.verify_paid(), 2)
+
+        for order in (first, second):
+            order.refresh_from_db()
+            self.assertEqual(order.status, OrderStatus.PAID)
+        enrollments = course_models.CourseStudent.objects.values_list(
+            "user_id", "course_id"
+        )
+        self.assertCountEqual(
+            enrollments,
+            [
+                (first.user_id, self.alice_courses[0].id),
+                (first.user_id, self.bob_course.id),
+                (second.user_id, self.alice_courses[1].id),
+            ],
+        )
+
+    def test_enrolled_users_are_not_enrolled_twice(self):
+        user = create_user()
+        course_models.CourseStudent.objects.create(
+            user=user, course=self.bob_course
+        )
+
+        Order.objects.filter(pk=self.order(self.bob_course, user=user).pk).verify_paid()
+
+        self.assertEqual(
+            course_models.CourseStudent.objects.filter(user=user).count(), 1
+        )
+
+    def test_owners_are_credited_once_per_call(self):
+        existing = InstructorWallet.objects.create(
+            instructor=self.bob, amount=Decimal("1.50")
+        )
+        self.order(*self.alice_courses)
+        self.order(self.alice_courses[0], self.bob_course)
+
+        Order.objects.verify_paid()
+
+        self.assertEqual(self.balance(self.alice), Decimal("30.00"))
+        self.assertEqual(self.balance(self.bob), Decimal("11.50"))
+        self.assertEqual(InstructorWallet.objects.count(), 2)
+        credits = WalletTransaction.objects.values_list(
+            "wallet__instructor_id", "amount", "type", "status"
+        )
+        self.assertCountEqual(
+            credits,
+            [
+                (
+                    self.alice.id,
+                    Decimal("30.00"),
+                    WalletTransactionType.CREDIT,
+                    WalletTransactionStatus.SUCCESS,
+                ),
+                (
+                    self.bob.id,
+                    Decimal("10.00"),
+                    WalletTransactionType.CREDIT,
+                    WalletTransactionStatus.SUCCESS,
+                ),
+            ],
+        )
+        existing.refresh_from_db()
+        self.assertEqual(existing.amount, Decimal("11.50"))
+
+    def test_replayed_payments_change_nothing(self):
+        order = self.order(self.alice_courses[0])
+        Order.objects.filter(pk=order.pk).verify_paid()
+
+        self.assertEqual(Order.objects.filter(pk=order.pk).verify_paid(), 0)
+        order.tx_verify()
+
+        self.assertEqual(self.balance(self.alice), Decimal("10.00"))
+        self.assertEqual(WalletTransaction.objects.count(), 1)
+        self.assertEqual(course_models.CourseStudent.objects.count(), 1)
+
+    def test_query_count_does_not_grow_with_orders(self):
+        # wallets are created by the first credit otherwise
+        for instructor in (self.alice, self.bob):
+            InstructorWallet.objects.create(instructor=instructor)
+        counts = []
+        for size in (1, 5):
+            for _ in range(size):
+                self.order(*self.alice_courses, self.bob_course)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(Order.objects.verify_paid(), size)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+class AlreadyOwnedTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.owned, self.new = create_course(), create_course()
+        course_models.CourseStudent.objects.create(user=self.user, course=self.owned)
+
+    def test_owned_course_cannot_be_added_to_the_cart(self):
+        for course, valid in [(self.owned, False), (self.new, True)]:
+            with self.subTest(valid=valid):
+                serializer = AddToCartSerializer(
+                    data={"course": course.id}, context={"user": self.user}
+                )
+                self.assertEqual(serializer.is_valid(), valid)
+
+    def test_cart_with_an_owned_course_cannot_be_ordered(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, course=self.new)
+        data = {"payment_method": PaymentMethods.ERC_USDT}
+        context = {"user": self.user, "cart": cart}
+
+        serializer = CreateOrderSerializer(data=data, context=context)
+        # the cart with its courses, then the enrollments
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+
+        CartItem.objects.create(cart=cart, course=self.owned)
+        serializer = CreateOrderSerializer(data=data, context=context)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("already Purchased", str(serializer.errors["detail"]))
+
+    def test_other_users_courses_do_not_count(self):
+        self.assertEqual(
+            course_models.CourseStudent.objects.owned_course_ids(
+                create_user(), [self.owned.id, self.new.id]
+            ),
+            set(),
+        )
+        self.assertEqual(
+            course_models.CourseStudent.objects.owned_course_ids(
+                self.user, [self.owned.id, self.new.id]
+            ),
+            {self.owned.id},
+        )
@@ -0,0 +1,160 @@
+import json
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
+
+import requests
+from django.core.cache import cache
+
+from core import exceptions
+from core.models.sales import Cart, CartItem, Order
+from core.models.user import PaymentMethods
+from core.prices import (
+    CoinGeckoPriceSource,
+    FixturePriceSource,
+    PriceOracle,
+    PriceSource,
+    PriceUnavailable,
+)
+from core.serializers.sales import CreateOrderSerializer
+
+from .utils import CoreTestCase, create_course, create_user
+
+TOKEN = "0x" + "66" * 20
+
+
+class StubPriceSource(PriceSource):
+    def __init__(self, price: str = "2"):
+        self.price = Decimal(price)
+        self.error = None
+        self.fetched = 0
+
+    def fetch(self, token: str) -> Decimal:
+        self.fetched += 1
+        if self.error:
+            raise self.error
+        return self.price
+
+
+class InlineThread:
+    # runs background refreshes before start() returns
+    def __init__(self, target, daemon=None):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+class PriceOracleTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = StubPriceSource()
+        self.oracle = PriceOracle(self.source, ttl=60, stale_ttl=600)
+        thread = mock.patch("core.prices.threading.Thread", InlineThread)
+        thread.start()
+        self.addCleanup(thread.stop)
+
+    def cache_price(self, price: str, age: float):
+        cache.set(
+            self.oracle.price_key(TOKEN), (Decimal(price), time.time() - age), 600
+        )
+
+    def test_fresh_price_comes_from_the_cache(self):
+        self.cache_price("3", age=10)
+
+        self.assertEqual(self.oracle.get_price(TOKEN), Decimal("3"))
+        self.assertEqual(self.source.fetched, 0)
+
+    def test_stale_price_is_served_while_it_is_refreshed(self):
+        self.cache_price("3", age=120)
+
+        self.assertEqual(self.oracle.get_price(TOKEN), Decimal("3"))
+
+        self.assertEqual(self.source.fetched, 1)
+        self.assertEqual(self.oracle.get_price(TOKEN), Decimal("2"))
+
+    def test_stale_price_outlives_a_failing_feed(self):
+        self.cache_price("3", age=120)
+        self.source.error = PriceUnavailable("feed is down")
+
+        for _ in range(2):
+            self.assertEqual(self.oracle.get_price(TOKEN), Decimal("3"))
+        self.assertEqual(self.source.fetched, 2)
+
+    def test_missing_price_does_not_wait_on_the_feed(self):
+        with mock.patch("core.prices.threading.Thread") as thread:
+            with self.assertRaises(PriceUnavailable):
+                self.oracle.get_price(TOKEN)
+
+        # fetched by the background thread, not by the caller
+        thread.return_value.start.assert_called_once()
+        self.assertEqual(self.source.fetched, 0)
+
+    def test_missing_price_is_there_once_refreshed(self):
+        with self.assertRaises(PriceUnavailable):
+            self.oracle.get_price(TOKEN)
+
+        self.assertEqual(self.oracle.get_price(TOKEN), Decimal("2"))
+
+    def test_local_sources_are_read_inline(self):
+        oracle = PriceOracle(FixturePriceSource({TOKEN: "4.5"}))
+
+        self.assertEqual(oracle.get_price(TOKEN), Decimal("4.5"))
+
+
+class PriceSourceTest(CoreTestCase):
+    def test_fixture_prices(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            json.dump({TOKEN: 0.1}, file)
+            file.flush()
+            source = FixturePriceSource(file.name)
+
+        self.assertEqual(source.fetch(TOKEN), Decimal("0.1"))
+        # unlisted tokens are stablecoins
+        self.assertEqual(source.fetch("0x" + "77" * 20), Decimal(1))
+
+    def coingecko(self, **response) -> CoinGeckoPriceSource:
+        source = CoinGeckoPriceSource(ids={TOKEN: "polkadot"})
+        get = mock.patch.object(source.session, "get", **response)
+        get.start()
+        self.addCleanup(get.stop)
+        return source
+
+    def test_coingecko_price(self):
+        response = mock.Mock()
+        response.json.side_effect = lambda parse_float: json.loads(
+            '{"polkadot": {"usd": 4.127}}', parse_float=parse_float
+        )
+        source = self.coingecko(return_value=response)
+
+        self.assertEqual(source.fetch(TOKEN), Decimal("4.127"))
+        self.assertEqual(source.fetch("0x" + "77" * 20), Decimal(1))
+
+    def test_coingecko_failure_is_unavailable(self):
+        source = self.coingecko(side_effect=requests.ConnectionError("down"))
+
+        with self.assertRaises(PriceUnavailable):
+            source.fetch(TOKEN)
+
+
+class CheckoutWithoutPriceTest(CoreTestCase):
+    def test_order_is_refused_with_a_503(self):
+        user = create_user()
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, course=create_course())
+        serializer = CreateOrderSerializer(
+            data={"payment_method": PaymentMethods.ERC_USDT},
+            context={"user": user, "cart": cart},
+        )
+        serializer.is_valid(raise_exception=True)
+
+        with mock.patch(
+            "core.payment.get_usd_to_token_equivalent",
+            side_effect=PriceUnavailable("no price"),
+        ):
+            with self.assertRaises(exceptions.PriceIsUnavailable) as raised:
+                serializer.save()
+
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertFalse(Order.objects.exists())
@@ -0,0 +1,107 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from core.models.sales import Cart, CartItem, Coupon
+from core.pricing import CartPricing, apply_discount
+
+from .test_coupons import create_coupon
+from .utils import CoreTestCase, create_course, create_user
+
+
+class ApplyDiscountTest(CoreTestCase):
+    def test_rounds_half_up_to_the_cent(self):
+        for price, discount, expected in [
+            ("10.05", 50, "5.03"),
+            ("9.99", 15, "8.49"),
+            ("0.01", 50, "0.01"),
+            ("19.99", 100, "0.00"),
+            ("19.99", 0, "19.99"),
+        ]:
+            with self.subTest(price=price, discount=discount):
+                self.assertEqual(
+                    apply_discount(Decimal(price), discount), Decimal(expected)
+                )
+
+
+class CartPricingTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cart = Cart.objects.create(user=create_user())
+
+    def add(self, price: str):
+        course = create_course(price=Decimal(price))
+        CartItem.objects.create(cart=self.cart, course=course)
+        return course
+
+    def price(self):
+        cart = Cart.objects.select_related("coupon").get(pk=self.cart.pk)
+        return CartPricing(cart).price()
+
+    def use_coupon(self, **kwargs):
+        self.cart.coupon = create_coupon(**kwargs)
+        self.cart.save()
+        return self.cart.coupon
+
+    def test_lines_are_rounded_before_they_are_added_up(self):
+        for _ in range(3):
+            self.add("0.05")
+        self.use_coupon(uses=None)
+
+        priced = self.price()
+
+        self.assertEqual(
+            [line.discounted_price for line in priced.lines], [Decimal("0.03")] * 3
+        )
+        self.assertEqual(priced.subtotal, Decimal("0.15"))
+        self.assertEqual(priced.total, Decimal("0.09"))
+        self.assertEqual(priced.discount, Decimal("0.06"))
+        self.assertEqual(priced.redemptions, 3)
+
+    def test_coupon_only_discounts_its_courses(self):
+        included = self.add("10.00")
+        self.add("20.00")
+        self.use_coupon().courses.add(included)
+
+        priced = self.price()
+
+        self.assertEqual(
+            [line.discounted_price for line in priced.lines],
+            [Decimal("5.00"), Decimal("20.00")],
+        )
+        self.assertEqual(priced.total, Decimal("25.00"))
+        self.assertEqual(priced.redemptions, 1)
+
+    def test_coupon_discounts_no_more_lines_than_it_has_uses(self):
+        for _ in range(3):
+            self.add("10.00")
+        self.use_coupon(uses=2)
+
+        priced = self.price()
+
+        self.assertEqual(priced.total, Decimal("20.00"))
+        self.assertEqual(priced.redemptions, 2)
+
+    def test_expired_coupon_is_ignored(self):
+        self.add("10.00")
+        coupon = self.use_coupon()
+        Coupon.objects.filter(pk=coupon.pk).update(
+            valid_to=timezone.now() - timedelta(minutes=1)
+        )
+
+        priced = self.price()
+
+        self.assertEqual(priced.total, Decimal("10.00"))
+        self.assertEqual(priced.redemptions, 0)
+
+    def test_cart_is_priced_in_one_query(self):
+        for _ in range(3):
+            self.add("10.00")
+        self.use_coupon()
+        cart = Cart.objects.select_related("coupon").get(pk=self.cart.pk)
+        CartPricing(cart).price()
+
+        # the items with their courses, the coupon is cached
+        with self.assertNumQueries(1):
+            self.assertEqual(CartPricing(cart).price().total, Decimal("15.00"))
@@ -0,0 +1,110 @@
+import threading
+from unittest import mock
+
+from django.db import IntegrityError, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import refs
+from core.models.sales import Order
+
+from .utils import CoreTestCase, create_user
+
+
+class RefGeneratorTest(CoreTestCase):
+    def frozen_clock(self, ms: int):
+        clock = mock.patch("core.refs.time.time_ns", return_value=ms * 1_000_000)
+        self.addCleanup(clock.stop)
+        return clock.start()
+
+    def test_refs_sort_in_creation_order(self):
+        generate = refs.RefGenerator(node_id=1)
+
+        generated = [generate() for _ in range(5_000)]
+
+        self.assertEqual(generated, sorted(generated))
+        self.assertEqual(len(set(generated)), len(generated))
+        for ref in generated[:10]:
+            self.assertEqual(len(ref), refs.REF_LENGTH)
+            self.assertTrue(set(ref) <= set(refs.ALPHABET))
+
+    def test_refs_within_a_millisecond_count_up(self):
+        self.frozen_clock(1_700_000_000_000)
+        generate = refs.RefGenerator(node_id=1)
+
+        first, second = generate(), generate()
+
+        self.assertEqual(first[:12], second[:12])
+        self.assertLess(first, second)
+
+    def test_exhausted_sequence_borrows_the_next_millisecond(self):
+        self.frozen_clock(1_700_000_000_000)
+        generate = refs.RefGenerator(node_id=1)
+        first = generate()
+        generate._sequence = refs.SEQUENCE_MAX
+
+        second = generate()
+
+        self.assertEqual(second[:10], refs.encode(1_700_000_000_001, 10))
+        self.assertLess(first, second)
+
+    def test_clock_going_back_keeps_refs_increasing(self):
+        clock = self.frozen_clock(1_700_000_000_000)
+        generate = refs.RefGenerator(node_id=1)
+        first = generate()
+
+        clock.return_value -= 5 * 1_000_000
+
+        self.assertLess(first, generate())
+
+    @override_settings(REF_NODE_ID=1029)
+    def test_node_id_comes_from_settings(self):
+        ref = refs.RefGenerator()()
+
+        # 1029 wraps around the 10 node bits to 5
+        self.assertEqual(ref[10:12], refs.encode(5, 2))
+
+    def test_refs_are_unique_across_threads(self):
+        generate = refs.RefGenerator(node_id=1)
+        generated = []
+
+        def work():
+            generated.extend(generate() for _ in range(1_000))
+
+        workers = [threading.Thread(target=work) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(len(set(generated)), 4_000)
+
+
+class UniqueRefTest(CoreTestCase):
+    def test_clashing_ref_is_retried(self):
+        taken = Order.objects.create(user=create_user()).ref
+
+        with mock.patch(
+            "core.models.base.generate_ref", side_effect=[taken, "0" * 20]
+        ):
+            order = Order.objects.create(user=create_user())
+
+        self.assertEqual(order.ref, "0" * 20)
+
+    def test_insert_does_not_look_for_the_ref_first(self):
+        user = create_user()
+
+        with CaptureQueriesContext(connection) as queries:
+            Order.objects.create(user=user)
+
+        statements = [
+            query["sql"].split()[0] for query in queries if "core_order" in query["sql"]
+        ]
+        self.assertEqual(statements, ["INSERT"])
+
+    def test_gives_up_after_the_retries(self):
+        taken = Order.objects.create(user=create_user()).ref
+
+        with mock.patch("core.models.base.generate_ref", return_value=taken):
+            with self.assertRaises(IntegrityError):
+                Order.objects.create(user=create_user())
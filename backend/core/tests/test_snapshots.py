@@ -0,0 +1,120 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.cache import get_course_version
+from core.models import course as course_models
+
+from .utils import CoreTestCase, create_course
+
+
+class ItemSnapshotTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = create_course()
+        self.module = course_models.Module.objects.create(
+            course=self.course, title="Module"
+        )
+
+    def add_content(self, item) -> course_models.Content:
+        return course_models.Content.objects.create(module=self.module, item=item)
+
+    def video(self, title: str = "Video", minutes: int = 5) -> course_models.Video:
+        return course_models.Video.objects.create(
+            title=title, file="intro.mp4", duration=timedelta(minutes=minutes)
+        )
+
+    def test_new_content_copies_its_item(self):
+        content = self.add_content(self.video())
+
+        content.refresh_from_db()
+        self.assertEqual(content.title, "Video")
+        self.assertEqual(content.type, course_models.ContentTypeChoice.VIDEO)
+        self.assertEqual(content.duration, timedelta(minutes=5))
+
+    def test_item_changes_are_copied(self):
+        video = self.video()
+        content = self.add_content(video)
+        version = get_course_version(self.course.id)
+
+        video.title = "Renamed"
+        video.duration = timedelta(minutes=7)
+        video.save()
+
+        content.refresh_from_db()
+        self.assertEqual(content.title, "Renamed")
+        self.assertEqual(content.duration, timedelta(minutes=7))
+        self.assertGreater(get_course_version(self.course.id), version)
+
+    def test_content_pointed_at_another_item_copies_it(self):
+        content = self.add_content(self.video())
+        text = course_models.Text.objects.create(title="Text", text="...")
+
+        # as loaded by an edit form, without the snapshot
+        content = course_models.Content.objects.only("item_ct", "item_id").get()
+        content.item = text
+        content.save(update_fields=["item_ct", "item_id"])
+
+        content.refresh_from_db()
+        self.assertEqual(content.title, "Text")
+        self.assertEqual(content.type, course_models.ContentTypeChoice.TEXT)
+        self.assertIsNone(content.duration)
+
+    def test_saving_the_same_item_does_not_read_it(self):
+        self.add_content(self.video())
+        content = course_models.Content.objects.get()
+
+        content.title = "Custom"
+        with CaptureQueriesContext(connection) as queries:
+            content.save()
+
+        self.assertFalse(
+            [query for query in queries if "core_video" in query["sql"]]
+        )
+
+        content.refresh_from_db()
+        self.assertEqual(content.title, "Custom")
+
+    def test_link_changes_are_copied_to_resources(self):
+        content = self.add_content(self.video())
+        link = course_models.Link.objects.create(
+            title="Link", url="https://example.com"
+        )
+        resource = course_models.Resource.objects.create(
+            content=content, type=course_models.ResourceType.LINK, item=link
+        )
+        self.assertEqual(resource.title, "Link")
+
+        link.title = "Renamed"
+        link.save()
+
+        resource.refresh_from_db()
+        self.assertEqual(resource.title, "Renamed")
+
+    def test_backfill(self):
+        video = self.video()
+        content = self.add_content(video)
+        link = course_models.Link.objects.create(
+            title="Link", url="https://example.com"
+        )
+        resource = course_models.Resource.objects.create(
+            content=content, type=course_models.ResourceType.LINK, item=link
+        )
+        # as left by the migration that added the snapshot columns
+        course_models.Content.objects.update(title="", duration=None)
+        course_models.Resource.objects.update(title="")
+        out = StringIO()
+
+        call_command("backfill_content_snapshots", batch_size=1, stdout=out)
+
+        content.refresh_from_db()
+        resource.refresh_from_db()
+        self.assertEqual(
+            (content.title, content.duration), ("Video", timedelta(minutes=5))
+        )
+        self.assertEqual(resource.title, "Link")
+        self.assertIn("1 contents updated", out.getvalue())
+        self.assertIn("1 resources updated", out.getvalue())
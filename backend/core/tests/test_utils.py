@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import course as course_models
+from core.utils import KeysetPagination
+
+from .utils import CoreTestCase, create_course, create_instructor
+
+
+class SmallPages(KeysetPagination):
+    page_size = 2
+    max_count = 3
+
+
+class KeysetPaginationTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_instructor()
+
+    def add_courses(self, count: int, created_at=None) -> list:
+        courses = [create_course(owner=self.owner) for _ in range(count)]
+        if created_at:
+            course_models.Course.objects.filter(
+                pk__in=[course.pk for course in courses]
+            ).update(created_at=created_at)
+        return courses
+
+    def page(self, cursor: str | None = None, **params) -> tuple[list, str | None]:
+        if cursor:
+            params["cursor"] = cursor
+        request = Request(APIRequestFactory().get("/", params))
+        paginator = SmallPages()
+        page = paginator.paginate_queryset(
+            course_models.Course.objects.all(), request
+        )
+        self.paginator = paginator
+        return [course.id for course in page], paginator.next_cursor
+
+    def walk(self) -> list:
+        ids, cursor = self.page()
+        while cursor:
+            more, cursor = self.page(cursor)
+            ids += more
+        return ids
+
+    def test_rows_sharing_a_timestamp_are_each_served_once(self):
+        now = timezone.now()
+        self.add_courses(5, created_at=now)
+        self.add_courses(2, created_at=now - timedelta(minutes=1))
+
+        ids = self.walk()
+
+        self.assertEqual(len(set(ids)), 7)
+        expected = course_models.Course.objects.order_by(
+            "-created_at", "-id"
+        ).values_list("id", flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_inserts_do_not_shift_the_next_page(self):
+        self.add_courses(4, created_at=timezone.now() - timedelta(minutes=1))
+        first, cursor = self.page()
+
+        # newer rows land before the cursor, not on the next page
+        self.add_courses(3)
+        second, cursor = self.page(cursor)
+
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+        self.assertIsNone(cursor)
+
+    def test_count_is_bounded(self):
+        self.add_courses(5)
+
+        self.page(count="1")
+        response = self.paginator.get_paginated_response([])
+
+        self.assertEqual(response.data["count"], 3)
+        self.assertFalse(response.data["count_is_exact"])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(NotFound):
+            self.page("not-a-cursor")
@@ -0,0 +1,201 @@
+import uuid
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import search
+from core.cache import bump_search_version
+from core.models import course as course_models
+
+from .utils import CoreTestCase, create_course, create_user
+
+
+class CourseCategoryListViewTest(CoreTestCase):
+    url = reverse("categories")
+
+    def test_categories_count_available_courses(self):
+        python = course_models.CourseCategory.objects.create(name="Python")
+        course_models.CourseCategory.objects.create(name="Art")
+        create_course().category.add(python)
+        create_course().category.add(python)
+        create_course(is_available=False).category.add(python)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            [
+                {"name": "Art", "slug": "art", "course_number": 0},
+                {"name": "Python", "slug": "python", "course_number": 2},
+            ],
+        )
+
+    def test_cached_categories_are_invalidated(self):
+        python = course_models.CourseCategory.objects.create(name="Python")
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        create_course().category.add(python)
+        self.assertEqual(self.client.get(self.url).json()[0]["course_number"], 1)
+
+
+class CourseSearchViewTest(CoreTestCase):
+    url = reverse("course_search")
+
+    def search(self, query: str, **params) -> dict:
+        response = self.client.get(self.url, {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def titles(self, data: dict) -> list[str]:
+        return [course["title"] for course in data["results"]]
+
+    def test_anonymous_user_can_search(self):
+        create_course(title="Django for beginners")
+        create_course(title="Cooking", description="learn django cooking")
+        create_course(title="Django internals", is_available=False)
+
+        data = self.search("django")
+
+        self.assertEqual(data["count"], 2)
+        # title matches rank first
+        self.assertEqual(self.titles(data), ["Django for beginners", "Cooking"])
+        self.assertEqual(data["facets"]["price_bands"]["under_20"], 2)
+
+    def test_every_term_must_match_even_common_ones(self):
+        for title in ["Python data", "Python web", "Python cooking", "Cooking"]:
+            create_course(title=title)
+
+        data = self.search("python cooking")
+
+        self.assertEqual(self.titles(data), ["Python cooking"])
+
+
+class InMemoryCourseSearchTest(CourseSearchViewTest):
+    def setUp(self):
+        super().setUp()
+        # the backend used on SQLite, whatever the test database is
+        patcher = mock.patch.object(
+            search, "_backend", search.InMemoryCourseSearch()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_local_writes_update_the_index(self):
+        self.search("django")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            course = create_course(title="Django")
+        # only the courses are read, the index is not rebuilt
+        with self.assertNumQueries(1):
+            self.assertEqual(self.titles(self.search("django")), ["Django"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            course.is_available = False
+            course.save()
+        self.assertEqual(self.search("django")["count"], 0)
+
+    def test_writes_from_other_processes_rebuild_the_index(self):
+        self.search("django")
+
+        # no signal runs here, as for a course saved by another worker,
+        # which only bumps the shared version
+        course_models.Course.objects.bulk_create(
+            [
+                course_models.Course(
+                    owner=create_course().owner,
+                    title="Django",
+                    description="",
+                    price=0,
+                    is_available=True,
+                )
+            ]
+        )
+        self.assertEqual(self.search("django")["count"], 0)
+
+        bump_search_version()
+        self.assertEqual(self.titles(self.search("django")), ["Django"])
+
+
+class CourseSyllabusViewTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = create_course()
+        self.url = reverse("course_syllabus", kwargs={"id": self.course.id})
+
+    def add_module(self, title: str) -> course_models.Module:
+        module = course_models.Module.objects.create(course=self.course, title=title)
+        text = course_models.Text.objects.create(title=f"{title} text", text="")
+        content = course_models.Content.objects.create(module=module, item=text)
+        link = course_models.Link.objects.create(
+            title=f"{title} link", url="https://example.com"
+        )
+        course_models.Resource.objects.create(
+            content=content, type=course_models.ResourceType.LINK, item=link
+        )
+        return module
+
+    def test_anonymous_user_gets_the_syllabus(self):
+        self.add_module("Intro")
+        self.add_module("Basics")
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([module["title"] for module in data], ["Intro", "Basics"])
+        (content,) = data[0]["contents"]
+        self.assertEqual(content["title"], "Intro text")
+        self.assertEqual(content["type"], "text")
+        self.assertEqual(content["resources"][0]["title"], "Intro link")
+
+    def test_syllabus_is_cached_until_the_course_changes(self):
+        self.add_module("Intro")
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.add_module("Basics")
+        self.assertEqual(len(self.client.get(self.url).json()), 2)
+
+    def test_unknown_course(self):
+        response = self.client.get(
+            reverse("course_syllabus", kwargs={"id": uuid.uuid4()})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class CourseStudentAccessTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = create_course()
+        self.url = f"/account/courses/{self.course.id}/modules/"
+        self.client = APIClient()
+
+    def test_enrolled_user_gets_in(self):
+        student = create_user()
+        course_models.CourseStudent.objects.create(user=student, course=self.course)
+        self.client.force_authenticate(student)
+
+        # the course, the enrollment off the (user, course) index, then
+        # the modules
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_other_users_are_turned_away(self):
+        other = create_course()
+        student = create_user()
+        # enrolled in another course only
+        course_models.CourseStudent.objects.create(user=student, course=other)
+        self.client.force_authenticate(student)
+
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_anonymous_users_are_turned_away(self):
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
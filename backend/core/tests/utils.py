@@ -0,0 +1,72 @@
+import secrets
+from decimal import Decimal
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.models import course as course_models
+from core.models.user import Instructor, User
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+IN_MEMORY_CHANNEL_LAYERS = {
+    "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+}
+
+REDIS_CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {"hosts": [settings.CHANNEL_LAYER_LOCATION], "prefix": "test"},
+    }
+}
+
+
+def redis_is_up(url: str) -> bool:
+    try:
+        return redis.Redis.from_url(url, socket_connect_timeout=0.5).ping()
+    except redis.RedisError:
+        return False
+
+
+def create_user(**kwargs) -> User:
+    kwargs.setdefault("email", f"user-{secrets.token_hex(4)}@example.com")
+    kwargs.setdefault("first_name", "Test")
+    return User.objects.create_user(password="password", **kwargs)
+
+
+def create_instructor(**kwargs) -> Instructor:
+    user = create_user(is_instructor=True, **kwargs)
+    return Instructor.objects.create(user=user, title="Instructor", bio="")
+
+
+def create_course(owner: Instructor | None = None, **kwargs):
+    kwargs.setdefault("title", "Course")
+    kwargs.setdefault("description", "A course")
+    kwargs.setdefault("price", Decimal("10.00"))
+    kwargs.setdefault("is_available", True)
+    return course_models.Course.objects.create(
+        owner=owner or create_instructor(), **kwargs
+    )
+
+
+def contract_abi(*functions: str) -> list[dict]:
+    # enough of a contract ABI for core.blockchain.has_functions
+    return [{"type": "function", "name": name} for name in functions]
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class CoreTestCase(TestCase):
+    """
+    Runs against a local memory cache, emptied before every test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
@@ -9,6 +9,11 @@ urlpatterns = [
         name="categories",
     ),
     path("courses/", views.CourseListAPIView.as_view(), name="courses"),
+    path(
+        "courses/search/",
+        views.CourseSearchAPIView.as_view(),
+        name="course_search",
+    ),
     path(
         "courses/<uuid:id>/",
         views.CourseDetailAPIView.as_view(),
@@ -19,6 +24,11 @@ urlpatterns = [
         views.CourseModulesListAPIView.as_view(),
         name="course_modules",
     ),
+    path(
+        "courses/<uuid:id>/syllabus/",
+        views.CourseSyllabusAPIView.as_view(),
+        name="course_syllabus",
+    ),
     path(
         "modules/<uuid:id>/contents/",
         views.ModuleContentsListAPIView.as_view(),
@@ -1,8 +1,9 @@
 import random
+from decimal import ROUND_UP, Decimal
 from typing import Any
 
-import requests
 import base64
+import json
 import uuid
 
 
@@ -11,11 +12,15 @@ from django.core.files import File
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Q
 from django.template.defaultfilters import slugify
 from django.utils import timezone
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 
+from core.prices import get_price_oracle
+
 
 TOKEN_DECIMAL = {
     settings.ERC_USDT: 6,
@@ -23,9 +28,6 @@ TOKEN_DECIMAL = {
     settings.BESTIA_COIN: 6,
     settings.DOT: 12,
 }
-PRICE_API_INFO = {
-    settings.DOT: "https://api.coingecko.com/api/v3/simple/price?ids=polkadot&vs_currencies=usd",
-}
 TOKEN_TO_ID = {settings.DOT: "polkadot"}
 
 
@@ -51,6 +53,64 @@ class MessagePagination(CorePagination):
     page_size = 200
 
 
+class KeysetPagination(pagination.BasePagination):
+    """
+    Newest-first pagination keyed on (created_at, id) from BaseModel.
+    Pages are fetched with a WHERE on the last row seen instead of an
+    OFFSET, and the total is only counted when asked for with ?count=1,
+    up to `max_count` rows.
+    """
+
+    page_size = 50
+    max_count = 1000
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ("1", "true"):
+            # counting a bounded slice keeps the cost independent of the
+            # table size
+            self.count = queryset.order_by()[: self.max_count + 1].count()
+
+        queryset = queryset.order_by("-created_at", "-id")
+        if cursor := request.query_params.get(self.cursor_query_param):
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        rows = list(queryset[: self.page_size + 1])
+        page = rows[: self.page_size]
+        self.next_cursor = None
+        if len(rows) > self.page_size:
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def encode_cursor(self, obj) -> str:
+        data = json.dumps([obj.created_at.isoformat(), str(obj.id)])
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor: str):
+        try:
+            created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return timezone.datetime.fromisoformat(created_at), uuid.UUID(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response(self, data):
+        response = {"next": self.next_cursor, "data": data}
+        if self.count is not None:
+            response["count"] = min(self.count, self.max_count)
+            response["count_is_exact"] = self.count <= self.max_count
+        return Response(response)
+
+
+class MessageKeysetPagination(KeysetPagination):
+    page_size = 200
+
+
 FILE_EXTENSIONS = {
     "video": ["mp4", "webm", "mkv"],
     "audio": ["mp3", "ogg", "wav"],
@@ -140,20 +200,16 @@ def get_course_channel_name(id: str):
     return "course_%s" % id
 
 
-def fetch_usd_price(token: str) -> float:
-    if token in PRICE_API_INFO:
-        req = requests.get(PRICE_API_INFO[token])
-        response = req.json()
-        token_name = TOKEN_TO_ID[token]
-        return float(response[token_name]["usd"])
-    return float(1)
+def fetch_usd_price(token: str) -> Decimal:
+    return get_price_oracle().get_price(token)
 
 
-def get_usd_to_token_equivalent(token: str, usd_amount: float) -> int:
+def get_usd_to_token_equivalent(token: str, usd_amount: Decimal) -> int:
     price = fetch_usd_price(token)
-    token_amount = usd_amount / price
-    token_amount_in_lowest_decimal = pow(token_amount, TOKEN_DECIMAL[token])
-    return token_amount_in_lowest_decimal
+    token_amount = Decimal(str(usd_amount)) / price
+    token_amount_in_lowest_decimal = token_amount * 10 ** TOKEN_DECIMAL[token]
+    # never ask for less than the order is worth
+    return int(token_amount_in_lowest_decimal.to_integral_value(rounding=ROUND_UP))
 
 
 def base64_to_file(base64_string, filename_prefix="uploaded_file", file_extension=None):
@@ -1,26 +1,25 @@
+from django.http import Http404
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from core.models import course as course_models
 from core.models import notification as notification_models
 from core.serializers import course as course_serializer
-from core.serializers import sales as sales_serializer
 from core.serializers import notification as notification_serializer
+from core.serializers import sales as sales_serializer
 from core.service import CoreService
+from core.utils import KeysetPagination
 
 
-class CourseCategoryListAPIView(generics.ListAPIView):
+class CourseCategoryListAPIView(generics.GenericAPIView):
+    permission_classes = [AllowAny]
     serializer_class = course_serializer.CourseCategorySerializer
 
-    @method_decorator(cache_page(60 * 60 * 2))
-    def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
-
-    def get_queryset(self):
-        return course_models.CourseCategory.objects.all().order_by("name")
+    def get(self, request):
+        return Response(CoreService.get_course_categories())
 
 
 class CourseListAPIView(generics.ListAPIView):
@@ -39,10 +38,29 @@ class CourseListAPIView(generics.ListAPIView):
         return course_models.Course.objects.filter(**kwargs)
 
 
+class CourseSearchAPIView(generics.GenericAPIView):
+    permission_classes = [AllowAny]
+    max_limit = 50
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limit = min(int(params.get("limit", 20)), self.max_limit)
+        except ValueError:
+            limit = 20
+        data = CoreService.search_courses(
+            params.get("q", ""), params.get("category"), limit
+        )
+        return Response(data)
+
+
 class CourseDetailAPIView(generics.RetrieveAPIView):
     serializer_class = course_serializer.CourseSerializer
     lookup_field = "id"
 
+    def get_queryset(self):
+        return course_models.Course.objects.catalog()
+
 
 class CourseModulesListAPIView(generics.ListAPIView):
     serializer_class = course_serializer.ModuleSerializer
@@ -67,7 +85,21 @@ class ModuleContentsListAPIView(generics.ListAPIView):
     def get_queryset(self):
         module_id = self.kwargs["id"]
         module = generics.get_object_or_404(course_models.Module, id=module_id)
-        return course_models.Content.objects.filter(module=module).order_by("order")
+        return (
+            course_models.Content.objects.filter(module=module)
+            .only("title", "type", "duration")
+            .order_by("order")
+        )
+
+
+class CourseSyllabusAPIView(generics.GenericAPIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, id):
+        syllabus = CoreService.get_course_syllabus(id)
+        if syllabus is None:
+            raise Http404
+        return Response(syllabus)
 
 
 class CartAPIView(generics.GenericAPIView):
@@ -160,10 +192,11 @@ class VerifyTransactionAPIView(generics.GenericAPIView):
 class NotificationListAPIView(generics.ListAPIView):
     permission_classes = IsAuthenticated
     serializer_class = notification_serializer.NotificationSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         user = self.request.user
-        return user.notifications.all().order_by("-created_at")
+        return user.notifications.all().prefetch_related("related_content")
 
 
 class NotificationMarkAsReadAPIView(generics.GenericAPIView):
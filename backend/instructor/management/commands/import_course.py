@@ -0,0 +1,52 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models.course import Course
+from instructor.services.course_package import (
+    CoursePackageService,
+    InvalidPackage,
+    read_manifest,
+)
+
+
+class Command(BaseCommand):
+    help = "Import modules, contents and resources from a course package"
+
+    def add_arguments(self, parser):
+        parser.add_argument("course", help="id of the course to import into")
+        parser.add_argument("manifest", type=Path, help=".ndjson or .json file")
+        parser.add_argument("--media-dir", type=Path)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.select_related("owner__user").get(
+                id=options["course"]
+            )
+        except Course.DoesNotExist:
+            raise CommandError("Course does not exist")
+
+        start = time.perf_counter()
+        try:
+            counts = CoursePackageService.import_package(
+                course,
+                read_manifest(options["manifest"]),
+                media_dir=options["media_dir"],
+                batch_size=options["batch_size"],
+            )
+        except (InvalidPackage, KeyError) as err:
+            raise CommandError(f"Invalid package: {err}")
+        elapsed = time.perf_counter() - start
+
+        rows = sum(counts.values())
+        self.stdout.write(
+            ", ".join(f"{count} {name}" for name, count in counts.items())
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {rows} rows in {elapsed:.2f}s "
+                f"({rows / elapsed if elapsed else rows:.0f} rows/s)"
+            )
+        )
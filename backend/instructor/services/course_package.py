@@ -0,0 +1,327 @@
+"""
+A course package is a stream of NDJSON records, one per line:
+
+    {"type": "module", "key": "m1", "title": "...", "description": "..."}
+    {"type": "content", "key": "c1", "module": "m1", "item_type": "video",
+     "title": "...", "file": "videos/intro.mp4", "duration": 310}
+    {"type": "content", "key": "c2", "module": "m1", "item_type": "text",
+     "title": "...", "text": "..."}
+    {"type": "resource", "content": "c1", "title": "...", "url": "..."}
+
+Modules must come before their contents and contents before their
+resources. File paths are relative to the package media directory.
+
+Imported rows get ids derived from their package keys, so references
+between records are resolved without a key to id map, and media files
+are stored under a directory of their own import, removed again if the
+import fails.
+"""
+
+import json
+import uuid
+from collections.abc import Iterable, Iterator
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError
+from django.db import transaction as db_transaction
+
+from core.cache import bump_course_version
+from core.models import course as course_models
+
+ITEM_MODELS = {
+    course_models.ContentTypeChoice.VIDEO: course_models.Video,
+    course_models.ContentTypeChoice.BOOK: course_models.Book,
+    course_models.ContentTypeChoice.TEXT: course_models.Text,
+}
+
+
+class InvalidPackage(Exception):
+    pass
+
+
+def read_manifest(path: Path) -> Iterator[dict]:
+    with open(path) as file:
+        if path.suffix == ".json":
+            # plain json manifests are a single list and are loaded whole
+            yield from json.load(file)
+            return
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as err:
+                raise InvalidPackage(f"line {line_number}: {err}") from err
+
+
+def delete_tree(storage, path: str):
+    dirs, files = storage.listdir(path)
+    for name in files:
+        storage.delete(f"{path}/{name}")
+    for name in dirs:
+        delete_tree(storage, f"{path}/{name}")
+    # removes the emptied directory of a FileSystemStorage
+    storage.delete(path)
+
+
+class CourseImporter:
+    def __init__(self, course, media_dir: Path | None, batch_size: int):
+        self.course = course
+        self.media_dir = media_dir
+        self.batch_size = batch_size
+        self.namespace = uuid.uuid4()
+        self.media_prefix = f"course_packages/{self.namespace}"
+        self.stored_media = False
+        # package keys of the parents referenced by the current batch
+        self.references = {}
+        self.pending = {
+            course_models.Module: [],
+            course_models.Content: [],
+            course_models.Resource: [],
+        }
+        self.items = {model: [] for model in ITEM_MODELS.values()}
+        self.items[course_models.Link] = []
+        self.counts = {"modules": 0, "contents": 0, "resources": 0}
+        self.content_types = {
+            model: ContentType.objects.get_for_model(model) for model in self.items
+        }
+
+    def key_id(self, record_type: str, key) -> uuid.UUID:
+        return uuid.uuid5(self.namespace, f"{record_type}:{key}")
+
+    def reference(self, record_type: str, key) -> uuid.UUID:
+        pk = self.key_id(record_type, key)
+        self.references[pk] = key
+        return pk
+
+    def add(self, record: dict):
+        record_type = record.get("type")
+        if record_type == "module":
+            self.add_module(record)
+        elif record_type == "content":
+            self.add_content(record)
+        elif record_type == "resource":
+            self.add_resource(record)
+        else:
+            raise InvalidPackage(f"unknown record type {record_type!r}")
+
+    def add_module(self, record: dict):
+        module = course_models.Module(
+            id=self.key_id("module", record["key"]),
+            course=self.course,
+            title=record["title"],
+            description=record.get("description", ""),
+        )
+        self.queue(course_models.Module, module)
+
+    def add_content(self, record: dict):
+        if (item_model := ITEM_MODELS.get(record["item_type"])) is None:
+            raise InvalidPackage(f"unknown item type {record['item_type']!r}")
+        item = item_model(owner=self.course.owner.user, title=record["title"])
+        if item_model is course_models.Text:
+            item.text = record["text"]
+        else:
+            item.file.name = self.store_file(record["file"])
+        duration = None
+        if item_model is course_models.Video and record.get("duration"):
+            duration = item.duration = timedelta(seconds=record["duration"])
+        self.items[item_model].append(item)
+        content = course_models.Content(
+            id=self.key_id("content", record["key"]),
+            module_id=self.reference("module", record["module"]),
+            type=record["item_type"],
+            item_id=item.id,
+            item_ct=self.content_types[item_model],
+            title=item.title,
+            duration=duration,
+        )
+        self.queue(course_models.Content, content)
+
+    def add_resource(self, record: dict):
+        link = course_models.Link(
+            owner=self.course.owner.user, title=record["title"], url=record["url"]
+        )
+        self.items[course_models.Link].append(link)
+        resource = course_models.Resource(
+            content_id=self.reference("content", record["content"]),
+            type=course_models.ResourceType.LINK,
+            item_id=link.id,
+            item_ct=self.content_types[course_models.Link],
+            title=link.title,
+        )
+        self.queue(course_models.Resource, resource)
+
+    def store_file(self, relative_path: str) -> str:
+        if self.media_dir is None:
+            # the file is expected to be in storage already
+            return relative_path
+        with open(self.media_dir / relative_path, "rb") as file:
+            self.stored_media = True
+            return default_storage.save(
+                f"{self.media_prefix}/{relative_path}", File(file)
+            )
+
+    def delete_media(self):
+        if self.stored_media:
+            delete_tree(default_storage, self.media_prefix)
+
+    def queue(self, model, obj):
+        self.pending[model].append(obj)
+        if len(self.pending[model]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # parents are always flushed before their children
+        for model, objs in self.items.items():
+            model.objects.bulk_create(objs, batch_size=self.batch_size)
+            objs.clear()
+        modules = course_models.Module.objects.filter(course=self.course)
+        contents = course_models.Content.objects.filter(module__course=self.course)
+        for model, key, parent_field, parents in [
+            (course_models.Module, "modules", None, None),
+            (course_models.Content, "contents", "module_id", modules),
+            (course_models.Resource, "resources", "content_id", contents),
+        ]:
+            objs = self.pending[model]
+            if parent_field:
+                self.check_parents(objs, parent_field, parents)
+            try:
+                model.objects.bulk_create_ordered(objs, batch_size=self.batch_size)
+            except IntegrityError as err:
+                raise InvalidPackage(f"duplicate {key} keys") from err
+            self.counts[key] += len(objs)
+            objs.clear()
+        self.references.clear()
+
+    def check_parents(self, objs, parent_field: str, parents):
+        ids = {getattr(obj, parent_field) for obj in objs}
+        found = set(parents.filter(id__in=ids).values_list("id", flat=True))
+        if missing := ids - found:
+            name = parent_field.removesuffix("_id")
+            raise InvalidPackage(f"unknown {name} {self.references[missing.pop()]!r}")
+
+
+class CoursePackageService:
+    @classmethod
+    def import_package(
+        cls,
+        course: course_models.Course,
+        records: Iterable[dict],
+        media_dir: Path | None = None,
+        batch_size: int = 500,
+    ) -> dict[str, int]:
+        """
+        Append the modules, contents and resources of a package to a
+        course in one transaction, in batches of `batch_size` rows. Only
+        the current batch is held in memory. Media stored by an import
+        that fails is deleted, so do not call this inside a transaction
+        that may still be rolled back afterwards.
+        """
+        importer = CourseImporter(course, media_dir, batch_size)
+        try:
+            with db_transaction.atomic():
+                for record in records:
+                    importer.add(record)
+                importer.flush()
+                db_transaction.on_commit(lambda: bump_course_version(course.id))
+        except BaseException:
+            importer.delete_media()
+            raise
+        return importer.counts
+
+    @classmethod
+    def export_package(
+        cls,
+        course: course_models.Course,
+        media_dir: Path | None = None,
+        chunk_size: int = 500,
+    ) -> Iterator[dict]:
+        """
+        Stream a course back out in the import record format, reading
+        `chunk_size` rows at a time.
+        """
+        modules = (
+            course_models.Module.objects.filter(course=course)
+            .only("title", "description")
+            .order_by("order")
+        )
+        for module in modules.iterator(chunk_size=chunk_size):
+            yield {
+                "type": "module",
+                "key": module.id_str,
+                "title": module.title,
+                "description": module.description,
+            }
+        contents = (
+            course_models.Content.objects.filter(module__course=course)
+            .select_related("item_ct")
+            .order_by("module__order", "order")
+        )
+        for chunk in cls.chunks(contents, chunk_size):
+            items = cls.load_items(chunk)
+            for content in chunk:
+                item = items[content.item_id]
+                record = {
+                    "type": "content",
+                    "key": content.id_str,
+                    "module": str(content.module_id),
+                    "item_type": content.item_ct.model,
+                    "title": item.title,
+                }
+                if isinstance(item, course_models.Text):
+                    record["text"] = item.text
+                else:
+                    record["file"] = cls.copy_file(item.file.name, media_dir)
+                if duration := getattr(item, "duration", None):
+                    record["duration"] = duration.total_seconds()
+                yield record
+        resources = (
+            course_models.Resource.objects.filter(content__module__course=course)
+            .select_related("item_ct")
+            .order_by("content__module__order", "content__order", "order")
+        )
+        for chunk in cls.chunks(resources, chunk_size):
+            items = cls.load_items(chunk)
+            for resource in chunk:
+                link = items[resource.item_id]
+                yield {
+                    "type": "resource",
+                    "content": str(resource.content_id),
+                    "title": link.title,
+                    "url": link.url,
+                }
+
+    @classmethod
+    def load_items(cls, rows) -> dict:
+        ids_by_ct = {}
+        for row in rows:
+            ids_by_ct.setdefault(row.item_ct, []).append(row.item_id)
+        items = {}
+        for ct, ids in ids_by_ct.items():
+            items.update(ct.model_class().objects.in_bulk(ids))
+        return items
+
+    @classmethod
+    def copy_file(cls, name: str, media_dir: Path | None) -> str:
+        if media_dir is not None:
+            target = media_dir / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with default_storage.open(name) as source, open(target, "wb") as file:
+                for chunk in source.chunks():
+                    file.write(chunk)
+        return name
+
+    @staticmethod
+    def chunks(queryset, size):
+        chunk = []
+        for row in queryset.iterator(chunk_size=size):
+            chunk.append(row)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -1 +1,131 @@
-# Create your tests here.
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+
+from core.models import course as course_models
+from core.tests.utils import CoreTestCase, create_course
+from instructor.services.course_package import (
+    CoursePackageService,
+    InvalidPackage,
+)
+
+
+class CoursePackageTest(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        storage = override_settings(MEDIA_ROOT=media_root.name)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        package_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(package_dir.cleanup)
+        self.package_dir = Path(package_dir.name)
+        self.course = create_course()
+
+    def build_course(self):
+        owner = self.course.owner.user
+        first, second = (
+            course_models.Module.objects.create(course=self.course, title=title)
+            for title in ("First", "Second")
+        )
+        video = course_models.Video.objects.create(
+            owner=owner, title="Intro", duration=timedelta(seconds=310)
+        )
+        video.file.save("intro.mp4", ContentFile(b"video"))
+        text = course_models.Text.objects.create(owner=owner, title="Notes", text="...")
+        intro = course_models.Content.objects.create(module=first, item=video)
+        course_models.Content.objects.create(module=second, item=text)
+        link = course_models.Link.objects.create(
+            owner=owner, title="Docs", url="https://example.com"
+        )
+        course_models.Resource.objects.create(
+            content=intro, type=course_models.ResourceType.LINK, item=link
+        )
+
+    def export(self, course) -> list[dict]:
+        return list(CoursePackageService.export_package(course, self.package_dir))
+
+    def comparable(self, records: list[dict]) -> list[dict]:
+        # keys and storage names differ between courses
+        ignored = {"key", "module", "content", "file"}
+        return [
+            {name: value for name, value in record.items() if name not in ignored}
+            for record in records
+        ]
+
+    def test_exported_course_imports_into_another(self):
+        self.build_course()
+        records = self.export(self.course)
+        copy = create_course(owner=self.course.owner)
+
+        counts = CoursePackageService.import_package(
+            copy, records, media_dir=self.package_dir, batch_size=1
+        )
+
+        self.assertEqual(counts, {"modules": 2, "contents": 2, "resources": 1})
+        copied = self.export(copy)
+        self.assertEqual(self.comparable(copied), self.comparable(records))
+        self.assertEqual(
+            list(
+                course_models.Content.objects.filter(module__course=copy).values_list(
+                    "module__title", "title", "type"
+                )
+            ),
+            [("First", "Intro", "video"), ("Second", "Notes", "text")],
+        )
+        video = course_models.Video.objects.exclude(
+            pk__in=course_models.Content.objects.filter(
+                module__course=self.course
+            ).values("item_id")
+        ).get()
+        with video.file.open() as file:
+            self.assertEqual(file.read(), b"video")
+
+    def test_failed_import_leaves_nothing_behind(self):
+        (self.package_dir / "intro.mp4").write_bytes(b"video")
+        records = [
+            {"type": "module", "key": "m1", "title": "Module"},
+            {
+                "type": "content",
+                "key": "c1",
+                "module": "m1",
+                "item_type": "video",
+                "title": "Intro",
+                "file": "intro.mp4",
+            },
+            {"type": "resource", "content": "c2", "title": "Docs", "url": "..."},
+        ]
+
+        with self.assertRaisesMessage(InvalidPackage, "unknown content 'c2'"):
+            CoursePackageService.import_package(
+                self.course, records, media_dir=self.package_dir
+            )
+
+        self.assertFalse(course_models.Module.objects.exists())
+        self.assertFalse(course_models.Video.objects.exists())
+        self.assertEqual(default_storage.listdir("course_packages"), ([], []))
+
+    def test_contents_of_another_course_cannot_be_referenced(self):
+        other = create_course()
+        module = course_models.Module.objects.create(course=other, title="Module")
+
+        with self.assertRaisesMessage(InvalidPackage, "unknown module"):
+            CoursePackageService.import_package(
+                self.course,
+                [
+                    {
+                        "type": "content",
+                        "key": "c1",
+                        "module": str(module.id),
+                        "item_type": "text",
+                        "title": "Notes",
+                        "text": "...",
+                    }
+                ],
+            )
+        self.assertFalse(course_models.Content.objects.exists())
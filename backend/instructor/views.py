@@ -3,7 +3,7 @@ from rest_framework import generics
 from rest_framework.response import Response
 
 from core.models.user import Instructor
-from core.utils import CorePagination
+from core.utils import CorePagination, KeysetPagination
 from instructor.permissions import IsInstructor
 from instructor.services.dashboard import DashboardService
 from instructor.services.wallet import WalletService
@@ -43,7 +43,7 @@ class WalletBalanceAPIView(generics.GenericAPIView):
 class WalletTransactionListAPIView(generics.ListAPIView):
     permission_classes = [IsInstructor]
     serializer_class = WalletTransactionSerializer
-    pagination_class = CorePagination
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         instructor = Instructor.objects.get(user=self.request.user)
@@ -51,8 +51,8 @@ class WalletTransactionListAPIView(generics.ListAPIView):
         filter_by_type = None
         if type_param is not None and type_param.isdigit():
             filter_by_type = int(type_param)
-        transactions = WalletService.get_wallet_transactions(instructor, filter_by_type)
-        return transactions.order_by("-created_at")
+        # ordered newest first by KeysetPagination
+        return WalletService.get_wallet_transactions(instructor, filter_by_type)
 
 
 class WithdrawalRequestListAPIView(generics.ListAPIView):
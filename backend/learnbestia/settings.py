@@ -161,6 +161,26 @@ CACHES = {
     }
 }
 
+# channel layer, Redis so group messages reach consumers on every worker.
+# channels.layers.InMemoryChannelLayer only works within one process.
+CHANNEL_LAYER_BACKEND = os.environ.get(
+    "CHANNEL_LAYER_BACKEND", "channels_redis.core.RedisChannelLayer"
+)
+CHANNEL_LAYER_LOCATION = os.environ.get(
+    "CHANNEL_LAYER_LOCATION", "redis://127.0.0.1:6379/1"
+)
+CHANNEL_LAYERS = {"default": {"BACKEND": CHANNEL_LAYER_BACKEND}}
+if CHANNEL_LAYER_BACKEND.startswith("channels_redis."):
+    CHANNEL_LAYERS["default"]["CONFIG"] = {"hosts": [CHANNEL_LAYER_LOCATION]}
+if CHANNEL_LAYER_BACKEND == "channels_redis.core.RedisChannelLayer":
+    CHANNEL_LAYERS["default"]["CONFIG"].update(
+        # room for bursts of course events per consumer
+        capacity=int(os.environ.get("CHANNEL_LAYER_CAPACITY", 1500)),
+        expiry=10,
+    )
+# threads running course websocket events, see core.consumers.course
+COURSE_EVENT_WORKERS = int(os.environ.get("COURSE_EVENT_WORKERS", 16))
+
 CACHE_MIDDLEWARE_ALIAS = os.environ.get("CACHE_MIDDLEWARE_ALIAS", "default")
 
 CACHE_MIDDLEWARE_SECONDS = os.environ.get("CACHE_MIDDLEWARE_SECONDS", 60 * 15)
@@ -192,6 +212,20 @@ PRIVATE_KEY = os.environ.get("PRIVATE_KEY")
 ADMIN_ADDRESS = os.environ.get("ADDRESS")
 PROVIDER_URL = os.environ.get("PROVIDER_URL")
 CONTRACT_DIR = BASE_DIR / "contracts"
+WEB3_TIMEOUT = float(os.environ.get("WEB3_TIMEOUT", 10))
+WEB3_RETRIES = int(os.environ.get("WEB3_RETRIES", 3))
+WEB3_POOL_SIZE = int(os.environ.get("WEB3_POOL_SIZE", 10))
+# account minting certificates, give it ADMIN_ROLE on the certificate
+# contract. It must not be ADDRESS: nonces are counted per process, and
+# the minter runs apart from the invoice submitter.
+CERTIFICATE_MINTER_ADDRESS = os.environ.get("CERTIFICATE_MINTER_ADDRESS")
+CERTIFICATE_MINTER_PRIVATE_KEY = os.environ.get("CERTIFICATE_MINTER_PRIVATE_KEY")
+# blocks a payment event must be buried under before it is trusted
+PAYMENT_CONFIRMATIONS = int(os.environ.get("PAYMENT_CONFIRMATIONS", 6))
+
+# token prices, see core.prices
+PRICE_SOURCE = os.environ.get("PRICE_SOURCE", "core.prices.CoinGeckoPriceSource")
+PRICE_FIXTURES = os.environ.get("PRICE_FIXTURES", {})
 
 # token contracts
 ERC_USDT = ""
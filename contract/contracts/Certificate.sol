@@ -25,6 +25,18 @@ contract Certificate is ERC721, AccessControl{
         _mint(to, tokenId);
     }
 
+    // Mint many certificates in one transaction. Token IDs that are
+    // already minted are skipped, so a batch can be resubmitted safely.
+    function mintBatch(address[] calldata to, uint256[] calldata tokenIds) public onlyRole(ADMIN_ROLE) {
+        require(to.length == tokenIds.length, "Array lengths do not match");
+        for (uint256 i = 0; i < to.length; i++) {
+            if (_ownerOf(tokenIds[i]) != address(0)) {
+                continue;
+            }
+            _mint(to[i], tokenIds[i]);
+        }
+    }
+
     // Set the base URI
     function setBaseURI(string memory URI) public onlyRole(ADMIN_ROLE) {
         baseURI = URI;
@@ -41,6 +41,22 @@ contract Payment is AccessControl{
     }
 
     function createInvoice(string memory ref, uint256 amount, address token) public onlyRole(ADMIN_ROLE) {
+        _createInvoice(ref, amount, token);
+    }
+
+    // Create many invoices in one transaction. Refs that already have an
+    // invoice are skipped, so a batch can be resubmitted safely.
+    function createInvoices(string[] calldata refs, uint256[] calldata amounts, address[] calldata tokens) public onlyRole(ADMIN_ROLE) {
+        require(refs.length == amounts.length && refs.length == tokens.length, "Array lengths do not match");
+        for (uint256 i = 0; i < refs.length; i++) {
+            if (transactions[refs[i]].date_created != 0) {
+                continue;
+            }
+            _createInvoice(refs[i], amounts[i], tokens[i]);
+        }
+    }
+
+    function _createInvoice(string memory ref, uint256 amount, address token) internal {
         Status initial_status = Status.INITIATED;
         Transaction memory transaction = Transaction(ref, amount, token, initial_status, block.timestamp, block.timestamp);
         transactions[ref] = transaction;
@@ -72,6 +88,14 @@ contract Payment is AccessControl{
         return transaction.status == Status.PAID;
     }
 
+    function checkPaymentStatuses(string[] calldata refs) public view returns (bool[] memory) {
+        bool[] memory statuses = new bool[](refs.length);
+        for (uint256 i = 0; i < refs.length; i++) {
+            statuses[i] = transactions[refs[i]].status == Status.PAID;
+        }
+        return statuses;
+    }
+
     function cancelInvoice(string memory ref) public {
         require(hasRole(ADMIN_ROLE, msg.sender), "Only admin can cancel invoice");
         Transaction memory transaction = transactions[ref];
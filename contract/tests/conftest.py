@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    # every test starts from a fresh chain
+    pass
+
+
+@pytest.fixture
+def admin(accounts):
+    return accounts[0]
+
+
+@pytest.fixture
+def payment(Payment, admin):
+    return Payment.deploy(admin.address, {"from": admin})
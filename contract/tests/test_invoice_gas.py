@@ -0,0 +1,44 @@
+import pytest
+
+AMOUNT = 10**6
+
+
+def create_one_by_one(payment, admin, refs) -> int:
+    token = admin.address
+    return sum(
+        payment.createInvoice(ref, AMOUNT, token, {"from": admin}).gas_used
+        for ref in refs
+    )
+
+
+def create_in_batch(payment, admin, refs) -> int:
+    size = len(refs)
+    return payment.createInvoices(
+        refs, [AMOUNT] * size, [admin.address] * size, {"from": admin}
+    ).gas_used
+
+
+@pytest.mark.parametrize("size", [2, 10, 50])
+def test_batched_invoices_cost_less_gas_each(payment, admin, size):
+    single = create_one_by_one(payment, admin, [f"single-{i}" for i in range(size)])
+    batch = create_in_batch(payment, admin, [f"batch-{i}" for i in range(size)])
+
+    assert batch // size < single // size
+
+
+def test_batched_invoices_are_created(payment, admin):
+    refs = [f"batch-{i}" for i in range(3)]
+
+    create_in_batch(payment, admin, refs)
+
+    for ref in refs:
+        assert payment.transactions(ref)[1] == AMOUNT
+
+
+def test_batches_skip_existing_invoices(payment, admin):
+    payment.createInvoice("existing", 1, admin.address, {"from": admin})
+
+    create_in_batch(payment, admin, ["existing", "new"])
+
+    assert payment.transactions("existing")[1] == 1
+    assert payment.transactions("new")[1] == AMOUNT